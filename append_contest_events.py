@@ -15,10 +15,12 @@ SH = ROOT / "data_raw" / "audits" / "audit_events_sherlock.csv"
 
 OUT = ROOT / "data_raw" / "audits" / "audit_events_long.csv"
 
+WS_RE = re.compile(r"\s+")
+
 def norm(s):
     if pd.isna(s): return ""
     s = str(s).strip().lower()
-    s = re.sub(r"\s+", " ", s)
+    s = WS_RE.sub(" ", s)
     return s
 
 def map_to_slug(df: pd.DataFrame, llama: pd.DataFrame) -> pd.DataFrame:
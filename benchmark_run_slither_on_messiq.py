@@ -78,7 +78,8 @@ def main():
     INDEX = BENCH_ROOT / "contracts_index.csv"
     OUT_DIR = BENCH_ROOT / "slither_out"
     OUT_CSV = BENCH_ROOT / "slither_results.csv"
-    CKPT = BENCH_ROOT / "ckpt_slither.json"
+    CKPT = BENCH_ROOT / "ckpt_slither.json"  # legacy {"done": [...]} snapshot, migrated on first run
+    DONE_TXT = BENCH_ROOT / "ckpt_slither_done.txt"  # append-only, one done key per line
 
     MAX_N = int((__import__("os").environ.get("SLITHER_MAX_N") or "0").strip())  # 0 = all
     SLEEP_SEC = float((__import__("os").environ.get("SLITHER_SLEEP_SEC") or "0.05").strip())
@@ -98,6 +99,23 @@ def main():
             done = set(json.loads(CKPT.read_text()).get("done", []))
         except Exception:
             done = set()
+    if DONE_TXT.exists():
+        done.update(line.strip() for line in DONE_TXT.read_text().splitlines() if line.strip())
+    if CKPT.exists():
+        tmp = DONE_TXT.with_name(DONE_TXT.name + ".tmp")
+        tmp.write_text("".join(k + "\n" for k in sorted(done)))
+        tmp.replace(DONE_TXT)
+        CKPT.unlink()
+    done_log = DONE_TXT.open("a")
+    pending = []  # keys whose rows are not yet in OUT_CSV
+
+    def save_rows():
+        # CSV first, then the keys it now holds: a key is only logged once its row is on disk
+        OUT_DIR.mkdir(parents=True, exist_ok=True)
+        pd.DataFrame(rows).to_csv(OUT_CSV, index=False)
+        done_log.writelines(k + "\n" for k in pending)
+        done_log.flush()
+        pending.clear()
 
     rows = []
     if OUT_CSV.exists():
@@ -133,17 +151,16 @@ def main():
 
         rows.append(out_row)
         done.add(key)
+        pending.append(key)
 
         if len(done) % 50 == 0:
-            OUT_DIR.mkdir(parents=True, exist_ok=True)
-            pd.DataFrame(rows).to_csv(OUT_CSV, index=False)
-            CKPT.write_text(json.dumps({"done": sorted(done)}, indent=2))
+            save_rows()
             print(f"checked={len(done)} / {len(idx)} | ok={sum(x.get('slither_ok',0) for x in rows)}")
 
         time.sleep(SLEEP_SEC)
 
-    pd.DataFrame(rows).to_csv(OUT_CSV, index=False)
-    CKPT.write_text(json.dumps({"done": sorted(done)}, indent=2))
+    save_rows()
+    done_log.close()
     print(f"✅ wrote {OUT_CSV} rows={len(rows)} | ok={sum(x.get('slither_ok',0) for x in rows)}")
 
 
@@ -20,11 +20,13 @@ MANUAL = ROOT / "data_raw" / "audits" / "manual_name_to_slug.csv"
 UNMATCHED = ROOT / "data_raw" / "audits" / "unmatched_audit_events.csv"
 
 SEP_RE = re.compile(r"[;,|/]|(?:\s+&\s+)|(?:\s+and\s+)", re.IGNORECASE)
+WS_RE = re.compile(r"\s+")
+SCORE_RE = re.compile(r"(\d+(\.\d+)?)")
 
 def norm(s):
     if pd.isna(s): return ""
     s = str(s).strip().lower()
-    s = re.sub(r"\s+", " ", s)
+    s = WS_RE.sub(" ", s)
     return s
 
 def to_dt(x):
@@ -35,7 +37,7 @@ def parse_score(x):
     if pd.isna(x): return None
     s = str(x).strip()
     if not s: return None
-    m = re.search(r"(\d+(\.\d+)?)", s)
+    m = SCORE_RE.search(s)
     return float(m.group(1)) if m else None
 
 def guess_proto_col(df):
@@ -26,6 +26,8 @@ TOP_FIRMS = {
 }
 
 SEP_RE = re.compile(r"[;,|/]|(?:\s+&\s+)|(?:\s+and\s+)", re.IGNORECASE)
+WS_RE = re.compile(r"\s+")
+SCORE_RE = re.compile(r"(\d+(\.\d+)?)")
 
 def clean_str(x):
     if pd.isna(x):
@@ -37,7 +39,7 @@ def normalize_firms(x):
     if not s:
         return []
     parts = [p.strip() for p in SEP_RE.split(s) if p.strip()]
-    parts = [re.sub(r"\s+", " ", p).strip() for p in parts]
+    parts = [WS_RE.sub(" ", p).strip() for p in parts]
     return parts
 
 def parse_score(x):
@@ -46,7 +48,7 @@ def parse_score(x):
     s = str(x).strip()
     if not s:
         return None
-    m = re.search(r"(\d+(\.\d+)?)", s)
+    m = SCORE_RE.search(s)
     return float(m.group(1)) if m else None
 
 def parse_date(x):
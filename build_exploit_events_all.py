@@ -86,11 +86,20 @@ def _ensure_dirs() -> None:
     EXP.mkdir(parents=True, exist_ok=True)
 
 
+_WS_RE = re.compile(r"\s+")
+_NAME_JUNK_RE = re.compile(r"[^a-z0-9\- _./]")
+# the double-escaped patterns below are kept exactly as the inline calls had them
+_LOSS_RE = re.compile(r"\\$?\\s*([0-9]*\\.?[0-9]+)\\s*([kKmMbB])?$")
+_NUM_RE = re.compile(r"([0-9]*\\.?[0-9]+)")
+_HACK_WORD_RE = re.compile(r"\\b(hack|hacked|exploit|incident|rekt)\\b")
+_ESC_WS_RE = re.compile(r"\\s+")
+
+
 def _norm(s: str) -> str:
     s = str(s or "").strip().lower()
-    s = re.sub(r"\s+", " ", s)
+    s = _WS_RE.sub(" ", s)
     s = s.replace("–", "-").replace("—", "-")
-    s = re.sub(r"[^a-z0-9\- _./]", "", s)
+    s = _NAME_JUNK_RE.sub("", s)
     return s
 
 
@@ -110,13 +119,13 @@ def _parse_loss_usd(x):
         except Exception:
             return None
     s = str(x).replace(",", "").strip()
-    m = re.match(r"\\$?\\s*([0-9]*\\.?[0-9]+)\\s*([kKmMbB])?$", s)
+    m = _LOSS_RE.match(s)
     if m:
         val = float(m.group(1))
         suf = (m.group(2) or "").lower()
         mult = {"k": 1e3, "m": 1e6, "b": 1e9}.get(suf, 1.0)
         return val * mult
-    m2 = re.search(r"([0-9]*\\.?[0-9]+)", s)
+    m2 = _NUM_RE.search(s)
     if m2:
         try:
             return float(m2.group(1))
@@ -235,8 +244,8 @@ def _map_name_to_slug(name_raw: str, llama: pd.DataFrame, overrides: dict[str, s
         return sym_idx[n]
 
     # cleanup: remove common hack words
-    n2 = re.sub(r"\\b(hack|hacked|exploit|incident|rekt)\\b", "", n).strip()
-    n2 = re.sub(r"\\s+", " ", n2)
+    n2 = _HACK_WORD_RE.sub("", n).strip()
+    n2 = _ESC_WS_RE.sub(" ", n2)
     if n2 in name_idx:
         return name_idx[n2]
 
@@ -101,6 +101,10 @@ def to_dt(series: pd.Series) -> pd.Series:
     return pd.to_datetime(series, errors="coerce", utc=True)
 
 
+QUOTED_RE = re.compile(r"'([^']+)'|\"([^\"]+)\"")
+FIRM_SEP_RE = re.compile(r"[;,/|]+")
+
+
 def normalize_firm_list(x) -> List[str]:
     """Parse an audit firm field into a normalized list of lowercase firm names."""
     if x is None or (isinstance(x, float) and pd.isna(x)):
@@ -111,10 +115,10 @@ def normalize_firm_list(x) -> List[str]:
 
     # list-like in string form
     if s.startswith("[") and s.endswith("]"):
-        items = re.findall(r"'([^']+)'|\"([^\"]+)\"", s)
+        items = QUOTED_RE.findall(s)
         firms = [a or b for (a, b) in items]
     else:
-        firms = re.split(r"[;,/|]+", s)
+        firms = FIRM_SEP_RE.split(s)
 
     firms = [f.strip().lower() for f in firms if f and f.strip()]
 
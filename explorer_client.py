@@ -0,0 +1,478 @@
+#!/usr/bin/env python3
+"""
+explorer_client.py
+---------------------------------------------------
+Shared async HTTP plumbing for the fetch_contracts_full*.py scripts, and
+the explorer rate limiters (ExplorerQuota, CreditSemaphore, RateLimiter)
+every other fetch/probe script imports from here.
+
+All Etherscan-family explorers are hit through one aiohttp session; a
+semaphore bounds the number of in-flight requests so rows can be fetched
+concurrently instead of one blocking round-trip at a time, and a
+token-bucket limiter per explorer host keeps issuance at the published
+rate (5 req/s on the free tier) instead of fixed sleeps.
+
+Verified sources are cached in SQLite keyed by (chain, address): contract
+code at an address is immutable, so re-runs only hit the network for
+addresses that have not been seen before.
+
+Metadata tables are written as zstd-compressed Parquet; the CSV twin is
+only kept for human inspection (EXPORT_CSV=0 turns it off).
+"""
+
+import asyncio
+import csv
+import json
+import os
+import sqlite3
+import time
+from ast import literal_eval
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlencode, urlsplit
+
+import aiohttp
+import ijson
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import requests
+from aiolimiter import AsyncLimiter
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+MAX_CONCURRENCY = 64
+LIMIT_PER_HOST = 5
+REQUEST_TIMEOUT = 20
+MAX_RETRIES = 4
+
+# Bodies past this are pathological (no single verified source comes close); skip instead of buffering
+MAX_RESPONSE_BYTES = 50_000_000
+
+# 4.5 req/s leaves headroom under the 5 req/s free-tier cap
+RATE_PER_HOST = 4.5
+
+CACHE_PATH = Path(__file__).resolve().parent / "data_raw" / "contracts" / "cache.sqlite"
+CACHE_BATCH = 100
+
+EXPORT_CSV = os.getenv("EXPORT_CSV", "1").strip().lower() in ("1", "true", "yes")
+PARQUET_BATCH = 1024
+
+# getsourcecode fields kept when a response is stream-parsed (ABI etc. are dropped unread)
+SOURCE_FIELDS = ("SourceCode", "CompilerVersion", "ContractName")
+
+_LIMITERS = {}
+
+
+def _eval_list(text: str) -> Optional[list]:
+    try:
+        parsed = literal_eval(text)
+    except (ValueError, SyntaxError, MemoryError, RecursionError):
+        return None
+    return parsed if isinstance(parsed, list) else [parsed]
+
+
+def parse_list_column(col: pd.Series) -> pd.Series:
+    """
+    Bulk-parse a column of list literals such as "['ethereum', 'bsc']" into Python lists.
+    Bare strings become one-element lists, blanks become [], malformed list literals become None.
+    """
+    s = col.fillna("").astype(str).str.strip()
+    is_list = s.str.startswith("[")
+    out = s.map(lambda v: [v] if v else []).astype(object)
+    # Python-repr literals are parsed as-is, so names containing apostrophes survive
+    out[is_list] = s[is_list].map(_eval_list)
+    return out
+
+
+def parquet_path_for(csv_path) -> Path:
+    return Path(csv_path).with_suffix(".parquet")
+
+
+def save_table(df: pd.DataFrame, csv_path) -> Path:
+    """Write df as Parquet next to csv_path, plus the CSV export unless EXPORT_CSV=0."""
+    out = parquet_path_for(csv_path)
+    # CSV first: the Parquet twin must end up the newer file for load_table to pick it
+    if EXPORT_CSV:
+        df.to_csv(csv_path, index=False)
+    df.to_parquet(out, compression="zstd", engine="pyarrow", index=False)
+    return out
+
+
+def load_table(csv_path) -> pd.DataFrame:
+    """Read the Parquet twin of csv_path when it is at least as fresh as the CSV."""
+    csv_path = Path(csv_path)
+    pq_path = parquet_path_for(csv_path)
+    if pq_path.exists() and (not csv_path.exists() or pq_path.stat().st_mtime >= csv_path.stat().st_mtime):
+        return pd.read_parquet(pq_path)
+    return pd.read_csv(csv_path)
+
+
+def _dumps_line(record: dict) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(record) + b"\n"
+    return (json.dumps(record) + "\n").encode("utf-8")
+
+
+class RecordWriter:
+    """
+    Streams dict records to Parquet in PARQUET_BATCH-row groups (and to CSV when EXPORT_CSV).
+    jsonl=True also appends each record as one line of a .jsonl twin the moment it is
+    written; unlike the Parquet file, that survives a crashed run. The twin is opened in
+    append mode and never truncated, so a rerun adds to a crashed run's lines instead of
+    wiping them.
+    """
+
+    def __init__(self, csv_path, fields, schema: pa.Schema, jsonl: bool = False):
+        self.fields = fields
+        self.schema = schema
+        self.batch = []
+        self.count = 0
+        self.parquet = pq.ParquetWriter(str(parquet_path_for(csv_path)), schema, compression="zstd")
+        self.csv_file = None
+        self.csv = None
+        if EXPORT_CSV:
+            self.csv_file = open(csv_path, "w", newline="", encoding="utf-8")
+            self.csv = csv.DictWriter(self.csv_file, fieldnames=fields)
+            self.csv.writeheader()
+        self.jsonl = open(Path(csv_path).with_suffix(".jsonl"), "ab", buffering=1 << 20) if jsonl else None
+
+    def writerow(self, record: dict) -> None:
+        self.batch.append(record)
+        self.count += 1
+        if self.csv:
+            self.csv.writerow(record)
+        if self.jsonl:
+            self.jsonl.write(_dumps_line(record))
+        if len(self.batch) >= PARQUET_BATCH:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.batch:
+            self.parquet.write_table(pa.Table.from_pylist(self.batch, schema=self.schema))
+            self.batch = []
+
+    def close(self) -> None:
+        self.flush()
+        if self.csv_file:
+            self.csv_file.close()
+        if self.jsonl:
+            self.jsonl.close()
+        # Footer written last, so the Parquet file is never older than its CSV twin (see load_table)
+        self.parquet.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def make_session(limit: int = MAX_CONCURRENCY, limit_per_host: int = LIMIT_PER_HOST) -> aiohttp.ClientSession:
+    """One pooled session for every explorer host (keep-alive, capped per host)."""
+    connector = aiohttp.TCPConnector(limit=limit, limit_per_host=limit_per_host)
+    return aiohttp.ClientSession(connector=connector)
+
+
+def session_with_retries(total: int = 3, backoff: float = 0.5) -> requests.Session:
+    """
+    Blocking counterpart of make_session for the requests-based fetchers: one keep-alive
+    pool for every call, retrying with backoff on 429 and 5xx responses.
+    """
+    s = requests.Session()
+    retries = Retry(
+        total=total,
+        backoff_factor=backoff,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=frozenset(["GET"]),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=retries)
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    return s
+
+
+def source_url_prefixes(endpoints: dict, apikeys) -> dict:
+    """
+    getsourcecode URL per chain with the fixed query encoded once up front; callers
+    append the (hex, URL-safe) address instead of re-encoding params per request.
+    apikeys is either one key for every chain or a {chain: key} mapping.
+    """
+    prefixes = {}
+    for chain, api in endpoints.items():
+        key = apikeys.get(chain, "") if isinstance(apikeys, dict) else apikeys
+        query = urlencode({"module": "contract", "action": "getsourcecode", "apikey": key or ""})
+        prefixes[chain] = f"{api}?{query}&address="
+    return prefixes
+
+
+def limiter_for(api: str) -> AsyncLimiter:
+    """Token bucket shared by every request to the same explorer host."""
+    host = urlsplit(api).netloc
+    if host not in _LIMITERS:
+        _LIMITERS[host] = AsyncLimiter(RATE_PER_HOST, 1.0)
+    return _LIMITERS[host]
+
+
+class ExplorerQuota:
+    """
+    Per-second and per-minute token buckets for one explorer API key. Every attempt,
+    retries included, spends a token; while the explorer reports <10% of its
+    X-RateLimit quota left, a request costs two per-second tokens instead of one.
+    """
+
+    def __init__(self, rps: float, rpm: float):
+        self.sec = AsyncLimiter(rps, 1)
+        self.min = AsyncLimiter(rpm, 60)
+        self.cost = 1.0
+
+    async def __aenter__(self):
+        await self.sec.acquire(min(self.cost, self.sec.max_rate))
+        await self.min.acquire()
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def observe(self, headers) -> None:
+        try:
+            remaining = float(headers["X-RateLimit-Remaining"])
+            limit = float(headers["X-RateLimit-Limit"])
+        except (KeyError, ValueError):
+            return
+        self.cost = 2.0 if limit and remaining < 0.1 * limit else 1.0
+
+
+class CreditSemaphore:
+    """
+    Per-host request budget: each transact() spends `credits` that are refunded
+    `refund_time` seconds later, so at most `credits` requests start in any window
+    and the quota is used fully instead of being spaced out by fixed gaps.
+    """
+
+    def __init__(self, credits: float):
+        self._sem = asyncio.Semaphore(max(int(credits), 1))
+
+    async def transact(self, coro, credits: int = 1, refund_time: float = 1.0):
+        held = 0
+        try:
+            for _ in range(credits):
+                await self._sem.acquire()
+                held += 1
+        except BaseException:
+            # cancelled while queued: hand back what was taken and never start the request
+            for _ in range(held):
+                self._sem.release()
+            coro.close()
+            raise
+        loop = asyncio.get_running_loop()
+        for _ in range(credits):
+            loop.call_later(refund_time, self._sem.release)
+        return await coro
+
+
+class RateLimiter:
+    """Fixed minimum gap between consecutive requests (1/rps seconds)."""
+
+    def __init__(self, rps: float = 2.0):
+        self.gap = 1.0 / max(float(rps), 0.1)
+        self.t = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self.lock:
+            now = time.monotonic()
+            sleep = max(0.0, self.t + self.gap - now)
+            if sleep > 0:
+                await asyncio.sleep(sleep)
+            self.t = time.monotonic()
+
+
+def _loads(body: bytes):
+    """Decode with orjson when available, falling back to stdlib json."""
+    if not body.strip():
+        return {}
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def _retry_after(r: aiohttp.ClientResponse, attempt: int) -> float:
+    try:
+        return float(r.headers.get("Retry-After", ""))
+    except ValueError:
+        return float(2 ** attempt)
+
+
+async def _stream_getsourcecode(content: aiohttp.StreamReader, fields=SOURCE_FIELDS) -> dict:
+    """
+    Incrementally parse a getsourcecode body straight off the socket, keeping only
+    status/message and the wanted result fields. The raw bytes are never buffered
+    whole and no dict is built for the fields that are skipped.
+    """
+    data = {"result": []}
+    item = None
+    async for prefix, event, value in ijson.parse(content):
+        if prefix in ("status", "message"):
+            data[prefix] = value
+        elif prefix == "result" and event == "string":
+            data["result"] = value  # e.g. "Max rate limit reached"
+        elif prefix == "result.item":
+            if event == "start_map":
+                item = {}
+            elif event == "end_map":
+                data["result"].append(item)
+                item = None
+        elif item is not None and event == "string" and prefix[12:] in fields:
+            item[prefix[12:]] = value
+    return data
+
+
+async def fetch_one(
+    session: aiohttp.ClientSession,
+    sem,
+    api: str,
+    params=None,
+    timeout: float = REQUEST_TIMEOUT,
+    stream: bool = False,
+):
+    """
+    GET an explorer endpoint and decode the JSON body.
+    HTTP 429 is retried with Retry-After / exponential backoff; an empty dict is
+    returned once retries are exhausted. Other 4xx/5xx responses and HTML error
+    pages return an empty dict without reading the body. Network errors propagate
+    to the caller.
+    stream=True parses a getsourcecode body incrementally (see _stream_getsourcecode).
+    Responses advertising more than MAX_RESPONSE_BYTES are skipped (empty dict).
+    """
+    limiter = limiter_for(api)
+    async with sem:
+        for attempt in range(MAX_RETRIES):
+            async with limiter:
+                async with session.get(api, params=params, timeout=aiohttp.ClientTimeout(total=timeout)) as r:
+                    if r.status == 429:
+                        delay = _retry_after(r, attempt)
+                    elif r.status >= 400 or r.content_type == "text/html":
+                        print(f"⚠️ HTTP {r.status} ({r.content_type}) from {urlsplit(api).netloc}; skipping")
+                        return {}
+                    elif (r.content_length or 0) > MAX_RESPONSE_BYTES:
+                        print(f"⚠️ Skipping oversize response ({r.content_length} bytes) from {urlsplit(api).netloc}")
+                        return {}
+                    elif stream:
+                        return await _stream_getsourcecode(r.content)
+                    else:
+                        return _loads(await r.read())
+            await asyncio.sleep(delay)
+    return {}
+
+
+class SourceCache:
+    """Persistent (chain, address) → (source, compiler, contract_name, fetched_at) store."""
+
+    def __init__(self, path: Path = CACHE_PATH, batch_size: int = CACHE_BATCH):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(path))
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS src("
+            "chain TEXT, addr TEXT, source TEXT, compiler TEXT, contract_name TEXT, fetched_at INTEGER, "
+            "PRIMARY KEY(chain, addr))"
+        )
+        self.batch_size = batch_size
+        self.pending = {}
+        self.hits = 0
+
+    def get(self, chain: str, address: str) -> Optional[dict]:
+        key = (str(chain).lower(), str(address).lower())
+        row = self.pending.get(key)
+        if row is None:
+            row = self.conn.execute(
+                "SELECT chain, addr, source, compiler, contract_name, fetched_at FROM src WHERE chain=? AND addr=?",
+                key,
+            ).fetchone()
+        if row is None:
+            return None
+        self.hits += 1
+        return {"SourceCode": row[2], "CompilerVersion": row[3], "ContractName": row[4]}
+
+    def put(self, chain: str, address: str, result: dict) -> None:
+        key = (str(chain).lower(), str(address).lower())
+        self.pending[key] = key + (
+            result.get("SourceCode", ""),
+            result.get("CompilerVersion", ""),
+            result.get("ContractName", ""),
+            int(time.time()),
+        )
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """One executemany + one commit per batch to amortize fsync cost."""
+        if not self.pending:
+            return
+        self.conn.executemany("INSERT OR REPLACE INTO src VALUES (?, ?, ?, ?, ?, ?)", list(self.pending.values()))
+        self.conn.commit()
+        self.pending.clear()
+
+    def close(self) -> None:
+        self.flush()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+async def fetch_source(
+    session: aiohttp.ClientSession,
+    sem,
+    cache: SourceCache,
+    chain: str,
+    address: str,
+    api: str,
+    params=None,
+    timeout: float = REQUEST_TIMEOUT,
+    stream: bool = False,
+):
+    """
+    Like fetch_one, but served from the SourceCache when the (chain, address) pair
+    has a verified source already. Hits are returned in the getsourcecode payload
+    shape so callers need no special casing.
+    """
+    if address:
+        hit = cache.get(chain, address)
+        if hit is not None:
+            return {"status": "1", "message": "OK", "result": [hit]}
+
+    data = await fetch_one(session, sem, api, params, timeout=timeout, stream=stream)
+    result = data.get("result") if isinstance(data, dict) else None
+    if (
+        address
+        and str(data.get("status")) == "1"
+        and isinstance(result, list)
+        and result
+        and isinstance(result[0], dict)
+        and (result[0].get("SourceCode") or "").strip()
+    ):
+        cache.put(chain, address, result[0])
+    return data
+
+
+def run_standalone(run) -> None:
+    """
+    Drive one fetcher's `async run(session, sem, cache)` with its own session and
+    cache. fetch_contracts_sweep.py calls the same coroutines with shared ones.
+    """
+    async def _main():
+        sem = asyncio.Semaphore(MAX_CONCURRENCY)
+        with SourceCache() as cache:
+            async with make_session() as session:
+                await run(session, sem, cache)
+
+    asyncio.run(_main())
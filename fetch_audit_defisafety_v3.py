@@ -33,8 +33,8 @@ slug_map = {
     "Radiyum AMM": "raydium",
 }
 
-for _, row in df.iterrows():
-    name = row["protocol_name"]
+categories = df["category"].to_numpy() if "category" in df.columns else [None] * len(df)
+for name, category in zip(df["protocol_name"].to_numpy(), categories):
     slug = slug_map.get(name, name.lower().replace(" ", "-"))
     url = f"https://api.defisafety.com/audit/{slug}"
 
@@ -49,7 +49,7 @@ for _, row in df.iterrows():
                 "audit_date": data.get("audit_date", None),
                 "audit_link": data.get("url", None),
                 "auditor": data.get("auditor", None),
-                "category": row.get("category", None)
+                "category": category
             })
             print(f"✅ Found audit for {name} ({slug})")
         else:
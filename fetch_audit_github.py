@@ -12,11 +12,10 @@ token = os.getenv("GITHUB_TOKEN")
 if token:
     headers["Authorization"] = f"token {token}"
 
-for _, row in df.iterrows():
-    repo = row.get("github", "")
+repos = df["github"].to_numpy() if "github" in df.columns else [""] * len(df)
+for repo, name in zip(repos, df["protocol_name"].to_numpy()):
     if pd.isna(repo) or "github.com" not in repo:
         continue
-    name = row["protocol_name"]
     parts = repo.split("github.com/")[-1].split("/")
     if len(parts) < 2:
         continue
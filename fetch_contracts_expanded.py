@@ -30,6 +30,13 @@ import aiohttp
 import pandas as pd
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from explorer_client import RateLimiter
+
 print("🚀 Script started... loading .env and initializing asyncio", flush=True)
 
 # ────────────────────────────────────────────────────────────────────────────────
@@ -158,6 +165,18 @@ def parse_csv_list(s: str) -> List[str]:
     parts = [p.strip() for p in str(s).split(",")]
     return [p for p in parts if p]
 
+def dump_json_bytes(obj, indent: bool = False) -> bytes:
+    """Serialize with orjson when available, falling back to stdlib json."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(obj, indent=2 if indent else None).encode("utf-8")
+
+def write_bytes_atomic(path: Path, data: bytes) -> None:
+    """Write to a .tmp sibling and rename, so a killed run never leaves a partial file."""
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
 # ────────────────────────────────────────────────────────────────────────────────
 # HTTP HELPERS
 # ────────────────────────────────────────────────────────────────────────────────
@@ -211,20 +230,6 @@ async def http_get_text(session: aiohttp.ClientSession, url: str, *, headers=Non
         logging.warning(f"Network fail GET TEXT {url}: {e}")
         return ""
 
-class RateLimiter:
-    def __init__(self, rps: float = 2.0):
-        self.gap = 1.0 / max(float(rps), 0.1)
-        self.t = 0.0
-        self.lock = asyncio.Lock()
-
-    async def wait(self):
-        async with self.lock:
-            now = time.monotonic()
-            sleep = max(0.0, self.t + self.gap - now)
-            if sleep > 0:
-                await asyncio.sleep(sleep)
-            self.t = time.monotonic()
-
 async def etherscan_get_source(
     session: aiohttp.ClientSession,
     limiter: RateLimiter,
@@ -348,10 +353,14 @@ async def get_protocols_top(session: aiohttp.ClientSession, top_n: int, allow_ca
     raw = await http_get_json(session, LLAMA_PROTOCOLS_URL)
     if not raw:
         return []
-    df = pd.DataFrame(raw)[["name", "symbol", "category", "tvl", "slug", "chains"]]
+    # Only materialize the columns we keep; nlargest avoids a full sort for a small top_n.
+    df = pd.DataFrame.from_records(raw, columns=["name", "symbol", "category", "tvl", "slug", "chains"])
     if allow_cats:
         df = df[df["category"].isin(allow_cats)]
-    return df.sort_values("tvl", ascending=False).head(int(top_n)).to_dict("records")
+    df = df.assign(tvl=pd.to_numeric(df["tvl"], errors="coerce"))
+    # nlargest drops NaN; ranking them at -inf keeps them after the numeric TVLs, as the sort did
+    top = df.assign(_rank=df["tvl"].fillna(float("-inf"))).nlargest(int(top_n), "_rank")
+    return top.drop(columns="_rank").to_dict("records")
 
 # ────────────────────────────────────────────────────────────────────────────────
 # GITHUB MINING
@@ -486,6 +495,7 @@ async def main() -> List[dict]:
         except Exception:
             state = {"done": []}
 
+    done_set = set(state["done"])  # membership checks; state["done"] stays the list that is written out
     limiter = RateLimiter(rps=RPS)
     rows: List[dict] = []
 
@@ -499,12 +509,31 @@ async def main() -> List[dict]:
         logging.info(f"Loaded {len(protos)} protocols to mine...")
 
         sem = asyncio.Semaphore(PROT_CONC)
+        checkpoint_dirty = asyncio.Event()
+        stopping = False
+
+        async def flush_checkpoint():
+            """Single writer: coalesce checkpoint rewrites to at most one per second."""
+            while True:
+                await checkpoint_dirty.wait()
+                checkpoint_dirty.clear()
+                # Serialize on the loop so the snapshot cannot race with state["done"].append.
+                data = dump_json_bytes(state)
+                await asyncio.to_thread(write_bytes_atomic, checkpoint, data)
+                if stopping:
+                    # A slug finished during the write above re-set the flag: write once more.
+                    if not checkpoint_dirty.is_set():
+                        return
+                    continue
+                await asyncio.sleep(1.0)
+
+        flusher = asyncio.create_task(flush_checkpoint())
 
         async def handle_protocol(p: dict) -> List[dict]:
             slug = p.get("slug")
             if not slug:
                 return []
-            if slug in state["done"]:
+            if slug in done_set:
                 logging.info(f"⏭️ Skipping {slug} (already in checkpoint)")
                 return []
 
@@ -518,7 +547,7 @@ async def main() -> List[dict]:
                         mined = mined[:CAP]
 
                     # Save mined candidates
-                    (ADDR_DIR / f"{slug}.json").write_text(json.dumps(mined, indent=2), encoding="utf-8")
+                    write_bytes_atomic(ADDR_DIR / f"{slug}.json", dump_json_bytes(mined, indent=True))
 
                     verified_rows: List[dict] = []
                     proto_chain_list = p.get("chains", []) or []
@@ -562,7 +591,8 @@ async def main() -> List[dict]:
                         )
 
                     state["done"].append(slug)
-                    checkpoint.write_text(json.dumps(state), encoding="utf-8")
+                    done_set.add(slug)
+                    checkpoint_dirty.set()
 
                     logging.info(f"✅ Finished {slug} — mined {len(mined)} addresses, verified {len(verified_rows)}")
                     return verified_rows
@@ -572,7 +602,13 @@ async def main() -> List[dict]:
                     return []
 
         tasks = [handle_protocol(p) for p in protos]
-        results = await asyncio.gather(*tasks)
+        try:
+            results = await asyncio.gather(*tasks)
+        finally:
+            # Final flush goes through the same writer so it never overlaps an in-flight write.
+            stopping = True
+            checkpoint_dirty.set()
+            await flusher
         rows = [r for batch in results for r in batch]
 
     return rows
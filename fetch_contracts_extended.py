@@ -7,13 +7,14 @@ Uses Etherscan, Blockscout, and fallback APIs for large-scale verified contract
 """
 
 import os
-import requests
+import asyncio
+import aiohttp
 import pandas as pd
-import time
-import random
 from tqdm import tqdm
 from pathlib import Path
 
+from explorer_client import RateLimiter
+
 # === Paths ===
 ROOT_DIR = Path(__file__).resolve().parent
 DATA_DIR = ROOT_DIR / "data_raw" / "contracts"
@@ -25,6 +26,8 @@ OUT_CSV = DATA_DIR / "verified_contracts_extended.csv"
 # === Config ===
 MAX_PER_PROTOCOL = 15
 ETHERSCAN_API_KEY = os.getenv("ETHERSCAN_API_KEY", "YourEtherscanKeyHere")
+CHAIN_RPS = float(os.getenv("CHAIN_RPS", "4.0"))  # per explorer host (free tier caps at 5 rps)
+MAX_CONCURRENCY = int(os.getenv("MAX_CONCURRENCY", "12"))
 
 CHAIN_APIS = {
     "ethereum": f"https://api.etherscan.io/api",
@@ -35,17 +38,11 @@ CHAIN_APIS = {
     "avalanche": f"https://api.snowtrace.io/api",
 }
 
-# === Load registry ===
-if not REGISTRY_CSV.exists():
-    raise FileNotFoundError(f"{REGISTRY_CSV} not found — run fetch_contract_registry.py first.")
-
-registry_df = pd.read_csv(REGISTRY_CSV)
-registry_df.drop_duplicates(subset=["protocol_name", "chain"], inplace=True)
-
 # === Helpers ===
-def fetch_verified_contracts(address: str, chain: str):
+async def fetch_verified_contracts_async(session: aiohttp.ClientSession, limiters: dict, address: str, chain: str):
     """Fetch verified contracts for a given address/chain."""
-    api_url = CHAIN_APIS.get(chain.lower())
+    chain = str(chain).lower()
+    api_url = CHAIN_APIS.get(chain)
     if not api_url:
         return []
 
@@ -57,8 +54,9 @@ def fetch_verified_contracts(address: str, chain: str):
     }
 
     try:
-        r = requests.get(api_url, params=params, timeout=15)
-        data = r.json()
+        await limiters[chain].wait()
+        async with session.get(api_url, params=params) as r:
+            data = await r.json(content_type=None)
 
         if data.get("status") != "1":
             return []
@@ -84,30 +82,52 @@ def fetch_verified_contracts(address: str, chain: str):
 
 
 # === Main loop ===
-verified_all = []
-
-print(f"🔍 Fetching verified contracts for {len(registry_df)} registry entries...")
-
-for idx, row in tqdm(registry_df.iterrows(), total=len(registry_df)):
-    protocol = row.get("protocol_name", "")
-    address = row.get("contract_address", "")
-    chain = row.get("chain", "ethereum")
-
-    if not isinstance(address, str) or "0x" not in address:
-        continue
-
-    # Call Etherscan or alternative
-    verified = fetch_verified_contracts(address, chain)
-    verified_all.extend(verified)
-
-    # Polite random sleep to avoid ban
-    time.sleep(random.uniform(0.5, 1.5))
-
-# === Save output ===
-if verified_all:
-    df = pd.DataFrame(verified_all)
-    df.drop_duplicates(subset=["contract_address"], inplace=True)
-    df.to_csv(OUT_CSV, index=False)
-    print(f"✅ Saved verified contracts → {OUT_CSV} ({len(df)} rows)")
-else:
-    print("⚠️ No verified contracts fetched.")
\ No newline at end of file
+async def main():
+    if not REGISTRY_CSV.exists():
+        raise FileNotFoundError(f"{REGISTRY_CSV} not found — run fetch_contract_registry.py first.")
+
+    registry_df = pd.read_csv(REGISTRY_CSV)
+    if "chain" not in registry_df.columns:
+        registry_df["chain"] = "ethereum"
+    registry_df["chain"] = registry_df["chain"].fillna("ethereum")
+    registry_df.drop_duplicates(subset=["protocol_name", "chain"], inplace=True)
+
+    print(f"🔍 Fetching verified contracts for {len(registry_df)} registry entries...")
+
+    # One limiter per explorer host, so chains proceed in parallel without tripping per-key rate caps.
+    rate_limiters = {chain: RateLimiter(rps=CHAIN_RPS) for chain in CHAIN_APIS}
+    sem = asyncio.Semaphore(MAX_CONCURRENCY)
+    pbar = tqdm(total=len(registry_df))
+
+    async def handle(session: aiohttp.ClientSession, address, chain):
+        try:
+            if not isinstance(address, str) or "0x" not in address:
+                return []
+            async with sem:
+                return await fetch_verified_contracts_async(session, rate_limiters, address, chain)
+        finally:
+            pbar.update(1)
+
+    timeout = aiohttp.ClientTimeout(total=15)
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        tasks = [
+            handle(session, getattr(row, "contract_address", ""), row.chain)
+            for row in registry_df.itertuples(index=False)
+        ]
+        results = await asyncio.gather(*tasks)
+    pbar.close()
+
+    verified_all = [v for batch in results for v in batch]
+
+    # === Save output ===
+    if verified_all:
+        df = pd.DataFrame(verified_all)
+        df.drop_duplicates(subset=["contract_address"], inplace=True)
+        df.to_csv(OUT_CSV, index=False)
+        print(f"✅ Saved verified contracts → {OUT_CSV} ({len(df)} rows)")
+    else:
+        print("⚠️ No verified contracts fetched.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
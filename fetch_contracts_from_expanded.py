@@ -91,11 +91,17 @@ else:
     done_addresses = set()
 
 # === Utility functions ===
-def count_functions(code: str) -> int:
-    return len(re.findall(r'\bfunction\b', code))
-
-def count_events(code: str) -> int:
-    return len(re.findall(r'\bevent\b', code))
+_FN_EVT_RE = re.compile(r'\b(function|event)\b')
+
+def count_fn_evt(code: str):
+    """Count `function` and `event` keywords in a single pass over the source."""
+    fn = ev = 0
+    for m in _FN_EVT_RE.finditer(code):
+        if m.group(1) == "function":
+            fn += 1
+        else:
+            ev += 1
+    return fn, ev
 
 def safe_get(api_url, params, retries=MAX_RETRIES):
     for attempt in range(retries):
@@ -142,13 +148,14 @@ def fetch_verified_code(address: str, chain_field: str):
         if data and data.get("status") == "1" and data.get("result"):
             result = data["result"][0]
             source_code = result.get("SourceCode", "")
+            num_functions, num_events = count_fn_evt(source_code)
             return {
                 "chain": chain,
                 "contract_address": address,
                 "verified": True,
                 "lines_of_code": len(source_code.splitlines()),
-                "num_functions": count_functions(source_code),
-                "num_events": count_events(source_code),
+                "num_functions": num_functions,
+                "num_events": num_events,
                 "compiler_version": result.get("CompilerVersion", ""),
                 "license": result.get("LicenseType", ""),
             }
@@ -159,9 +166,9 @@ def fetch_verified_code(address: str, chain_field: str):
 # === Main ===
 verified_contracts = []
 
-for _, row in tqdm(df.iterrows(), total=len(df)):
-    address = str(row["address"]).strip()
-    chain = str(row["chains"]).lower().strip()
+for address, chain in tqdm(zip(df["address"].to_numpy(), df["chains"].to_numpy()), total=len(df)):
+    address = str(address).strip()
+    chain = str(chain).lower().strip()
 
     if not address or "0x" not in address:
         continue
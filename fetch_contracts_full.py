@@ -1,9 +1,18 @@
 import os
+import re
 import time
-import requests
-import pandas as pd
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import pyarrow as pa
 from dotenv import load_dotenv
 
+try:
+    import zstandard as zstd
+except ImportError:
+    zstd = None
+
+from explorer_client import RecordWriter, fetch_source, load_table, run_standalone, source_url_prefixes
+
 # Load your API key
 load_dotenv()
 API_KEY = os.getenv("ETHERSCAN_API_KEY")
@@ -17,75 +26,187 @@ API_DOMAINS = {
     "polygon": "https://api.polygonscan.com/api",
     "avalanche": "https://api.snowtrace.io/api"
 }
+SOURCE_URLS = source_url_prefixes(API_DOMAINS, API_KEY)
 
-# Load your master CSV
-contracts = pd.read_csv("data_raw/contracts/master_contracts.csv")
-
-# Prepare output folders
-os.makedirs("data_raw/contracts", exist_ok=True)
+master_infile = "data_raw/contracts/master_contracts.csv"
 master_outfile = "data_raw/contracts/verified_contracts.csv"
 
-# Store results
-records = []
-
-# Iterate through all listed contracts
-for i, row in contracts.iterrows():
-    category = row["category"]
-    name = row["protocol_name"]
-    chain = row["chain"]
-    address = row["contract_address"]
-
-    api = API_DOMAINS.get(chain.lower())
-    if not api:
-        print(f"⚠️ Skipping {name}: unsupported chain {chain}")
-        continue
-
-    params = {
-        "module": "contract",
-        "action": "getsourcecode",
-        "address": address,
-        "apikey": API_KEY
-    }
-
-    print(f"🔍 Fetching {name} ({chain}) ...")
-    r = requests.get(api, params=params)
-    data = r.json().get("result", [{}])[0]
+# .sol files written within this window are reused instead of re-fetched
+SOURCE_TTL = 7 * 86400
+
+# SOL_ZSTD=1 stores sources as .sol.zst (Solidity compresses ~5-8x); off by default
+# because slither/mythril need plain .sol files
+SOL_ZSTD = zstd is not None and os.getenv("SOL_ZSTD", "0").strip().lower() in ("1", "true", "yes")
+SOL_SUFFIX = ".sol.zst" if SOL_ZSTD else ".sol"
+
+FIELDS = [
+    "category", "protocol_name", "chain", "contract_address", "compiler_version",
+    "verified", "source_file", "proxy_pattern", "lines_of_code",
+]
+SCHEMA = pa.schema([
+    ("category", pa.string()),
+    ("protocol_name", pa.string()),
+    ("chain", pa.string()),
+    ("contract_address", pa.string()),
+    ("compiler_version", pa.string()),
+    ("verified", pa.bool_()),
+    ("source_file", pa.string()),
+    ("proxy_pattern", pa.string()),
+    ("lines_of_code", pa.int64()),
+])
+
+# Case-insensitive scans without building a lowercased copy of each source
+_PROXY_RE = re.compile(r"implementation|delegatecall", re.I)
+_IMPL_RE = re.compile(r"implementation", re.I)
+
+
+def detect_proxy_pattern(source_code):
+    """EIP-1967 if "implementation" appears anywhere, else delegatecall, else none."""
+    m = _PROXY_RE.search(source_code)
+    if m is None:
+        return "none"
+    if m.group().lower() == "implementation" or _IMPL_RE.search(source_code, m.end()):
+        return "EIP-1967"
+    return "delegatecall"
+
+
+def parse_source(source_code):
+    """CPU-heavy per-contract metadata extraction, run in a worker process."""
+    # Newline count in C instead of materializing a list of every line
+    lines = source_code.count("\n") + (0 if source_code.endswith("\n") else bool(source_code))
+    return detect_proxy_pattern(source_code), lines
+
+
+def is_fresh(source_path):
+    """True for a non-empty .sol written within SOURCE_TTL — one stat() instead of a round-trip."""
+    try:
+        st = os.stat(source_path)
+    except FileNotFoundError:
+        return False
+    return st.st_size > 0 and time.time() - st.st_mtime < SOURCE_TTL
+
+
+def read_source(source_path):
+    if source_path.endswith(".zst"):
+        with open(source_path, "rb") as f, zstd.ZstdDecompressor().stream_reader(f) as r:
+            return r.read().decode("utf-8")
+    with open(source_path, encoding="utf-8") as f:
+        return f.read()
+
+
+def write_source(source_path, source_code):
+    """Raw os.write of the encoded source (or a zstd stream for .zst), run on the dedicated writer thread."""
+    if source_path.endswith(".zst"):
+        with open(source_path, "wb") as out, zstd.ZstdCompressor(level=10, threads=-1).stream_writer(out) as w:
+            w.write(source_code.encode("utf-8"))
+        return
+
+    view = memoryview(source_code.encode("utf-8"))
+    fd = os.open(source_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
+async def fetch_group(session, sem, cache, pool, disk, writer, rows):
+    """Fetch one (chain, address) once and write it out for every protocol row that lists it."""
+    first = rows[0]
+    chain = first.chain
+    address = first.contract_address
+    names = ", ".join(str(row.protocol_name) for row in rows)
+
+    url_prefix = SOURCE_URLS.get(chain.lower())
+    if not url_prefix:
+        print(f"⚠️ Skipping {names}: unsupported chain {chain}")
+        return None
+
+    loop = asyncio.get_running_loop()
+    source_paths = [f"data_raw/contracts/{row.category}/{row.protocol_name}_{row.chain}{SOL_SUFFIX}" for row in rows]
+    fresh = [is_fresh(path) for path in source_paths]
+
+    if all(fresh):
+        # Every output from a recent run is still on disk: skip the request entirely
+        print(f"♻️ Reusing {names} ({chain}) from {source_paths[0]}")
+        data = cache.get(chain, address) or {
+            "SourceCode": await loop.run_in_executor(disk, read_source, source_paths[0]),
+            "CompilerVersion": "",
+        }
+    else:
+        print(f"🔍 Fetching {names} ({chain}) ...")
+        try:
+            payload = await fetch_source(session, sem, cache, chain, address, f"{url_prefix}{address}", stream=True)
+            data = payload.get("result", [{}])[0]
+        except Exception as e:
+            print(f"⚠️ Failed for {names} ({chain}): {e}")
+            return None
 
     # Handle invalid responses
     if not isinstance(data, dict) or "SourceCode" not in data:
-        print(f"⚠️ Failed for {name} ({chain})")
-        continue
+        print(f"⚠️ Failed for {names} ({chain})")
+        return None
 
-    # Save source file
     source_code = data.get("SourceCode", "")
     verified = bool(source_code.strip())
     compiler = data.get("CompilerVersion", "")
-    source_path = f"data_raw/contracts/{category}/{name}_{chain}.sol"
-
-    os.makedirs(os.path.dirname(source_path), exist_ok=True)
-    with open(source_path, "w", encoding="utf-8") as f:
-        f.write(source_code)
-
-    # Record metadata
-    records.append({
-        "category": category,
-        "protocol_name": name,
-        "chain": chain,
-        "contract_address": address,
-        "compiler_version": compiler,
-        "verified": verified,
-        "source_file": source_path,
-        "proxy_pattern": "EIP-1967" if "implementation" in source_code.lower() else (
-            "delegatecall" if "delegatecall" in source_code.lower() else "none"
-        ),
-        "lines_of_code": len(source_code.splitlines())
-    })
-
-    print(f"✅ Saved {name} → {source_path}")
-
-    time.sleep(0.2)  # Rate limit: safe pacing
-
-# Save all results to a master CSV
-df = pd.DataFrame(records)
-df.to_csv(master_outfile, index=False)
-print(f"\n📊 All verified contract metadata saved to: {master_outfile}")
\ No newline at end of file
+
+    proxy_pattern, lines_of_code = await loop.run_in_executor(pool, parse_source, source_code)
+
+    # Re-broadcast the single response to every original row
+    for row, source_path, is_current in zip(rows, source_paths, fresh):
+        category = row.category
+        name = row.protocol_name
+
+        # Disk writes go to the writer thread so they overlap with in-flight requests
+        if not is_current:
+            await loop.run_in_executor(disk, write_source, source_path, source_code)
+
+        print(f"✅ Saved {name} → {source_path}")
+
+        # Record metadata (streamed straight to the CSV; only the event loop touches the writer)
+        writer.writerow({
+            "category": str(category),
+            "protocol_name": str(name),
+            "chain": str(row.chain),
+            "contract_address": str(row.contract_address),
+            "compiler_version": compiler,
+            "verified": verified,
+            "source_file": source_path,
+            "proxy_pattern": proxy_pattern,
+            "lines_of_code": lines_of_code
+        })
+    return True
+
+
+async def run(session, sem, cache):
+    # Load your master CSV
+    contracts = load_table(master_infile)
+
+    # Prepare output folders; every category folder once instead of a makedirs per row
+    os.makedirs("data_raw/contracts", exist_ok=True)
+    for category in contracts["category"].dropna().unique():
+        os.makedirs(f"data_raw/contracts/{category}", exist_ok=True)
+
+    rows = contracts[["category", "protocol_name", "chain", "contract_address"]].itertuples(index=False, name="R")
+
+    # The same address is often listed under several protocols or in different case: fetch each pair once
+    groups = {}
+    for row in rows:
+        groups.setdefault((str(row.chain).lower(), str(row.contract_address).lower()), []).append(row)
+    print(f"🧹 {len(contracts)} rows → {len(groups)} unique (chain, address) pairs "
+          f"({(len(contracts) - len(groups)) / max(len(contracts), 1):.0%} duplicates skipped)")
+
+    # Stream every record to Parquet, the CSV export and a crash-safe JSONL log as soon as it is ready
+    # Parsing fans out to worker processes and .sol writes queue on one writer thread;
+    # the records come back to this loop
+    with RecordWriter(master_outfile, FIELDS, SCHEMA, jsonl=True) as writer, \
+            ProcessPoolExecutor(max_workers=os.cpu_count()) as pool, ThreadPoolExecutor(max_workers=1) as disk:
+        # Concurrency is bounded by the semaphore and the per-host connector cap — no fixed sleeps
+        await asyncio.gather(*[fetch_group(session, sem, cache, pool, disk, writer, group) for group in groups.values()])
+
+    print(f"\n📊 All verified contract metadata saved to: {master_outfile.replace('.csv', '.parquet')} ({writer.count} rows)")
+
+
+if __name__ == "__main__":
+    run_standalone(run)
@@ -1,13 +1,11 @@
 # fetch_contracts_full_v2.py
-import os, requests, pandas as pd, time, json
+import os, asyncio, pandas as pd
 from urllib.parse import quote
 
-os.makedirs("data_raw/contracts/source_code", exist_ok=True)
-verified_csv = "data_raw/contracts/verified_contracts.csv"
+from explorer_client import fetch_source, load_table, parse_list_column, run_standalone, save_table, source_url_prefixes
 
-print("🌍 Fetching verified Solidity source code for protocols...")
+verified_csv = "data_raw/contracts/verified_contracts.csv"
 
-df = pd.read_csv(verified_csv)
 chains = {
     "ethereum": "https://api.etherscan.io/api",
     "bsc": "https://api.bscscan.com/api",
@@ -16,19 +14,19 @@ chains = {
 }
 
 api_key = os.getenv("ETHERSCAN_API_KEY")
-downloaded = []
+source_urls = source_url_prefixes(chains, api_key)
+
 
-for _, row in df.iterrows():
-    name = row["protocol_name"].lower().replace(" ", "-")
-    chain_list = json.loads(row["chain"].replace("'", '"')) if isinstance(row["chain"], str) else [row["chain"]]
-    for chain in chain_list:
+async def fetch_row(session, sem, cache, row):
+    downloaded = []
+    name = row.protocol_name.lower().replace(" ", "-")
+    for chain in row.chain or []:
         chain_key = str(chain).lower()
         if chain_key not in chains:
             continue
-        url = f"{chains[chain_key]}?module=contract&action=getsourcecode&address={row.get('address','')}&apikey={api_key}"
+        url = f"{source_urls[chain_key]}{row.address}"
         try:
-            r = requests.get(url, timeout=15)
-            data = r.json()
+            data = await fetch_source(session, sem, cache, chain_key, row.address, url, timeout=15)
             if "result" in data and data["result"]:
                 src = data["result"][0].get("SourceCode")
                 if src:
@@ -37,9 +35,26 @@ for _, row in df.iterrows():
                         f.write(src)
                     downloaded.append((name, chain_key))
                     print(f"✅ Saved {name} ({chain_key})")
-            time.sleep(0.2)
         except Exception as e:
             print(f"⚠️ {name} ({chain_key}) failed: {e}")
+    return downloaded
+
+
+async def run(session, sem, cache):
+    os.makedirs("data_raw/contracts/source_code", exist_ok=True)
+
+    print("🌍 Fetching verified Solidity source code for protocols...")
+
+    df = load_table(verified_csv)
+    df = df.assign(address=df.get("address", ""))
+    df["chain"] = parse_list_column(df["chain"])
+
+    results = await asyncio.gather(*[fetch_row(session, sem, cache, row) for row in df[["protocol_name", "chain", "address"]].itertuples(index=False, name="R")])
+    downloaded = [d for batch in results for d in batch]
+
+    print(f"\n✨ Downloaded {len(downloaded)} verified source files → data_raw/contracts/source_code/")
+    save_table(pd.DataFrame(downloaded, columns=["protocol","chain"]), "data_raw/contracts/download_log.csv")
+
 
-print(f"\n✨ Downloaded {len(downloaded)} verified source files → data_raw/contracts/source_code/")
-pd.DataFrame(downloaded, columns=["protocol","chain"]).to_csv("data_raw/contracts/download_log.csv", index=False)
+if __name__ == "__main__":
+    run_standalone(run)
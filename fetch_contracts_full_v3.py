@@ -1,39 +1,28 @@
 import os
+import asyncio
 import pandas as pd
-import requests
-import json
+
+from explorer_client import fetch_source, load_table, parse_list_column, run_standalone, save_table, source_url_prefixes
 
 # ========== CONFIG ==========
 API_KEY = os.getenv("ETHERSCAN_API_KEY")  # from .env
 INPUT_FILE = "data_raw/contracts/verified_contracts.csv"
 OUTPUT_FILE = "data_raw/contracts/verified_sources.csv"
+SOURCE_URL = source_url_prefixes({"ethereum": "https://api.etherscan.io/api"}, API_KEY)["ethereum"]
 
-print("🌐 Fetching verified Solidity source code for DeFi protocols...")
-
-# Load dataset
-df = pd.read_csv(INPUT_FILE)
-results = []
 
-for _, row in df.iterrows():
-    protocol = row["protocol_name"]
-    chain_raw = str(row.get("chain", "")).strip()
+async def fetch_row(session, sem, cache, row):
+    results = []
+    protocol = row.protocol_name
+    chain_list = row.chain
 
     # Handle malformed chain entries
-    if not chain_raw or chain_raw.lower() in ["nan", "none"]:
+    if not chain_list or str(chain_list[0]).lower() in ["nan", "none"]:
         print(f"⚠️ Skipping {protocol}: missing chain info")
-        continue
-
-    # Normalize chain list safely
-    try:
-        if chain_raw.startswith("["):
-            chain_list = json.loads(chain_raw.replace("'", '"'))
-        else:
-            chain_list = [chain_raw]
-    except Exception:
-        chain_list = [chain_raw]
+        return results
 
     for chain in chain_list:
-        chain = chain.strip()
+        chain = str(chain).strip()
         print(f"🔍 Fetching {protocol} on {chain}...")
 
         # For now, only pull Ethereum contracts
@@ -41,11 +30,10 @@ for _, row in df.iterrows():
             print(f"⏭️ Skipping {protocol}: non-Ethereum chain ({chain})")
             continue
 
-        url = f"https://api.etherscan.io/api?module=contract&action=getsourcecode&address={row.get('contract_address','')}&apikey={API_KEY}"
+        url = f"{SOURCE_URL}{row.contract_address}"
 
         try:
-            r = requests.get(url, timeout=10)
-            data = r.json()
+            data = await fetch_source(session, sem, cache, "ethereum", row.contract_address, url, timeout=10)
             if data.get("status") == "1" and data.get("result"):
                 contract_data = data["result"][0]
                 results.append({
@@ -60,10 +48,30 @@ for _, row in df.iterrows():
                 print(f"⚠️ No verified source for {protocol}")
         except Exception as e:
             print(f"❌ Error fetching {protocol}: {e}")
+    return results
+
+
+async def run(session, sem, cache):
+    print("🌐 Fetching verified Solidity source code for DeFi protocols...")
+
+    # Load dataset
+    df = load_table(INPUT_FILE)
+    df = df.assign(chain=df.get("chain", ""), contract_address=df.get("contract_address", ""))
+    df = df.dropna(subset=["contract_address"])
+
+    # Normalize chain lists in one pass instead of per row
+    df["chain"] = parse_list_column(df["chain"])
+
+    batches = await asyncio.gather(*[fetch_row(session, sem, cache, row) for row in df[["protocol_name", "chain", "contract_address"]].itertuples(index=False, name="R")])
+    results = [r for batch in batches for r in batch]
+
+    # Save results
+    if results:
+        save_table(pd.DataFrame(results), OUTPUT_FILE)
+        print(f"\n✅ Saved verified sources → {OUTPUT_FILE} ({len(results)} entries)")
+    else:
+        print("\n⚠️ No verified contracts found or fetched.")
+
 
-# Save results
-if results:
-    pd.DataFrame(results).to_csv(OUTPUT_FILE, index=False)
-    print(f"\n✅ Saved verified sources → {OUTPUT_FILE} ({len(results)} entries)")
-else:
-    print("\n⚠️ No verified contracts found or fetched.")
+if __name__ == "__main__":
+    run_standalone(run)
@@ -1,9 +1,9 @@
 # fetch_contracts_full_v4.py
 import os
-import json
+import asyncio
 import pandas as pd
-import requests
-from time import sleep
+
+from explorer_client import fetch_source, load_table, parse_list_column, run_standalone, save_table, source_url_prefixes
 
 #  Extended mapping of Etherscan-style APIs for EVM-compatible chains
 ETHERSCAN_ENDPOINTS = {
@@ -32,28 +32,16 @@ API_KEYS = {
     "gnosis": os.getenv("GNOSIS_API_KEY", ""),
     "rsk": os.getenv("RSKSCAN_API_KEY", "")
 }
+SOURCE_URLS = source_url_prefixes(ETHERSCAN_ENDPOINTS, API_KEYS)
 
-# 📦 Load your list of DeFi protocols
-df = pd.read_csv("data_raw/contracts/verified_contracts.csv")
-
-results = []
-print("🌐 Fetching verified Solidity contract sources (multi-chain mode)...")
-
-for _, row in df.iterrows():
-    protocol = str(row["protocol_name"])
-    chains_raw = str(row["chain"])
-    addr = str(row.get("contract_address", "")).strip()
-
-    # Handle multi-chain list safely
-    try:
-        chain_list = json.loads(chains_raw.replace("'", '"')) if "[" in chains_raw else [chains_raw]
-    except Exception:
-        chain_list = [chains_raw]
 
-    found = False
+async def fetch_row(session, sem, cache, row):
+    protocol = str(row.protocol_name)
+    addr = str(row.contract_address).strip()
 
-    for chain in chain_list:
-        chain = chain.strip().lower()
+    # Chains are tried in order and the first verified hit wins, so they stay sequential per row
+    for chain in row.chain or []:
+        chain = str(chain).strip().lower()
         if not chain:
             continue
 
@@ -61,55 +49,64 @@ for _, row in df.iterrows():
             print(f"⚠️ Skipping {protocol} (unsupported or non-EVM chain: {chain})")
             continue
 
-        url = ETHERSCAN_ENDPOINTS[chain]
-        key = API_KEYS.get(chain, "")
+        url = f"{SOURCE_URLS[chain]}{addr}"
 
         print(f"🔍 Fetching verified source for {protocol} on {chain.title()}...")
-        params = {
-            "module": "contract",
-            "action": "getsourcecode",
-            "address": addr,
-            "apikey": key
-        }
-
         try:
-            r = requests.get(url, params=params, timeout=10)
-            r.raise_for_status()
-            data = r.json()
+            data = await fetch_source(session, sem, cache, chain, addr, url, timeout=10, stream=True)
 
             if data.get("status") == "1" and data["result"]:
                 source = data["result"][0].get("SourceCode", "")
                 if source:
                     folder = f"data_raw/contracts/code/{protocol.lower().replace(' ', '_')}/"
-                    os.makedirs(folder, exist_ok=True)
                     filepath = os.path.join(folder, f"{chain}.sol")
-                    with open(filepath, "w", encoding="utf-8") as f:
+                    with open(filepath, "w", encoding="utf-8", buffering=1 << 16) as f:
                         f.write(source)
                     print(f"✅ Saved source: {filepath}")
-                    results.append({
+                    return {
                         "protocol_name": protocol,
                         "chain": chain,
                         "contract_address": addr,
                         "source_path": filepath
-                    })
-                    found = True
-                    break
+                    }
                 else:
                     print(f"⚠️ No verified source found for {protocol} on {chain.title()}.")
             else:
                 print(f"❌ No verified source (API status {data.get('status')}) for {protocol} on {chain.title()}.")
         except Exception as e:
             print(f"💥 Error fetching {protocol} ({chain}): {e}")
-        sleep(1.5)
-
-    if not found:
-        print(f"🚫 No verified contract found for {protocol} on any chain.")
-
-# 💾 Save the registry of successful downloads
-if results:
-    df_out = pd.DataFrame(results)
-    out_path = "data_raw/contracts/contract_registry_v4.csv"
-    df_out.to_csv(out_path, index=False)
-    print(f"\n💾 Saved registry → {out_path} ({len(df_out)} entries)")
-else:
-    print("\n⚠️ No verified contracts were fetched.")
+
+    print(f"🚫 No verified contract found for {protocol} on any chain.")
+    return None
+
+
+async def run(session, sem, cache):
+    # 📦 Load your list of DeFi protocols
+    df = load_table("data_raw/contracts/verified_contracts.csv")
+    df = df.assign(contract_address=df.get("contract_address", ""))
+    df = df.dropna(subset=["contract_address"])
+
+    # Handle multi-chain lists in one pass instead of per row
+    df["chain"] = parse_list_column(df["chain"])
+
+    print("🌐 Fetching verified Solidity contract sources (multi-chain mode)...")
+
+    # Create every protocol folder once instead of a makedirs per saved source
+    for protocol in df["protocol_name"].astype(str).unique():
+        os.makedirs(f"data_raw/contracts/code/{protocol.lower().replace(' ', '_')}/", exist_ok=True)
+
+    found = await asyncio.gather(*[fetch_row(session, sem, cache, row) for row in df[["protocol_name", "chain", "contract_address"]].itertuples(index=False, name="R")])
+    results = [r for r in found if r]
+
+    # 💾 Save the registry of successful downloads
+    if results:
+        df_out = pd.DataFrame(results)
+        out_path = "data_raw/contracts/contract_registry_v4.csv"
+        save_table(df_out, out_path)
+        print(f"\n💾 Saved registry → {out_path} ({len(df_out)} entries)")
+    else:
+        print("\n⚠️ No verified contracts were fetched.")
+
+
+if __name__ == "__main__":
+    run_standalone(run)
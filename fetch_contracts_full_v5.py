@@ -1,6 +1,7 @@
-import requests
+import asyncio
 import pandas as pd
-import time
+
+from explorer_client import fetch_source, load_table, run_standalone, save_table, source_url_prefixes
 
 # 🌍 Multi-chain API endpoints
 EXPLORERS = {
@@ -14,17 +15,12 @@ EXPLORERS = {
 }
 
 API_KEY = "YourAPIKeyHere"  # 🔑 You can reuse your Etherscan key for all explorers
+SOURCE_URLS = source_url_prefixes(EXPLORERS, API_KEY)
 
-# 📂 Input: verified_contracts.csv from Step 2C
-df = pd.read_csv("data_raw/contracts/verified_contracts.csv")
-
-results = []
-print("🌐 Fetching verified Solidity source code from multi-chain explorers...")
 
-for _, row in df.iterrows():
-    protocol = row["protocol_name"]
-    chain_hint = str(row["chain"]).lower()
-    found = False
+async def fetch_row(session, sem, cache, row):
+    protocol = row.protocol_name
+    chain_hint = str(row.chain).lower()
 
     for chain, api_url in EXPLORERS.items():
         if chain not in chain_hint and chain_hint not in chain:
@@ -37,38 +33,47 @@ for _, row in df.iterrows():
             address = None
 
             # Try fetching contract source
-            url = f"{api_url}?module=contract&action=getsourcecode&address={address}&apikey={API_KEY}"
-            resp = requests.get(url, timeout=15)
-            data = resp.json()
+            url = f"{SOURCE_URLS[chain]}{address}"
+            data = await fetch_source(session, sem, cache, chain, address, url, timeout=15)
 
             if data.get("status") == "1" and len(data["result"]) > 0:
                 contract = data["result"][0]
-                results.append({
+                print(f"✅ Verified contract found for {protocol} on {chain.title()}")
+                return {
                     "protocol_name": protocol,
                     "chain": chain,
                     "address": address,
                     "contract_name": contract.get("ContractName", ""),
                     "compiler": contract.get("CompilerVersion", ""),
                     "verified": True
-                })
-                print(f"✅ Verified contract found for {protocol} on {chain.title()}")
-                found = True
-                break
+                }
             else:
                 print(f"⚠️ No verified source for {protocol} on {chain.title()}")
 
         except Exception as e:
             print(f"❌ Error fetching {protocol} on {chain.title()}: {e}")
 
-        time.sleep(0.5)
+    print(f"🚫 No verified contract found for {protocol} on any chain.")
+    return None
+
+
+async def run(session, sem, cache):
+    # 📂 Input: verified_contracts.csv from Step 2C
+    df = load_table("data_raw/contracts/verified_contracts.csv")
+
+    print("🌐 Fetching verified Solidity source code from multi-chain explorers...")
+
+    found = await asyncio.gather(*[fetch_row(session, sem, cache, row) for row in df[["protocol_name", "chain"]].itertuples(index=False, name="R")])
+    results = [r for r in found if r]
+
+    # 💾 Save results
+    if results:
+        df_out = pd.DataFrame(results)
+        save_table(df_out, "data_raw/contracts/verified_contracts_multichain.csv")
+        print(f"\n✅ Saved multi-chain verified contracts → data_raw/contracts/verified_contracts_multichain.csv ({len(df_out)} entries)")
+    else:
+        print("\n⚠️ No verified contracts found on any chain.")
 
-    if not found:
-        print(f"🚫 No verified contract found for {protocol} on any chain.")
 
-# 💾 Save results
-if results:
-    df_out = pd.DataFrame(results)
-    df_out.to_csv("data_raw/contracts/verified_contracts_multichain.csv", index=False)
-    print(f"\n✅ Saved multi-chain verified contracts → data_raw/contracts/verified_contracts_multichain.csv ({len(df_out)} entries)")
-else:
-    print("\n⚠️ No verified contracts found on any chain.")
+if __name__ == "__main__":
+    run_standalone(run)
@@ -1,25 +1,12 @@
-import pandas as pd, requests, json, os, time
+import pandas as pd, os, asyncio
+
+from explorer_client import fetch_source, load_table, parse_list_column, run_standalone, save_table, source_url_prefixes
 
 # ================================================
 #  Fetch verified Solidity source code (multi-chain)
 # ================================================
-print("🌍 Fetching verified Solidity source code using resolved addresses...")
-
-# --- Load your address file
-addr_df = pd.read_csv("data_raw/contracts/resolved_addresses.csv")
-
-# --- Detect columns dynamically
-if "chains" in addr_df.columns and "addresses" in addr_df.columns:
-    print("✅ Detected chain column: 'chains'")
-else:
-    raise ValueError("No valid chain/address columns found in resolved_addresses.csv")
-
-# --- Create output directory
-os.makedirs("data_raw/contracts/", exist_ok=True)
 out_file = "data_raw/contracts/fetched_contract_sources.csv"
 
-results = []
-
 # --- API keys for multiple explorers
 EXPLORERS = {
     "ethereum": "https://api.etherscan.io/api",
@@ -33,24 +20,21 @@ EXPLORERS = {
 
 # --- Replace with your own API key(s)
 API_KEY = os.getenv("ETHERSCAN_API_KEY", "YourEtherscanKeyHere")
+SOURCE_URLS = source_url_prefixes(EXPLORERS, API_KEY)
 
-# --- Iterate over all protocols
-for _, row in addr_df.iterrows():
-    protocol = row["protocol_name"]
 
-    try:
-        # Parse JSON-like strings safely
-        chains = json.loads(row["chains"].replace("'", '"'))
-        addresses = json.loads(row["addresses"].replace("'", '"'))
-    except Exception as e:
-        print(f"⚠️ Could not parse row for {protocol}: {e}")
-        continue
+# --- Fetch one protocol (addresses tried in order until one is verified)
+async def fetch_row(session, sem, cache, row):
+    protocol = row.protocol_name
+
+    addresses = row.addresses
+    if row.chains is None or addresses is None:
+        print(f"⚠️ Could not parse row for {protocol}")
+        return None
 
     if not isinstance(addresses, list) or len(addresses) == 0:
         print(f"⚠️ Skipping {protocol}: no valid addresses.")
-        continue
-
-    found_any = False
+        return None
 
     for entry in addresses:
         try:
@@ -65,33 +49,56 @@ for _, row in addr_df.iterrows():
             print(f"⚠️ Skipping {protocol} ({chain_hint}): unsupported chain.")
             continue
 
-        url = f"{EXPLORERS[chain_hint]}?module=contract&action=getsourcecode&address={addr}&apikey={API_KEY}"
+        url = f"{SOURCE_URLS[chain_hint]}{addr}"
         try:
-            resp = requests.get(url, timeout=20)
-            data = resp.json()
+            data = await fetch_source(session, sem, cache, chain_hint, addr, url, timeout=20)
             if "result" in data and data["result"]:
                 code = data["result"][0].get("SourceCode", "")
                 if code:
                     print(f"✅ {protocol} ({chain_hint}) source found — {len(code)} chars")
-                    results.append({
+                    return {
                         "protocol_name": protocol,
                         "chain": chain_hint,
                         "address": addr,
                         "source_len": len(code)
-                    })
-                    found_any = True
-                    break
+                    }
             else:
                 print(f"❌ {protocol} ({chain_hint}): no verified source.")
         except Exception as e:
             print(f"❌ {protocol} ({chain_hint}): request error: {e}")
             continue
 
-    if not found_any:
-        print(f"⚠️ No verified contract found for {protocol} on any chain.")
+    print(f"⚠️ No verified contract found for {protocol} on any chain.")
+    return None
+
+
+# --- Iterate over all protocols
+async def run(session, sem, cache):
+    print("🌍 Fetching verified Solidity source code using resolved addresses...")
+
+    # --- Load your address file
+    addr_df = load_table("data_raw/contracts/resolved_addresses.csv")
+
+    # --- Detect columns dynamically
+    if "chains" in addr_df.columns and "addresses" in addr_df.columns:
+        print("✅ Detected chain column: 'chains'")
+    else:
+        raise ValueError("No valid chain/address columns found in resolved_addresses.csv")
+
+    # --- Parse JSON-like list columns once, up front
+    for col in ("chains", "addresses"):
+        addr_df[col] = parse_list_column(addr_df[col])
+
+    # --- Create output directory
+    os.makedirs("data_raw/contracts/", exist_ok=True)
+
+    found = await asyncio.gather(*[fetch_row(session, sem, cache, row) for row in addr_df[["protocol_name", "chains", "addresses"]].itertuples(index=False, name="R")])
+    results = [r for r in found if r]
+
+    # --- Save output
+    save_table(pd.DataFrame(results), out_file)
+    print(f"💾 Saved {len(results)} verified contracts → {out_file}")
 
-    time.sleep(0.3)
 
-# --- Save output
-pd.DataFrame(results).to_csv(out_file, index=False)
-print(f"💾 Saved {len(results)} verified contracts → {out_file}")
+if __name__ == "__main__":
+    run_standalone(run)
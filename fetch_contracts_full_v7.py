@@ -1,7 +1,7 @@
 import pandas as pd
-import requests
-import json
-import time
+import asyncio
+
+from explorer_client import fetch_source, load_table, parse_list_column, run_standalone, save_table, source_url_prefixes
 
 # -----------------------------
 # Explorer API endpoints
@@ -18,80 +18,87 @@ EXPLORERS = {
 
 # Use your own Etherscan API key
 API_KEY = "YourAPIKeyHere"
+SOURCE_URLS = source_url_prefixes(EXPLORERS, API_KEY)
+
 
 # -----------------------------
 # Load address registry
 # -----------------------------
-df = pd.read_csv("data_raw/contracts/resolved_addresses.csv")
+def load_jobs():
+    df = load_table("data_raw/contracts/resolved_addresses.csv")
 
-# Normalize chain column
-if "chain" not in df.columns:
-    if "chains" in df.columns:
-        df = df.rename(columns={"chains": "chain"})
-print(f"✅ Detected chain column: '{[c for c in df.columns if 'chain' in c][0]}'")
+    # Normalize chain column
+    if "chain" not in df.columns:
+        if "chains" in df.columns:
+            df = df.rename(columns={"chains": "chain"})
+    print(f"✅ Detected chain column: '{[c for c in df.columns if 'chain' in c][0]}'")
 
-results = []
+    # Parse list-literal columns once, up front
+    for col in ("chain", "addresses"):
+        df[col] = parse_list_column(df[col])
 
-# -----------------------------
-# Iterate through protocols
-# -----------------------------
-for _, row in df.iterrows():
-    name = row["protocol_name"]
-    chains = row["chain"]
+    # Build the (protocol, chain, address) work list
+    jobs = []
+    for row in df[["protocol_name", "chain", "addresses"]].itertuples(index=False, name="R"):
+        name = row.protocol_name
+        chains = row.chain or []
+        addresses = row.addresses
 
-    try:
-        chains = json.loads(chains.replace("'", '"')) if isinstance(chains, str) else []
-    except:
-        chains = [chains] if isinstance(chains, str) else []
+        if addresses is None:
+            print(f"⚠️ Skipping {name}: address parse error")
+            continue
 
-    addresses = []
-    try:
-        addresses = json.loads(row["addresses"].replace("'", '"'))
-    except Exception as e:
-        print(f"⚠️ Skipping {name}: address parse error → {e}")
-        continue
+        print(f"\n🔍 Fetching verified contracts for {name}...")
 
-    print(f"\n🔍 Fetching verified contracts for {name}...")
+        for chain, addr_list in zip(chains, addresses):
+            chain = chain.lower()
+            if chain not in EXPLORERS:
+                print(f"⏩ Skipping {name} ({chain}): unsupported chain.")
+                continue
 
-    for chain, addr_list in zip(chains, addresses):
-        chain = chain.lower()
-        if chain not in EXPLORERS:
-            print(f"⏩ Skipping {name} ({chain}): unsupported chain.")
-            continue
+            for addr in addr_list if isinstance(addr_list, list) else [addr_list]:
+                jobs.append((name, chain, addr))
+    return jobs
+
+
+async def fetch_address(session, sem, cache, name, chain, addr):
+    url = f"{SOURCE_URLS[chain]}{addr}"
+    try:
+        data = await fetch_source(session, sem, cache, chain, addr, url, timeout=20)
+        if "result" in data and len(data["result"]) > 0:
+            src = data["result"][0].get("SourceCode", "")
+            if src:
+                print(f"✅ Saved {name} contract from {chain}.")
+                return {
+                    "protocol": name,
+                    "chain": chain,
+                    "address": addr,
+                    "source_code": src
+                }
+            else:
+                print(f"⚠️ {name} ({chain}): verified but empty source.")
+        else:
+            print(f"❌ No verified source for {name} ({chain}).")
+    except Exception as e:
+        print(f"❌ Error fetching {name} ({chain}): {e}")
+    return None
 
-        api = EXPLORERS[chain]
-        for addr in addr_list if isinstance(addr_list, list) else [addr_list]:
-            params = {
-                "module": "contract",
-                "action": "getsourcecode",
-                "address": addr,
-                "apikey": API_KEY
-            }
-            try:
-                r = requests.get(api, params=params, timeout=20)
-                data = r.json()
-                if "result" in data and len(data["result"]) > 0:
-                    src = data["result"][0].get("SourceCode", "")
-                    if src:
-                        results.append({
-                            "protocol": name,
-                            "chain": chain,
-                            "address": addr,
-                            "source_code": src
-                        })
-                        print(f"✅ Saved {name} contract from {chain}.")
-                    else:
-                        print(f"⚠️ {name} ({chain}): verified but empty source.")
-                else:
-                    print(f"❌ No verified source for {name} ({chain}).")
-            except Exception as e:
-                print(f"❌ Error fetching {name} ({chain}): {e}")
-
-            time.sleep(0.25)  # Rate limit buffer
 
 # -----------------------------
-# Save results
+# Fetch concurrently
 # -----------------------------
-out_path = "data_raw/contracts/fetched_contract_sources.csv"
-pd.DataFrame(results).to_csv(out_path, index=False)
-print(f"\n💾 Saved {len(results)} verified contracts → {out_path}")
+async def run(session, sem, cache):
+    jobs = load_jobs()
+    found = await asyncio.gather(*[fetch_address(session, sem, cache, *job) for job in jobs])
+    results = [r for r in found if r]
+
+    # -----------------------------
+    # Save results
+    # -----------------------------
+    out_path = "data_raw/contracts/fetched_contract_sources.csv"
+    save_table(pd.DataFrame(results), out_path)
+    print(f"\n💾 Saved {len(results)} verified contracts → {out_path}")
+
+
+if __name__ == "__main__":
+    run_standalone(run)
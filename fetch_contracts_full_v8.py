@@ -1,35 +1,7 @@
 import pandas as pd
-import requests
-import json
-import time
+import asyncio
 
-print("🌐 Fetching verified Solidity sources across major explorers (v8)...")
-
-# Load dataset
-df = pd.read_csv("data_raw/contracts/resolved_addresses.csv")
-
-# Normalize potential naming issues
-if "chain" not in df.columns and "chains" in df.columns:
-    df = df.rename(columns={"chains": "chain"})
-
-def safe_json_parse(value):
-    """Parse strings that look like lists (['...']) or JSON arrays."""
-    if isinstance(value, list):
-        return value
-    if not isinstance(value, str):
-        return []
-    try:
-        value = value.replace("'", '"')
-        parsed = json.loads(value)
-        if isinstance(parsed, list):
-            return parsed
-        return [parsed]
-    except:
-        return [value]
-
-# Apply robust parsing
-df["chain"] = df["chain"].apply(safe_json_parse)
-df["addresses"] = df["addresses"].apply(safe_json_parse)
+from explorer_client import fetch_source, load_table, parse_list_column, run_standalone, save_table, source_url_prefixes
 
 # Supported explorers (EVM)
 EXPLORERS = {
@@ -43,56 +15,87 @@ EXPLORERS = {
 }
 
 API_KEY = "YourApiKeyToken"
+SOURCE_URLS = source_url_prefixes(EXPLORERS, API_KEY)
 
-# Fetch logic
-records = []
 
-for _, row in df.iterrows():
-    name = row.get("protocol_name", "Unknown")
-    chains = row.get("chain", [])
-    addrs = row.get("addresses", [])
+def load_jobs():
+    # Load dataset
+    df = load_table("data_raw/contracts/resolved_addresses.csv")
+
+    # Normalize potential naming issues
+    if "chain" not in df.columns and "chains" in df.columns:
+        df = df.rename(columns={"chains": "chain"})
+
+    # Parse list-literal columns in one bulk pass
+    df["chain"] = parse_list_column(df["chain"])
+    df["addresses"] = parse_list_column(df["addresses"])
+
+    # Build the aligned (protocol, chain, address) work list
+    jobs = []
 
-    if not chains or not addrs:
-        print(f"⚠️ Skipping {name}: no valid chain/address data.")
-        continue
+    df = df.assign(protocol_name=df.get("protocol_name", "Unknown"))
 
-    # Align lists
-    for idx in range(min(len(chains), len(addrs))):
-        chain = str(chains[idx]).lower()
-        addr = str(addrs[idx])
+    for row in df[["protocol_name", "chain", "addresses"]].itertuples(index=False, name="R"):
+        name = row.protocol_name
+        chains = row.chain
+        addrs = row.addresses
 
-        if chain not in EXPLORERS:
-            print(f"⚠️ Skipping {name} ({chain}): unsupported chain.")
+        if not chains or not addrs:
+            print(f"⚠️ Skipping {name}: no valid chain/address data.")
             continue
 
-        url = f"{EXPLORERS[chain]}?module=contract&action=getsourcecode&address={addr}&apikey={API_KEY}"
-        print(f"🔍 Fetching verified contract for {name} on {chain} ({addr[:10]}...)")
-
-        try:
-            r = requests.get(url, timeout=15)
-            data = r.json()
-            result = data.get("result", [])
-            if isinstance(result, list) and len(result) > 0:
-                code = result[0].get("SourceCode", "")
-                comp = result[0].get("CompilerVersion", "")
-                records.append({
-                    "protocol_name": name,
-                    "chain": chain,
-                    "address": addr,
-                    "compiler": comp,
-                    "source_code": code
-                })
-                print(f"✅ Verified contract found for {name} ({chain})")
-            else:
-                print(f"❌ No verified contract for {name} ({chain})")
-
-        except Exception as e:
-            print(f"💥 Error fetching {name} ({chain}): {e}")
-
-        time.sleep(1.2)
-
-# Save
-out_df = pd.DataFrame(records)
-out_path = "data_raw/contracts/fetched_contract_sources.csv"
-out_df.to_csv(out_path, index=False)
-print(f"💾 Saved {len(out_df)} verified contracts → {out_path}")
+        # Align lists
+        for idx in range(min(len(chains), len(addrs))):
+            chain = str(chains[idx]).lower()
+            addr = str(addrs[idx])
+
+            if chain not in EXPLORERS:
+                print(f"⚠️ Skipping {name} ({chain}): unsupported chain.")
+                continue
+
+            jobs.append((name, chain, addr))
+    return jobs
+
+
+# Fetch logic
+async def fetch_address(session, sem, cache, name, chain, addr):
+    url = f"{SOURCE_URLS[chain]}{addr}"
+    print(f"🔍 Fetching verified contract for {name} on {chain} ({addr[:10]}...)")
+
+    try:
+        data = await fetch_source(session, sem, cache, chain, addr, url, timeout=15)
+        result = data.get("result", [])
+        if isinstance(result, list) and len(result) > 0:
+            code = result[0].get("SourceCode", "")
+            comp = result[0].get("CompilerVersion", "")
+            print(f"✅ Verified contract found for {name} ({chain})")
+            return {
+                "protocol_name": name,
+                "chain": chain,
+                "address": addr,
+                "compiler": comp,
+                "source_code": code
+            }
+        else:
+            print(f"❌ No verified contract for {name} ({chain})")
+
+    except Exception as e:
+        print(f"💥 Error fetching {name} ({chain}): {e}")
+    return None
+
+
+async def run(session, sem, cache):
+    print("🌐 Fetching verified Solidity sources across major explorers (v8)...")
+    jobs = load_jobs()
+    found = await asyncio.gather(*[fetch_address(session, sem, cache, *job) for job in jobs])
+    records = [r for r in found if r]
+
+    # Save
+    out_df = pd.DataFrame(records)
+    out_path = "data_raw/contracts/fetched_contract_sources.csv"
+    save_table(out_df, out_path)
+    print(f"💾 Saved {len(out_df)} verified contracts → {out_path}")
+
+
+if __name__ == "__main__":
+    run_standalone(run)
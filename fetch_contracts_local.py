@@ -8,14 +8,32 @@ import time
 import csv
 import asyncio
 import logging
+import heapq
 import subprocess
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
 import aiohttp
-import pandas as pd
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+from explorer_client import CreditSemaphore
+from verified_cache import CHAIN_IDS, VerifiedCache
+
 # ────────────────────────────────────────────────────────────────────────────────
 # Paths + ENV
 # ────────────────────────────────────────────────────────────────────────────────
@@ -47,7 +65,13 @@ ALLOW_CATEGORIES = _raw_cats
 
 # Output files
 CONTRACTS_CSV_LOCAL = DATA_RAW / "contracts" / "verified_contracts_local.csv"
+CONTRACTS_FIELDS = ["slug", "address", "guess", "category", "tvl", "chains", "scrape_ts"]
+# Rows, verified-cache and checkpoint lines are flushed together every FLUSH_EVERY slugs
+FLUSH_EVERY = 25
 CHECKPOINT = OUT_DIR / "checkpoints_contracts_local.json"
+# Finished slugs are appended here one line each and folded into CHECKPOINT every COMPACT_EVERY slugs
+CHECKPOINT_LOG = OUT_DIR / "checkpoints_contracts_local.jsonl"
+COMPACT_EVERY = 1000
 
 log_file_path = LOGS / "fetch_contracts_local.log"
 logging.basicConfig(
@@ -62,21 +86,12 @@ logging.basicConfig(
 ADDR_RE = re.compile(r"0x[a-fA-F0-9]{40}")
 ZERO_ADDR = "0x0000000000000000000000000000000000000000"
 
-# EVM chain IDs supported by Etherscan v1 style (via chainid parameter on some setups)
-CHAIN_IDS: Dict[str, int] = {
-    "ethereum": 1,
-    "arbitrum": 42161,
-    "base": 8453,
-    "optimism": 10,
-    "polygon": 137,
-    "bsc": 56,
-    "avalanche": 43114,
-    "fantom": 250,
-    "gnosis": 100,
-    "linea": 59144,
-    "scroll": 534352,
-    "blast": 81457,
-}
+# Hyperscan's compiled DFA scans multi-MB rg output far faster than `re`; optional.
+if hyperscan is not None:
+    ADDR_DB = hyperscan.Database()
+    ADDR_DB.compile(expressions=[ADDR_RE.pattern.encode()], ids=[0], flags=[hyperscan.HS_FLAG_SOM_LEFTMOST])
+else:
+    ADDR_DB = None
 
 # ────────────────────────────────────────────────────────────────────────────────
 # Helpers
@@ -92,80 +107,106 @@ def ensure_repo(local_path: Path, git_url: str, name: str) -> None:
     logging.info(f"⬇️ Cloning {name}…")
     subprocess.run(["git", "clone", "--depth", "1", git_url, str(local_path)], check=True)
 
-class RateLimiter:
-    def __init__(self, rps: float):
-        self.gap = 1.0 / max(rps, 0.1)
-        self._t = 0.0
-        self._lock = asyncio.Lock()
-
-    async def wait(self):
-        async with self._lock:
-            now = time.monotonic()
-            sleep = max(0.0, self._t + self.gap - now)
-            if sleep > 0:
-                await asyncio.sleep(sleep)
-            self._t = time.monotonic()
-
-def append_rows_csv(path: Path, rows: List[dict]) -> None:
-    """Append rows immediately so progress is never lost on Ctrl+C."""
-    if not rows:
-        return
-    path.parent.mkdir(parents=True, exist_ok=True)
-    file_exists = path.exists()
-    with path.open("a", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
-        if not file_exists:
-            w.writeheader()
-        w.writerows(rows)
-        f.flush()
-
 def load_checkpoint() -> dict:
+    state = {"done": []}
     if CHECKPOINT.exists():
         try:
-            return json.loads(CHECKPOINT.read_text(encoding="utf-8"))
+            state = json.loads(CHECKPOINT.read_text(encoding="utf-8"))
         except Exception:
-            return {"done": []}
-    return {"done": []}
+            state = {"done": []}
+    if CHECKPOINT_LOG.exists():
+        done = set(state.get("done", []))
+        with CHECKPOINT_LOG.open("r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    done.add(json.loads(line)["slug"])
+                except Exception:
+                    continue  # torn last line from a killed run
+        state["done"] = sorted(done)
+    return state
+
+def append_checkpoint(slugs: List[str]) -> None:
+    """One appended line per slug instead of rewriting the whole done list."""
+    if not slugs:
+        return
+    ts = int(time.time())
+    with CHECKPOINT_LOG.open("a", encoding="utf-8") as f:
+        f.writelines(json.dumps({"slug": s, "ts": ts}, ensure_ascii=False) + "\n" for s in slugs)
 
 def save_checkpoint(state: dict) -> None:
+    if orjson is not None:
+        CHECKPOINT.write_bytes(orjson.dumps(state, option=orjson.OPT_INDENT_2))
+        return
     CHECKPOINT.write_text(json.dumps(state, ensure_ascii=False, indent=2), encoding="utf-8")
 
-def mine_addresses_from_dir(repo_path: Path, rel_dir: Path) -> List[str]:
-    """Scan a specific directory for EVM addresses using ripgrep."""
-    d = repo_path / rel_dir
-    if not d.exists():
-        return []
+def compact_checkpoint(state: dict, done: set) -> None:
+    """Fold the append log into the JSON checkpoint and start a fresh log."""
+    state["done"] = sorted(done)
+    save_checkpoint(state)
+    CHECKPOINT_LOG.unlink(missing_ok=True)
+
+def extract_addresses(text: str) -> set:
+    """Lower-cased, non-zero EVM addresses found in text."""
+    if ADDR_DB is not None:
+        data = text.encode("utf-8", "ignore")
+        found = set()
+
+        def on_match(_id, start, end, _flags, _ctx):
+            found.add(data[start:end].decode().lower())
+
+        ADDR_DB.scan(data, match_event_handler=on_match)
+    else:
+        found = {m.group(0).lower() for m in ADDR_RE.finditer(text)}
+    found.discard(ZERO_ADDR)
+    return found
+
+def index_addresses_by_slug(repo_path: Path, rel_root: Path) -> Dict[str, set]:
+    """
+    One ripgrep pass over rel_root (e.g. projects/), grouping every EVM address by the
+    <slug> folder directly beneath it — replaces a separate rg walk per slug.
+    """
+    index: Dict[str, set] = {}
+    if not (repo_path / rel_root).exists():
+        return index
     try:
-        out = run(["rg", "-n", "0x[a-fA-F0-9]{40}", str(d)], cwd=repo_path)
+        out = run(["rg", "-o", "-H", "-N", "--no-heading", "0x[a-fA-F0-9]{40}", str(rel_root)], cwd=repo_path)
     except Exception:
-        return []
-    addrs = {m.group(0).lower() for m in ADDR_RE.finditer(out)}
-    addrs.discard(ZERO_ADDR)
-    return list(addrs)
-
-def mine_addresses_for_slug(adapters_repo: Path, yield_repo: Path, slug: str) -> List[str]:
-    """High-recall mining: scan canonical folders first, fallback to slug grep."""
-    bag = set()
-
-    # DefiLlama-Adapters: projects/<slug>/
-    for a in mine_addresses_from_dir(adapters_repo, Path("projects") / slug):
-        bag.add(a)
-
-    # yield-server: src/adaptors/<slug>/ (sometimes)
-    for a in mine_addresses_from_dir(yield_repo, Path("src") / "adaptors" / slug):
-        bag.add(a)
-
-    # fallback: grep slug in repos, then extract addresses from matched output
+        return index
+    depth = len(rel_root.parts)
+    for line in out.splitlines():
+        path, _, addr = line.rpartition(":")
+        parts = Path(path).parts
+        if len(parts) <= depth + 1:
+            continue  # a file directly under rel_root, not inside a <slug>/ folder
+        addr = addr.lower()
+        if addr != ZERO_ADDR:
+            index.setdefault(parts[depth], set()).add(addr)
+    return index
+
+def build_slug_index(adapters_repo: Path, yield_repo: Path) -> Dict[str, set]:
+    """DefiLlama-Adapters projects/<slug>/ and yield-server src/adaptors/<slug>/, merged."""
+    slug_index = index_addresses_by_slug(adapters_repo, Path("projects"))
+    for slug, addrs in index_addresses_by_slug(yield_repo, Path("src") / "adaptors").items():
+        slug_index.setdefault(slug, set()).update(addrs)
+    return slug_index
+
+def mine_addresses_for_slug(adapters_repo: Path, yield_repo: Path, slug: str, slug_index: Dict[str, set]) -> List[str]:
+    """High-recall mining: canonical folders first (pre-indexed), fallback to slug grep."""
+    bag = set(slug_index.get(slug, ()))
+
+    # fallback: grep slug in repos, then extract addresses from matched output.
+    # Slugs are literals: -F skips the regex engine, and --max-columns keeps
+    # minified bundles from dominating the scan.
     if not bag:
         for repo_path in [adapters_repo, yield_repo]:
             try:
-                out = run(["rg", "-n", "-i", slug, str(repo_path)], cwd=repo_path)
+                out = run(
+                    ["rg", "-F", "-i", "-N", "--no-heading", "--max-columns", "500", "--threads", "0", "--", slug, str(repo_path)],
+                    cwd=repo_path,
+                )
             except Exception:
                 continue
-            for m in ADDR_RE.finditer(out):
-                addr = m.group(0).lower()
-                if addr != ZERO_ADDR:
-                    bag.add(addr)
+            bag.update(extract_addresses(out))
 
     return list(bag)
 
@@ -174,12 +215,15 @@ async def http_get_json(session: aiohttp.ClientSession, url: str, *, params: dic
         async with session.get(url, params=params, timeout=45) as r:
             if r.status != 200:
                 return None
-            return await r.json()
+            # DeFiLlama /protocols is several MB; orjson parses it much faster than stdlib json
+            return await r.json(loads=orjson.loads if orjson is not None else json.loads)
     except Exception:
         return None
 
-async def is_verified(session: aiohttp.ClientSession, limiter: RateLimiter, address: str, chain_id: int) -> bool:
-    await limiter.wait()
+async def is_verified(session: aiohttp.ClientSession, budget: CreditSemaphore, cache: VerifiedCache, address: str, chain_id: int) -> bool:
+    cached = cache.get(address, chain_id)
+    if cached is not None:
+        return cached
     params = {
         "module": "contract",
         "action": "getsourcecode",
@@ -187,7 +231,7 @@ async def is_verified(session: aiohttp.ClientSession, limiter: RateLimiter, addr
         "apikey": ETHERSCAN_API_KEY,
         "chainid": chain_id,
     }
-    res = await http_get_json(session, ETHERSCAN_BASE_URL, params=params)
+    res = await budget.transact(http_get_json(session, ETHERSCAN_BASE_URL, params=params), credits=1, refund_time=1.0)
     if not res or "result" not in res:
         return False
     try:
@@ -195,24 +239,61 @@ async def is_verified(session: aiohttp.ClientSession, limiter: RateLimiter, addr
         if isinstance(result, list) and len(result) > 0:
             # Verified contracts usually have non-empty SourceCode
             sc = (result[0].get("SourceCode") or "")
-            return len(sc.strip()) > 0
+            ok = len(sc.strip()) > 0
+            # Only a definitive answer is cached (rate-limit errors come back as a string result)
+            cache.put(address, chain_id, ok, sc)
+            return ok
     except Exception:
         return False
     return False
 
+# (address, chain_id) → lookup task, shared by every slug in this run. Routers, tokens and
+# multicalls show up under many protocols; concurrent slugs await the same request
+# instead of each issuing one. No lock needed: lookup and insert happen without an await.
+_verify_tasks: Dict[Tuple[str, int], asyncio.Task] = {}
+_verify_waiters: Dict[Tuple[str, int], int] = {}
+
+async def is_verified_once(session: aiohttp.ClientSession, budget: CreditSemaphore, cache: VerifiedCache, address: str, chain_id: int) -> bool:
+    key = (address.lower(), chain_id)
+    task = _verify_tasks.get(key)
+    if task is None:
+        task = asyncio.ensure_future(is_verified(session, budget, cache, address, chain_id))
+        _verify_tasks[key] = task
+        _verify_waiters[key] = 0
+    _verify_waiters[key] += 1
+    try:
+        # asyncio.wait: a cancelled waiter leaves without cancelling a lookup others share
+        await asyncio.wait([task])
+    finally:
+        _verify_waiters[key] -= 1
+        if not task.done() and _verify_waiters[key] == 0:
+            # Nobody wants the answer any more: cancel it, so a lookup still queued on the
+            # credit budget never spends its credit
+            task.cancel()
+            del _verify_tasks[key], _verify_waiters[key]
+    return task.result()
+
+def evm_chains(chains: Optional[List[str]]) -> List[str]:
+    """DeFiLlama chain names with a known explorer chain id, in listed order."""
+    # Map proto chains to known EVM chain ids (rough matching)
+    found = [c for c in (str(ch).lower() for ch in (chains or [])) if CHAIN_IDS.get(c)]
+    # If none, still try ethereum as a fallback (some protocols omit chains)
+    return found or ["ethereum"]
+
 async def get_protocols(session: aiohttp.ClientSession) -> List[dict]:
     raw = await http_get_json(session, LLAMA_PROTOCOLS_URL, params={})
     if not raw:
         return []
-    df = pd.DataFrame(raw)[["name", "symbol", "category", "tvl", "slug", "chains"]]
-
+    protos = raw
     if ALLOW_CATEGORIES.lower() != "all":
-        allow = [x.strip() for x in ALLOW_CATEGORIES.split(",") if x.strip()]
+        allow = {x.strip() for x in ALLOW_CATEGORIES.split(",") if x.strip()}
         if allow:
-            df = df[df["category"].isin(allow)]
+            protos = [p for p in protos if p.get("category") in allow]
 
-    df = df.sort_values("tvl", ascending=False).head(TOP_N_PROTOCOLS)
-    return df.to_dict("records")
+    # top-N straight off the parsed JSON; no DataFrame round-trip
+    protos = heapq.nlargest(TOP_N_PROTOCOLS, protos, key=lambda p: p.get("tvl") or 0)
+    keep = ("name", "symbol", "category", "tvl", "slug", "chains")
+    return [{**{k: p.get(k) for k in keep}, "evm_chains": evm_chains(p.get("chains"))} for p in protos]
 
 # ────────────────────────────────────────────────────────────────────────────────
 # Main
@@ -224,13 +305,45 @@ async def main():
     ensure_repo(adapters_repo, "https://github.com/DefiLlama/DefiLlama-Adapters.git", "DefiLlama-Adapters")
     ensure_repo(yield_repo, "https://github.com/DefiLlama/yield-server.git", "yield-server")
 
+    slug_index = build_slug_index(adapters_repo, yield_repo)
+    logging.info(f"Indexed addresses for {len(slug_index)} adapter/yield folders.")
+
     state = load_checkpoint()
     done = set(state.get("done", []))
 
-    limiter = RateLimiter(rps=ETHERSCAN_RPS)
+    budget = CreditSemaphore(ETHERSCAN_RPS)
     sem = asyncio.Semaphore(PROTOCOL_CONCURRENCY)
 
-    async with aiohttp.ClientSession() as session:
+    cache = VerifiedCache()
+
+    # One buffered handle for the whole run instead of open/stat/close per slug.
+    # Writes happen between awaits, so tasks never interleave inside a writerows call.
+    csv_fp = CONTRACTS_CSV_LOCAL.open("a", newline="", encoding="utf-8", buffering=1 << 16)
+    writer = csv.DictWriter(csv_fp, fieldnames=CONTRACTS_FIELDS)
+    if csv_fp.tell() == 0:
+        writer.writeheader()
+    pending: List[str] = []
+    compacted = len(done)
+
+    def flush_progress() -> None:
+        # rows and verified-cache first, so a checkpointed slug always has its output on disk
+        nonlocal compacted
+        csv_fp.flush()
+        cache.commit()
+        append_checkpoint(pending)
+        pending.clear()
+        if len(done) - compacted >= COMPACT_EVERY:
+            compact_checkpoint(state, done)
+            compacted = len(done)
+
+    # Keep-alive pool with cached DNS so repeat explorer/DeFiLlama calls skip DNS + TLS setup
+    connector = aiohttp.TCPConnector(
+        limit=PROTOCOL_CONCURRENCY * 4,
+        limit_per_host=8,
+        ttl_dns_cache=300,
+        keepalive_timeout=60,
+    )
+    async with aiohttp.ClientSession(connector=connector) as session:
         protos = await get_protocols(session)
         logging.info(f"Loaded {len(protos)} protocols (top {TOP_N_PROTOCOLS}).")
 
@@ -240,58 +353,72 @@ async def main():
                 return
 
             async with sem:
-                mined = mine_addresses_for_slug(adapters_repo, yield_repo, slug)
+                # rg fallback is a blocking subprocess; keep it off the event loop so other
+                # protocols' explorer lookups overlap with it
+                mined = await asyncio.to_thread(mine_addresses_for_slug, adapters_repo, yield_repo, slug, slug_index)
                 verified_rows: List[dict] = []
 
-                # Try verification across EVM chains listed by DeFiLlama
-                proto_chains = [str(c).lower() for c in (p.get("chains") or [])]
-
-                # Map proto chains to known EVM chain ids (rough matching)
-                evm_candidates = []
-                for ch in proto_chains:
-                    if ch in CHAIN_IDS:
-                        evm_candidates.append(ch)
-                # If none, still try ethereum as a fallback (some protocols omit chains)
-                if not evm_candidates:
-                    evm_candidates = ["ethereum"]
+                # Try verification across EVM chains listed by DeFiLlama (resolved in get_protocols)
+                evm_candidates = p["evm_chains"]
+
+                async def first_verified_chain(addr: str) -> Optional[str]:
+                    # Every candidate chain at once; the first to come back verified wins and
+                    # the rest are cancelled, so lookups still waiting on the credit budget
+                    # spend nothing
+                    async def check(ch: str) -> Optional[str]:
+                        return ch if await is_verified_once(session, budget, cache, addr, CHAIN_IDS[ch]) else None
+
+                    tasks = [asyncio.create_task(check(ch)) for ch in evm_candidates]
+                    try:
+                        for fut in asyncio.as_completed(tasks):
+                            ch = await fut
+                            if ch is not None:
+                                return ch
+                        return None
+                    finally:
+                        for task in tasks:
+                            task.cancel()
+
+                # getsourcecode takes one address per call, so overlap the per-address
+                # lookups instead (the credit budget still caps the request rate)
+                guesses = await asyncio.gather(*[first_verified_chain(addr) for addr in mined])
 
                 verified_count = 0
-                for addr in mined:
-                    ok_any = False
-                    for ch in evm_candidates:
-                        cid = CHAIN_IDS.get(ch)
-                        if not cid:
-                            continue
-                        ok = await is_verified(session, limiter, addr, cid)
-                        if ok:
-                            ok_any = True
-                            verified_count += 1
-                            # store the first successful chain as `guess`
-                            verified_rows.append({
-                                "slug": slug,
-                                "address": addr,
-                                "guess": ch,
-                                "category": p.get("category"),
-                                "tvl": p.get("tvl"),
-                                "chains": ";".join(p.get("chains") or []),
-                                "scrape_ts": time.strftime("%Y-%m-%d %H:%M:%S"),
-                            })
-                            break
-
-                    # If you also want to keep unverified addresses, you can append them too.
-                    # For now we store only verified to match your previous schema.
-
-                # Write progress immediately
-                append_rows_csv(CONTRACTS_CSV_LOCAL, verified_rows)
+                for addr, ch in zip(mined, guesses):
+                    if ch is None:
+                        # If you also want to keep unverified addresses, you can append them too.
+                        # For now we store only verified to match your previous schema.
+                        continue
+                    verified_count += 1
+                    verified_rows.append({
+                        "slug": slug,
+                        "address": addr,
+                        "guess": ch,
+                        "category": p.get("category"),
+                        "tvl": p.get("tvl"),
+                        "chains": ";".join(p.get("chains") or []),
+                        "scrape_ts": time.strftime("%Y-%m-%d %H:%M:%S"),
+                    })
+
+                writer.writerows(verified_rows)
 
                 # checkpoint regardless of success
                 done.add(slug)
-                state["done"] = sorted(list(done))
-                save_checkpoint(state)
+                pending.append(slug)
+                if len(pending) >= FLUSH_EVERY:
+                    flush_progress()
 
                 logging.info(f"✅ Finished {slug} — mined {len(mined)} addrs, verified {verified_count}")
 
-        await asyncio.gather(*[handle(p) for p in protos])
+        try:
+            await asyncio.gather(*[handle(p) for p in protos])
+        finally:
+            flush_progress()
+            csv_fp.close()
+            cache.close()
+            compact_checkpoint(state, done)
 
 if __name__ == "__main__":
+    if uvloop is not None:
+        uvloop.install()  # libuv loop: less per-request scheduling overhead on thousands of HTTPS calls
     asyncio.run(main())
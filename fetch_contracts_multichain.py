@@ -1,6 +1,13 @@
-import pandas as pd, requests, time, logging, json, os
+import pandas as pd, logging, json, os
+import asyncio
+import aiohttp
+import pyarrow as pa
+import pyarrow.compute as pc
+from pyarrow import csv as pa_csv
 from tqdm import tqdm
 from config_loader import load_api_key
+from explorer_client import CreditSemaphore
+from verified_cache import CHAIN_IDS, VerifiedCache
 from typing import List
 from datetime import datetime
 import random
@@ -36,6 +43,13 @@ chains = {
     }
 }
 
+# Concurrency: one credit budget per explorer host instead of a fixed sleep between requests
+CHAIN_RPS = float(os.getenv("CHAIN_RPS", "5"))  # default per-host quota (Etherscan free tier: 5 rps)
+CHAIN_QUOTAS = {
+    "polygon": 2,
+}
+MAX_CONCURRENCY = int(os.getenv("MAX_CONCURRENCY", "50"))
+
 # Optionally, you can provide a list of keys per chain for rotation
 API_KEYS = {
     # "ethereum": ["key1", "key2"],
@@ -48,57 +62,72 @@ def get_api_key(chain):
         return random.choice(API_KEYS[chain])
     return chains[chain]["key"]
 
-# Retry decorator for API calls
-def retry_request(fn, max_attempts=3, wait=1):
+# Retry wrapper for API calls
+async def retry_request(fn, max_attempts=3, wait=1):
     for attempt in range(max_attempts):
         try:
-            return fn()
+            return await fn()
         except Exception as e:
             logging.warning(f"Request failed (attempt {attempt+1}/{max_attempts}): {e}")
-            time.sleep(wait * (attempt+1))
+            await asyncio.sleep(wait * (attempt+1))
     return None
 
 # Read protocols
-df = pd.read_csv("data_raw/contracts/verified_contracts_expanded.csv")
-logging.info(f"Processing {len(df)} contracts from verified_contracts_expanded.csv")
+# Arrow's multithreaded CSV reader; string columns stay in Arrow buffers until row materialization
+table = pa_csv.read_csv("data_raw/contracts/verified_contracts_expanded.csv")
+logging.info(f"Processing {table.num_rows} contracts from verified_contracts_expanded.csv")
 rows = []
 json_rows = []
 
-def is_valid_address(addr):
-    # Basic check for 0x-prefixed 40-hex string
-    return isinstance(addr, str) and addr.startswith("0x") and len(addr) == 42
+ADDR_PATTERN = r"^0x[0-9a-fA-F]{40}$"
+
+def filter_valid(table):
+    # One vectorized pass instead of per-row address/chain checks in fetch_one
+    addresses = pc.cast(table["contract_address"], pa.string())
+    valid_addr = pc.fill_null(pc.match_substring_regex(addresses, ADDR_PATTERN), False)
+    supported = pc.is_in(pc.cast(table["chain"], pa.string()), value_set=pa.array(list(chains)))
+    bad_addr = table.num_rows - (pc.sum(valid_addr).as_py() or 0)
+    table = table.filter(valid_addr)
+    mask = pc.fill_null(supported.filter(valid_addr), False)
+    bad_chain = table.num_rows - (pc.sum(mask).as_py() or 0)
+    logging.info(f"Skipping {bad_addr} invalid/missing addresses and {bad_chain} unsupported chains")
+    return table.filter(mask)
+
+table = filter_valid(table)
 
-for idx, row in tqdm(df.iterrows(), total=len(df)):
+async def fetch_one(session, sem, budgets, cache, row):
     name = row.get("name", "")
     address = row.get("contract_address", "")
     chain = row.get("chain", "")
-    if not is_valid_address(address):
-        logging.info(f"Skipping invalid or missing address for {name} on {chain}: {address}")
-        continue
-    if chain not in chains:
-        logging.info(f"Skipping unsupported chain for {name}: {chain}")
-        continue
-    found = False
+    chain_id = CHAIN_IDS.get(chain)
+    if cache.get(address, chain_id) is False:
+        logging.info(f"No verified contract found for {name} ({address}) [cached]")
+        return None
     info = chains[chain]
     base_url = info["url"]
     api_key = get_api_key(chain)
     url = f"{base_url}?module=contract&action=getsourcecode&address={address}&apikey={api_key}"
+    async def get():
+        async with session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as resp:
+            if resp.status != 200:
+                raise Exception(f"HTTP {resp.status}")
+            return await resp.json(content_type=None)
     def req():
-        resp = requests.get(url, timeout=10)
-        if resp.status_code != 200:
-            raise Exception(f"HTTP {resp.status_code}")
-        return resp.json()
-    r = retry_request(req, max_attempts=5, wait=1)
+        return budgets[chain].transact(get(), credits=1, refund_time=1.0)
+    async with sem:
+        r = await retry_request(req, max_attempts=5, wait=1)
     if not r:
         logging.error(f"Failed to fetch for {name} {chain} {address}")
-        continue
+        return None
     if r.get("result") and isinstance(r["result"], list) and len(r["result"]) > 0:
         res = r["result"][0]
+        cache.put(address, chain_id, bool(res.get("SourceCode")), res.get("SourceCode") or "")
         if res.get("SourceCode"):
             # Add timestamp and compiler version
             timestamp = datetime.utcnow().isoformat() + "Z"
             compiler_version = res.get("CompilerVersion", "")
-            row_obj = {
+            logging.info(f"Found verified contract for {name} on {chain}")
+            return {
                 "protocol_name": name,
                 "chain": chain,
                 "contract_address": address,
@@ -106,14 +135,35 @@ for idx, row in tqdm(df.iterrows(), total=len(df)):
                 "compiler_version": compiler_version,
                 "timestamp_utc": timestamp
             }
-            rows.append(row_obj)
-            json_rows.append(row_obj)
-            found = True
-            logging.info(f"Found verified contract for {name} on {chain}")
-    # Rate limiting: sleep a bit between requests (randomized)
-    time.sleep(0.3 + random.uniform(0, 0.4))
-    if not found:
-        logging.info(f"No verified contract found for {name} ({address})")
+    logging.info(f"No verified contract found for {name} ({address})")
+    return None
+
+async def main():
+    budgets = {chain: CreditSemaphore(CHAIN_QUOTAS.get(chain, CHAIN_RPS)) for chain in chains}
+    sem = asyncio.Semaphore(MAX_CONCURRENCY)
+    pbar = tqdm(total=table.num_rows)
+
+    async def handle(session, cache, row):
+        try:
+            return await fetch_one(session, sem, budgets, cache, row)
+        finally:
+            pbar.update(1)
+
+    connector = aiohttp.TCPConnector(limit=MAX_CONCURRENCY)
+    with VerifiedCache() as cache:
+        async with aiohttp.ClientSession(connector=connector) as session:
+            tasks = [handle(session, cache, row) for row in table.to_pylist()]
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+    pbar.close()
+
+    for res in results:
+        if isinstance(res, Exception):
+            logging.error(f"Unhandled error: {res}")
+        elif res:
+            rows.append(res)
+            json_rows.append(res)
+
+asyncio.run(main())
 
 out = pd.DataFrame(rows)
 csv_path = "data_raw/contracts/fetched_contract_sources.csv"
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Run several fetch_contracts_full* variants in one process.
+
+Every variant exposes `async run(session, sem, cache)`; here they share one
+asyncio loop, one aiohttp connection pool, one per-host rate limiter and one
+SQLite source cache, so an address fetched by v1 is a cache hit for v2..v8 and
+the pipeline pays interpreter/pool start-up once instead of per script.
+
+Modes run in the order given (v1 writes verified_contracts.csv, which v2..v5 read).
+
+Usage:
+  python fetch_contracts_sweep.py                  # v1..v8
+  python fetch_contracts_sweep.py --mode v1 v4
+"""
+
+import argparse
+import asyncio
+import importlib
+import time
+
+from explorer_client import MAX_CONCURRENCY, SourceCache, make_session
+
+MODES = {
+    "v1": "fetch_contracts_full",
+    "v2": "fetch_contracts_full_v2",
+    "v3": "fetch_contracts_full_v3",
+    "v4": "fetch_contracts_full_v4",
+    "v5": "fetch_contracts_full_v5",
+    "v6": "fetch_contracts_full_v6",
+    "v7": "fetch_contracts_full_v7",
+    "v8": "fetch_contracts_full_v8",
+}
+
+
+async def sweep(modes):
+    sem = asyncio.Semaphore(MAX_CONCURRENCY)
+    with SourceCache() as cache:
+        async with make_session() as session:
+            for mode in modes:
+                print(f"\n🚀 [{mode}] {MODES[mode]}.py")
+                started = time.time()
+                module = importlib.import_module(MODES[mode])
+                await module.run(session, sem, cache)
+                print(f"⏱️ [{mode}] done in {time.time() - started:.1f}s (cache hits so far: {cache.hits})")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--mode", nargs="+", choices=list(MODES), default=list(MODES), help="Variants to run, in order")
+    args = ap.parse_args()
+    asyncio.run(sweep(args.mode))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,24 @@
 from config_loader import load_api_key
 API_KEY = load_api_key()
-import requests
 import pandas as pd
+from pyarrow import csv as pa_csv
 from tqdm import tqdm
 import time
+from explorer_client import session_with_retries
+from verified_cache import CHAIN_IDS, VerifiedCache
 
 OUT_CSV = "data_raw/contracts/verified_contracts_universal.csv"
 
+session = session_with_retries()
+
 # Load top protocols (from DeFiLlama)
-df = pd.read_csv("data_raw/contracts/defillama_top_protocols.csv")
+table = pa_csv.read_csv("data_raw/contracts/defillama_top_protocols.csv")
 
 rows = []
+cache = VerifiedCache()
 print("🌍 Fetching verified contracts from Etherscan and other explorers...")
 
-for _, row in tqdm(df.iterrows(), total=len(df)):
+for row in tqdm(table.to_pylist(), total=table.num_rows):
     name = row["name"]
     chain = (row.get("chain", "") or "").lower()
 
@@ -32,6 +37,11 @@ for _, row in tqdm(df.iterrows(), total=len(df)):
     if chain not in explorers:
         continue
 
+    # Skip addresses a recent run already found unverified
+    chain_id = CHAIN_IDS.get(chain)
+    if cache.get(row.get("address", ""), chain_id) is False:
+        continue
+
     # Query the explorer
     url = explorers[chain]
     params = {
@@ -42,8 +52,10 @@ for _, row in tqdm(df.iterrows(), total=len(df)):
     }
 
     try:
-        res = requests.get(url, params=params, timeout=10)
+        res = session.get(url, params=params, timeout=10)
         data = res.json().get("result", [])
+        if data and isinstance(data, list):
+            cache.put(row.get("address", ""), chain_id, bool(data[0].get("SourceCode")), data[0].get("SourceCode") or "")
         if data and isinstance(data, list) and data[0].get("SourceCode"):
             rows.append({
                 "protocol_name": name,
@@ -57,6 +69,8 @@ for _, row in tqdm(df.iterrows(), total=len(df)):
     except Exception as e:
         print(f"❌ {name}: {e}")
 
+cache.close()
+
 # Save results
 pd.DataFrame(rows).to_csv(OUT_CSV, index=False)
 print(f"✅ Saved verified contracts → {OUT_CSV} ({len(rows)} rows)")
@@ -1,29 +1,48 @@
-import requests
+import random
+
+import numpy as np
 import pandas as pd
 
+from explorer_client import session_with_retries
+
+session = session_with_retries()
+
 # Load your verified contracts from previous steps
 verified = pd.read_csv("data_raw/contracts/verified_contracts.csv")
 
 def get_defillama_data():
     url = "https://api.llama.fi/protocols"
-    r = requests.get(url).json()
+    r = session.get(url, timeout=60).json()
     df = pd.DataFrame(r)
     return df[["name", "category", "chains", "tvl"]]
 
-def match_control(target_row, df):
-    chain = target_row["chain"]
-    category = target_row["category"]
-    tvl_target = target_row.get("tvl", None)
+def build_control_index(df):
+    """(category, chain) → (TVLs sorted ascending, names in the same order), built once."""
+    df = df.explode("chains")
+    df = df.assign(
+        cat_l=df["category"].astype(str).str.lower(),
+        chain_l=df["chains"].astype(str).str.lower(),
+    ).sort_values("tvl", na_position="last")
+    return {
+        key: (g["tvl"].to_numpy(dtype=float), g["name"].to_numpy())
+        for key, g in df.groupby(["cat_l", "chain_l"], sort=False)
+    }
 
-    subset = df[df["category"].str.lower() == category.lower()]
-    subset = subset[subset["chains"].apply(lambda x: chain.capitalize() in str(x))]
+def match_control(chain, category, tvl_target, index):
+    bucket = index.get((str(category).lower(), str(chain).lower()))
+    if bucket is None:
+        return None
+    tvls, names = bucket
 
     if tvl_target and not pd.isna(tvl_target):
-        subset = subset[(subset["tvl"] > tvl_target * 0.7) & (subset["tvl"] < tvl_target * 1.3)]
+        # open window (0.7x, 1.3x) via binary search on the presorted TVLs
+        lo = np.searchsorted(tvls, tvl_target * 0.7, side="right")
+        hi = np.searchsorted(tvls, tvl_target * 1.3, side="left")
+        names = names[lo:hi]
 
-    if subset.empty:
+    if len(names) == 0:
         return None
-    return subset.sample(1).iloc[0]["name"]
+    return random.choice(names)
 
 # Fetch DeFiLlama dataset
 df_llama = get_defillama_data()
@@ -34,7 +53,11 @@ verified["tvl"] = verified["protocol_name"].map(
 )
 
 # Match controls
-verified["control_protocol"] = verified.apply(lambda r: match_control(r, df_llama), axis=1)
+control_index = build_control_index(df_llama)
+verified["control_protocol"] = [
+    match_control(chain, category, tvl, control_index)
+    for chain, category, tvl in zip(verified["chain"], verified["category"], verified["tvl"])
+]
 
 # Save
 verified.to_csv("data_raw/contracts/verified_with_controls.csv", index=False)
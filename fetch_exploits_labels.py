@@ -27,17 +27,20 @@ OUT_CSV      = DATA_DIR / "exploit_metadata_final.csv"
 
 
 # ---------- helpers ----------
+VERSION_RE = re.compile(r"\b(v\d+|v\d+\.\d+)\b")
+NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+
 def norm_name(s: str) -> str:
     """normalize protocol names for matching"""
     if not isinstance(s, str):
         return ""
     s = s.lower()
     # strip trailing versions and punctuation
-    s = re.sub(r"\b(v\d+|v\d+\.\d+)\b", "", s)   # remove v2 / v3 / v2.5 etc
+    s = VERSION_RE.sub("", s)   # remove v2 / v3 / v2.5 etc
     s = s.replace(" amm", "").replace(" dex", "")
     s = s.replace(" protocol", "").replace(" finance", "")
     s = s.replace(" perp", " perpetual")
-    s = re.sub(r"[^a-z0-9]+", "", s)
+    s = NON_ALNUM_RE.sub("", s)
     return s
 
 def norm_addr(a: str) -> str:
@@ -140,12 +143,12 @@ def main():
 
     # 1) address-level match (most precise)
     addr_map = {}
-    for _, h in hacks_expanded.iterrows():
+    for h in hacks_expanded.to_dict("records"):
         for a in h.get("exploited_addresses", []) or []:
             addr_map.setdefault(a, []).append(h)
 
     records = []
-    for _, row in tqdm(reg.iterrows(), total=len(reg), desc="Labeling exploits"):
+    for row in tqdm(reg.to_dict("records"), total=len(reg), desc="Labeling exploits"):
         pnorm = row["protocol_norm"]
         chain = row["chain"]
         addr  = row["addr_norm"]
@@ -5,6 +5,11 @@ from pathlib import Path
 import pandas as pd
 import requests
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 ROOT = Path(__file__).resolve().parent
 OUT = ROOT / "data_raw" / "llama_protocols.csv"
 OUT.parent.mkdir(parents=True, exist_ok=True)
@@ -14,18 +19,19 @@ URL = "https://api.llama.fi/protocols"
 def main():
     r = requests.get(URL, timeout=60)
     r.raise_for_status()
-    raw = r.json()
-
-    df = pd.DataFrame(raw)
+    # ~5-10 MB payload: orjson when available
+    raw = orjson.loads(r.content) if orjson is not None else r.json()
 
+    # build only the kept columns instead of the full-width protocol frame
     keep = ["slug", "name", "symbol", "category", "tvl", "chains"]
-    for k in keep:
-        if k not in df.columns:
-            df[k] = None
-    df = df[keep].copy()
+    df = pd.DataFrame([{k: p.get(k) for k in keep} for p in raw], columns=keep)
 
     # normalize chains
-    df["chains"] = df["chains"].apply(lambda x: ";".join(x) if isinstance(x, list) else (x if isinstance(x, str) else ""))
+    chains = df["chains"]
+    kinds = chains.map(type)
+    is_list, is_str = kinds.eq(list), kinds.eq(str)
+    df["chains"] = chains.where(is_list | is_str, "")
+    df.loc[is_list, "chains"] = chains[is_list].str.join(";")
 
     df.to_csv(OUT, index=False)
     print(f"✅ Wrote {OUT} | rows={len(df)} | cols={df.columns.tolist()}")
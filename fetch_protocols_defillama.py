@@ -8,6 +8,11 @@ import pandas as pd
 import time
 from datetime import datetime
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 OUT_CSV = "data_raw/contracts/defillama_top_protocols.csv"
 
 print("🌍 Fetching top protocols from DeFiLlama...")
@@ -15,7 +20,7 @@ print("🌍 Fetching top protocols from DeFiLlama...")
 # DeFiLlama API endpoint
 url = "https://api.llama.fi/protocols"
 response = requests.get(url)
-data = response.json()
+data = orjson.loads(response.content) if orjson is not None else response.json()
 
 print(f"✅ Retrieved {len(data)} total protocols")
 
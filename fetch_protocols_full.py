@@ -2,11 +2,17 @@
 import requests
 import pandas as pd
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 print("🌍 Fetching top DeFi protocols from DeFiLlama...")
 
 # Pull full list of protocols
 url = "https://api.llama.fi/protocols"
-r = requests.get(url).json()
+resp = requests.get(url)
+r = orjson.loads(resp.content) if orjson is not None else resp.json()
 df = pd.DataFrame(r)
 
 # --- Step 1. Define your 5 target DeFi categories ---
@@ -16,14 +22,14 @@ target_categories = ["Dexes", "Lending", "Bridges", "Stablecoins", "Derivatives"
 df = df[df["category"].isin(target_categories)]
 
 # --- Step 3. Keep essential metadata ---
-df = df[["name", "category", "chains", "tvl", "url"]]
-df = df[df["tvl"] > 0]  # remove inactive protocols
-df = df.sort_values("tvl", ascending=False)
+df = df.loc[df["tvl"] > 0, ["name", "category", "chains", "tvl", "url"]]  # remove inactive protocols
 
 # --- Step 4. Sample top 10 per category (balanced sampling) ---
+# One sort by (category, tvl desc) + groupby.head: no per-group Python apply
 df_balanced = (
-    df.groupby("category", group_keys=False)
-      .apply(lambda x: x.head(10))
+    df.sort_values(["category", "tvl"], ascending=[True, False])
+      .groupby("category")
+      .head(10)
       .reset_index(drop=True)
 )
 
@@ -2,14 +2,29 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
-import os, time, json
+import os, re, csv, json, asyncio
 from pathlib import Path
 from typing import Dict, Any, Optional, List, Tuple
 
+import aiohttp
 import pandas as pd
-import requests
+import pyarrow as pa
+import pyarrow.compute as pc
+from pyarrow import csv as pa_csv
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard as zstd
+except ImportError:
+    zstd = None
+
+from explorer_client import ExplorerQuota
+
 ROOT = Path(__file__).resolve().parent
 load_dotenv(ROOT / ".env")
 
@@ -17,18 +32,36 @@ load_dotenv(ROOT / ".env")
 INFILE = Path(os.getenv("SOURCE_FETCH_INPUT", ROOT / "data_raw/contracts/master_contracts_llama_adapters_chain_known.csv"))
 OUT_VER = ROOT / "data_raw/contracts/verified_contracts_from_adapters.csv"
 OUT_SRC = ROOT / "data_raw/contracts/fetched_contract_sources_adapters.csv"
-CKPT = ROOT / "outputs/ckpt_fetch_sources_adapters.json"
+CKPT = ROOT / "outputs/ckpt_fetch_sources_adapters.json"  # legacy full snapshot, migrated on first run
+# one {"keys": [...], "ends": {csv name: bytes}} line per flush: the finished "chain:address"
+# keys and the output sizes at that point (anything past them was never checkpointed)
+CKPT_LOG = CKPT.with_suffix(".jsonl")
 CACHE_DIR = ROOT / "data_raw/contracts/source_cache"  # optional per-contract files
+# SOL_ZSTD=1 stores cached sources as .sol.zst (Solidity compresses ~5-8x); off by default
+# because slither/mythril (and run_slither_defi_from_cache) need plain .sol files
+SOL_ZSTD = zstd is not None and os.getenv("SOL_ZSTD", "0").strip().lower() in ("1", "true", "yes")
+SOL_SUFFIX = ".sol.zst" if SOL_ZSTD else ".sol"
+# Only these input columns are read, all as plain strings (no per-column type inference)
+INPUT_COLS = {"chain", "address", "contract_address"}
+# Full EVM address shape (hex digits included), so malformed input never costs an API call
+ADDR_RE = re.compile(r"0x[0-9a-fA-F]{40}")
+# Explorers answer an unverified contract's ABI with this fixed message
+UNVERIFIED_ABI = "Contract source code not verified"
 
 for p in [OUT_VER.parent, OUT_SRC.parent, CKPT.parent, CACHE_DIR]:
     p.mkdir(parents=True, exist_ok=True)
 
+VER_FIELDS = ["chain", "address", "verified", "contract_name", "has_source", "has_abi", "source"]
+SRC_FIELDS = ["chain", "address", "contract_name", "source_code", "cache_path"]
+
 # ===== Explorer v2 =====
 V2_BASE = os.getenv("EXPLORER_BASE_URL", "https://api.etherscan.io/v2/api").strip()
 API_KEY = (os.getenv("EXPLORER_API_KEY") or os.getenv("ETHERSCAN_API_KEY") or "").strip()
 
-# rate limiting
-SLEEP_SEC = float(os.getenv("ETHERSCAN_SLEEP_SEC", "0.25"))
+# Explorer quota (free tier: 5 calls/s); replaces a fixed sleep after every call
+ETHERSCAN_RPS = float(os.getenv("ETHERSCAN_RPS", "5"))
+ETHERSCAN_RPM = float(os.getenv("ETHERSCAN_RPM", "300"))
+MAX_INFLIGHT = int(os.getenv("SOURCE_FETCH_INFLIGHT", "1024"))
 TIMEOUT = float(os.getenv("TIMEOUT", "25"))
 MAX_RETRIES = int(os.getenv("RETRY_LIMIT", "5"))
 RETRY_BACKOFF = float(os.getenv("RETRY_BACKOFF", "2"))
@@ -44,36 +77,117 @@ CHAINID: Dict[str, int] = {
 }
 
 # ===== Helpers =====
-def _load_ckpt() -> dict:
+def json_loads(s):
+    """Parse JSON text/bytes; orjson when available (multi-MB standard-JSON payloads)."""
+    return orjson.loads(s) if orjson is not None else json.loads(s)
+
+def json_dumps(obj) -> str:
+    """Compact JSON text, UTF-8 kept as-is (orjson never escapes non-ASCII)."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False)
+
+def _ckpt_line(keys: List[str], outputs: List[Path]) -> str:
+    return json_dumps({"keys": keys, "ends": {p.name: p.stat().st_size for p in outputs}}) + "\n"
+
+def _load_ckpt() -> Tuple[set, Dict[str, int]]:
+    """
+    (finished "chain:address" keys, output sizes recorded by the last flush).
+    Rows now live only in the output CSVs.
+    """
+    state = {}
     if CKPT.exists():
         try:
-            return json.loads(CKPT.read_text(encoding="utf-8"))
+            state = json_loads(CKPT.read_bytes())
         except Exception:
-            return {}
-    return {}
-
-def _save_ckpt(state: dict) -> None:
-    CKPT.write_text(json.dumps(state, ensure_ascii=False, indent=2), encoding="utf-8")
-
-def _req_json(params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-    if not API_KEY:
-        raise SystemExit("Missing API key: set EXPLORER_API_KEY (or ETHERSCAN_API_KEY) in .env")
+            state = {}
+    done = set(state.get("done", []))
+    ver_rows = state.get("verified_rows", [])
+    src_rows = state.get("source_rows", [])
+    ends: Dict[str, int] = {}
+    if CKPT_LOG.exists():
+        with CKPT_LOG.open("r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    ev = json_loads(line)
+                except ValueError:
+                    continue  # torn last line from a killed run
+                done.update(ev["keys"])
+                ends = ev["ends"]
 
+    if CKPT.exists():
+        # Checkpoint from before rows were streamed: write its rows to the outputs once
+        # (as the old end-of-run rewrite did) and keep only the keys from here on.
+        pd.DataFrame(ver_rows, columns=VER_FIELDS).drop_duplicates(subset=["chain","address"], keep="last").to_csv(OUT_VER, index=False)
+        pd.DataFrame(src_rows, columns=SRC_FIELDS).drop_duplicates(subset=["chain","address"], keep="last").to_csv(OUT_SRC, index=False)
+        tmp = CKPT_LOG.with_name(CKPT_LOG.name + ".tmp")
+        tmp.write_text(_ckpt_line(sorted(done), [OUT_VER, OUT_SRC]), encoding="utf-8")
+        tmp.replace(CKPT_LOG)
+        CKPT.unlink(missing_ok=True)
+        ends = {p.name: p.stat().st_size for p in (OUT_VER, OUT_SRC)}
+    return done, ends
+
+def _recover_outputs(done: set, ends: Dict[str, int], outputs: List[Path]) -> set:
+    """
+    Cut each output back to the size recorded with the last checkpoint flush, dropping
+    a row torn by a hard kill (often inside a quoted multi-line source_code) and rows
+    whose keys were never checkpointed. If an output is shorter than recorded, it is
+    not the file the checkpoint describes: outputs are moved aside to *.stale and the
+    run starts over.
+    """
+    for p in outputs:
+        size = p.stat().st_size if p.exists() else 0
+        if p.name in ends and size < ends[p.name]:
+            print(f"⚠️ {p} is shorter than the checkpoint recorded; starting over (old outputs -> *.stale)")
+            for q in outputs:
+                if q.exists():
+                    q.replace(q.with_name(q.name + ".stale"))
+            CKPT_LOG.unlink(missing_ok=True)
+            return set()
+    for p in outputs:
+        if p.name in ends and p.stat().st_size > ends[p.name]:
+            with p.open("r+b") as f:
+                f.truncate(ends[p.name])
+    return done
+
+def _written_keys(path: Path) -> set:
+    """Keys ("chain:address") already written to an output CSV, so a rerun never refetches them
+    even when the checkpoint lost its tail."""
+    if not path.exists() or path.stat().st_size == 0:
+        return set()
+    try:
+        t = pa_csv.read_csv(path, convert_options=pa_csv.ConvertOptions(
+            include_columns=["chain", "address"],
+            column_types={"chain": pa.string(), "address": pa.string()},
+        ))
+    except (pa.ArrowInvalid, KeyError):
+        return set()
+    return set(pc.binary_join_element_wise(t["chain"], t["address"], ":").drop_null().to_pylist())
+
+def _open_csv(path: Path, fields: List[str]):
+    """Append-mode csv.writer kept open for the run; header only for a new file.
+    Rows are plain tuples in `fields` order (no per-row dict)."""
+    f = path.open("a", newline="", encoding="utf-8", buffering=1 << 16)
+    w = csv.writer(f)
+    if f.tell() == 0:
+        w.writerow(fields)
+    return f, w
+
+async def _req_json(session: aiohttp.ClientSession, limiter: ExplorerQuota, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     for attempt in range(1, MAX_RETRIES + 1):
         try:
-            r = requests.get(V2_BASE, params=params, timeout=TIMEOUT)
-            if r.status_code in (403, 429):
-                time.sleep(RETRY_BACKOFF * attempt)
-                continue
-            r.raise_for_status()
-            j = r.json()
-            time.sleep(SLEEP_SEC)
-            return j
+            async with limiter:
+                async with session.get(V2_BASE, params=params, timeout=aiohttp.ClientTimeout(total=TIMEOUT)) as r:
+                    limiter.observe(r.headers)
+                    if r.status not in (403, 429):
+                        r.raise_for_status()
+                        return json_loads(await r.read())  # raw bytes, no str decode first
         except Exception:
-            time.sleep(RETRY_BACKOFF * attempt)
+            pass
+        await asyncio.sleep(RETRY_BACKOFF * attempt)
     return None
 
-def get_sourcecode(chain: str, address: str) -> Tuple[bool, Dict[str, Any]]:
+async def get_sourcecode(session: aiohttp.ClientSession, limiter: ExplorerQuota, chain: str, address: str) -> Tuple[bool, Dict[str, Any]]:
     """Return (ok, payload). ok=True means we got a structured result row."""
     cid = CHAINID.get(chain)
     if not cid:
@@ -86,7 +200,7 @@ def get_sourcecode(chain: str, address: str) -> Tuple[bool, Dict[str, Any]]:
         "address": address,
         "apikey": API_KEY,
     }
-    j = _req_json(params)
+    j = await _req_json(session, limiter, params)
     if not j or "result" not in j:
         return (False, {})
 
@@ -97,7 +211,7 @@ def get_sourcecode(chain: str, address: str) -> Tuple[bool, Dict[str, Any]]:
     return (True, res[0])
 
 def _norm_addr(x: Any) -> str:
-    return str(x or "").strip()
+    return str(x or "").strip().lower()
 
 def _safe_write_source(chain: str, address: str, source: str) -> Optional[str]:
     """Write source to per-contract file if it looks like Solidity; return filepath or None."""
@@ -110,15 +224,34 @@ def _safe_write_source(chain: str, address: str, source: str) -> Optional[str]:
     # create chain folder
     d = CACHE_DIR / chain
     d.mkdir(parents=True, exist_ok=True)
-    fp = d / f"{address.lower()}.sol"
-    fp.write_text(s, encoding="utf-8", errors="ignore")
+    fp = d / f"{address.lower()}{SOL_SUFFIX}"
+    if SOL_ZSTD:
+        fp.write_bytes(zstd.ZstdCompressor(level=3, threads=-1).compress(s.encode("utf-8", errors="ignore")))
+    else:
+        fp.write_text(s, encoding="utf-8", errors="ignore")
     return str(fp)
 
-def main():
+async def fetch_all(pairs: List[Tuple[str, str]]):
+    """Yield (chain, addr, (ok, payload)) as lookups finish; at most MAX_INFLIGHT in flight."""
+    sem = asyncio.Semaphore(MAX_INFLIGHT)
+    limiter = ExplorerQuota(ETHERSCAN_RPS, ETHERSCAN_RPM)
+    # one keep-alive pool for the whole run; idle sockets outlive quota waits, DNS is cached
+    connector = aiohttp.TCPConnector(limit_per_host=64, ttl_dns_cache=300, keepalive_timeout=60)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        async def one(chain: str, addr: str):
+            async with sem:
+                return chain, addr, await get_sourcecode(session, limiter, chain, addr)
+
+        for fut in asyncio.as_completed([one(c, a) for c, a in pairs]):
+            yield await fut
+
+async def main():
+    if not API_KEY:
+        raise SystemExit("Missing API key: set EXPLORER_API_KEY (or ETHERSCAN_API_KEY) in .env")
     if not INFILE.exists():
         raise SystemExit(f"Missing input: {INFILE}")
 
-    df = pd.read_csv(INFILE, low_memory=False)
+    df = pd.read_csv(INFILE, usecols=lambda c: c in INPUT_COLS, dtype=str, engine="c")
 
     # standardize columns
     if "address" not in df.columns and "contract_address" in df.columns:
@@ -131,7 +264,7 @@ def main():
 
     # keep only EVM chains we support + address-shaped
     df = df[df["chain"].isin(CHAINID.keys())].copy()
-    df = df[df["address"].astype(str).str.startswith("0x") & (df["address"].astype(str).str.len() == 42)].copy()
+    df = df[df["address"].map(ADDR_RE.fullmatch).notna()].copy()
     df = df.drop_duplicates(subset=["chain","address"]).reset_index(drop=True)
 
     if MAX_ADDR and MAX_ADDR > 0:
@@ -141,81 +274,83 @@ def main():
     print(df["chain"].value_counts().head(15).to_string())
     print("Using V2:", V2_BASE)
 
-    ck = _load_ckpt()
-    done = set(ck.get("done", []))
-    ver_rows: List[dict] = ck.get("verified_rows", [])
-    src_rows: List[dict] = ck.get("source_rows", [])
+    done, ends = _load_ckpt()
+    done = _recover_outputs(done, ends, [OUT_VER, OUT_SRC])
+    done |= _written_keys(OUT_VER)  # rows already on disk count as done too
 
     checked = 0
     kept_verified = 0
     kept_source = 0
 
-    for _, row in df.iterrows():
-        chain = row["chain"]
-        addr = row["address"]
-        key = f"{chain}:{addr.lower()}"
-        if key in done:
-            continue
-
-        checked += 1
+    todo = [
+        (chain, addr) for chain, addr in zip(df["chain"], df["address"])
+        if f"{chain}:{addr}" not in done
+    ]
+
+    # Rows go straight to the CSVs; nothing accumulates in memory across addresses
+    ver_f, ver_w = _open_csv(OUT_VER, VER_FIELDS)
+    src_f, src_w = _open_csv(OUT_SRC, SRC_FIELDS)
+    ckpt_log = CKPT_LOG.open("a", encoding="utf-8")
+    pending: List[str] = []
+
+    def flush() -> None:
+        # outputs first, so every key in the checkpoint has its rows on disk
+        ver_f.flush()
+        src_f.flush()
+        if not pending:
+            return
+        # keys and output sizes in one line: a torn line loses both together
+        ckpt_log.write(_ckpt_line(pending, [OUT_VER, OUT_SRC]))
+        ckpt_log.flush()
+        os.fsync(ckpt_log.fileno())
+        pending.clear()
+
+    try:
+        async for chain, addr, (ok, payload) in fetch_all(todo):
+            key = f"{chain}:{addr}"  # addresses are lowercased once, on input
+            checked += 1
+
+            if ok:
+                contract_name = str(payload.get("ContractName","") or "").strip()
+                abi = str(payload.get("ABI","") or "").strip()
+                source = str(payload.get("SourceCode","") or "").strip()
+
+                has_abi = bool(abi) and not abi.startswith(UNVERIFIED_ABI)
+                has_source = bool(source)
+
+                verified = 1 if (contract_name and (has_source or has_abi)) else 0
+
+                # VER_FIELDS order
+                ver_w.writerow((chain, addr, verified, contract_name, int(has_source), int(has_abi), "getsourcecode_v2"))
+                if verified:
+                    kept_verified += 1
+
+                # store source (optional, but needed for Slither)
+                if has_source:
+                    cache_fp = _safe_write_source(chain, addr, source)
+                    # SRC_FIELDS order
+                    src_w.writerow((chain, addr, contract_name, source, cache_fp or ""))
+                    kept_source += 1
 
-        ok, payload = get_sourcecode(chain, addr)
-        if not ok:
             done.add(key)
-            continue
-
-        contract_name = str(payload.get("ContractName","") or "").strip()
-        abi = str(payload.get("ABI","") or "").strip()
-        source = str(payload.get("SourceCode","") or "").strip()
-
-        has_abi = bool(abi) and ("not verified" not in abi.lower())
-        has_source = bool(source)
-
-        verified = 1 if (contract_name and (has_source or has_abi)) else 0
-
-        ver_rows.append({
-            "chain": chain,
-            "address": addr.lower(),
-            "verified": verified,
-            "contract_name": contract_name,
-            "has_source": int(has_source),
-            "has_abi": int(has_abi),
-            "source": "getsourcecode_v2",
-        })
-        if verified:
-            kept_verified += 1
-
-        # store source (optional, but needed for Slither)
-        if has_source:
-            cache_fp = _safe_write_source(chain, addr, source)
-            src_rows.append({
-                "chain": chain,
-                "address": addr.lower(),
-                "contract_name": contract_name,
-                "source_code": source,
-                "cache_path": cache_fp or "",
-            })
-            kept_source += 1
-
-        done.add(key)
-
-        if checked % 50 == 0:
-            print(f"checked={checked} | verified_kept={kept_verified} | source_kept={kept_source} | ckpt={CKPT}")
-            _save_ckpt({"done": list(done), "verified_rows": ver_rows, "source_rows": src_rows})
-
-    _save_ckpt({"done": list(done), "verified_rows": ver_rows, "source_rows": src_rows})
-
-    ver = pd.DataFrame(ver_rows).drop_duplicates(subset=["chain","address"], keep="last")
-    src = pd.DataFrame(src_rows).drop_duplicates(subset=["chain","address"], keep="last")
-
-    ver.to_csv(OUT_VER, index=False)
-    src.to_csv(OUT_SRC, index=False)
-
-    print(f"✅ wrote {OUT_VER} rows={len(ver)} verified(sum)={int(ver['verified'].fillna(0).astype(int).sum()) if 'verified' in ver.columns else 0}")
+            pending.append(key)
+
+            if checked % 50 == 0:
+                print(f"checked={checked} | verified_kept={kept_verified} | source_kept={kept_source} | ckpt={CKPT_LOG}")
+                flush()
+    finally:
+        flush()
+        for f in (ver_f, src_f, ckpt_log):
+            f.close()
+
+    # summary from the (now complete) outputs; only the small columns are loaded
+    ver = pd.read_csv(OUT_VER, usecols=["chain", "verified"])
+    src = pd.read_csv(OUT_SRC, usecols=["chain"])
+
+    print(f"✅ wrote {OUT_VER} rows={len(ver)} verified(sum)={int(ver['verified'].fillna(0).astype(int).sum())}")
     print(f"✅ wrote {OUT_SRC} rows={len(src)} (has source cached)")
-    if "verified" in ver.columns:
-        print("verified by chain:\n", ver[ver["verified"].astype(int)==1]["chain"].value_counts().head(15).to_string())
+    print("verified by chain:\n", ver[ver["verified"].astype(int)==1]["chain"].value_counts().head(15).to_string())
     print("source cached by chain:\n", src["chain"].value_counts().head(15).to_string())
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    asyncio.run(main())
\ No newline at end of file
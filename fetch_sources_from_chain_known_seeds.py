@@ -4,39 +4,86 @@ from __future__ import annotations
 
 import os
 import re
+import csv
 import json
 import time
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import Dict, Any, Optional, Tuple, List
 
+import aiohttp
 import pandas as pd
-import requests
+import pyarrow as pa
+import pyarrow.compute as pc
+from pyarrow import csv as pa_csv
+import pyarrow.parquet as pq
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard as zstd
+except ImportError:
+    zstd = None
+
+from explorer_client import ExplorerQuota
+
 ROOT = Path(__file__).resolve().parent
 load_dotenv(ROOT / ".env")
 
 # INPUT: your chain-known universe (use whichever you trust most)
 # Recommend: the chain-known adapter output you printed (≈22k unique)
 INFILE = Path(os.getenv("SEEDS_CSV", ROOT / "data_raw/contracts/master_contracts_llama_adapters_chain_known.csv"))
+# Only these input columns are read, all as plain strings (no per-column type inference)
+INPUT_COLS = {"chain", "address", "contract_address"}
+# Full EVM address shape (hex digits included), so malformed input never costs an API call
+ADDR_RE = re.compile(r"0x[0-9a-fA-F]{40}")
+# Explorers answer an unverified contract's ABI with this fixed message
+UNVERIFIED_ABI = "Contract source code not verified"
 
 # OUTPUTS
 OUT_CSV = ROOT / "data_raw/contracts/fetched_contract_sources.csv"
 OUT_VERIFIED = ROOT / "data_raw/contracts/verified_contracts_from_source_cache.csv"
 CACHE_DIR = ROOT / "data_raw/contracts/source_cache"
 CACHE_DIR.mkdir(parents=True, exist_ok=True)
-
-CKPT = ROOT / "outputs/ckpt_fetch_sources.json"
+# SOL_ZSTD=1 stores cached sources as .sol.zst (Solidity compresses ~5-8x); off by default
+# because slither/mythril (and run_slither_defi_from_cache) need plain .sol files
+SOL_ZSTD = zstd is not None and os.getenv("SOL_ZSTD", "0").strip().lower() in ("1", "true", "yes")
+SOL_SUFFIX = ".sol.zst" if SOL_ZSTD else ".sol"
+# Raw getsourcecode JSON, one Parquet part file per flushed batch (read the folder as a dataset)
+RAW_DIR = CACHE_DIR / "raw_payloads"
+RAW_DIR.mkdir(parents=True, exist_ok=True)
+RAW_SCHEMA = pa.schema([("chain", pa.string()), ("address", pa.string()), ("payload", pa.string())])
+RAW_BATCH = 500  # addresses per checkpoint flush (and at most per raw part file)
+
+CKPT = ROOT / "outputs/ckpt_fetch_sources.json"  # legacy full snapshot, migrated on first run
+# one {"keys": [...], "ends": {csv name: bytes}} line per flush: the finished "chain:address"
+# keys and the output sizes at that point (anything past them was never checkpointed)
+CKPT_LOG = CKPT.with_suffix(".jsonl")
 CKPT.parent.mkdir(parents=True, exist_ok=True)
 
 V2_BASE = os.getenv("EXPLORER_BASE_URL", "https://api.etherscan.io/v2/api").strip()
 API_KEY = (os.getenv("EXPLORER_API_KEY") or os.getenv("ETHERSCAN_API_KEY") or "").strip()
 
 TIMEOUT = float(os.getenv("FETCH_TIMEOUT", "25"))
-SLEEP_SEC = float(os.getenv("FETCH_SLEEP_SEC", "0.20"))
+# Explorer quota (free tier: 5 calls/s); replaces a fixed sleep after every call
+ETHERSCAN_RPS = float(os.getenv("ETHERSCAN_RPS", "5"))
+ETHERSCAN_RPM = float(os.getenv("ETHERSCAN_RPM", "300"))
+MAX_INFLIGHT = int(os.getenv("FETCH_INFLIGHT", "1024"))
+# finished lookups waiting for the writer; when full, lookups stop starting new requests
+WRITE_QUEUE = int(os.getenv("FETCH_WRITE_QUEUE", "2048"))
 RETRY_SLEEP = float(os.getenv("FETCH_RETRY_SLEEP", "1.5"))
 MAX_RETRIES = int(os.getenv("FETCH_MAX_RETRIES", "4"))
 
+ROW_FIELDS = [
+    "chain", "address", "chainid", "contract_name", "verified",
+    "has_source", "has_abi", "source_len", "evidence_url",
+]
+
 # Optional cap while testing
 MAX_ADDR = int(os.getenv("FETCH_MAX_ADDR", "0"))  # 0 = all
 
@@ -65,21 +112,125 @@ def norm_chain(x: Any) -> str:
 def norm_addr(x: Any) -> str:
     return str(x or "").strip().lower()
 
-def load_ckpt() -> dict:
+def json_loads(s):
+    """Parse JSON text/bytes; orjson when available (multi-MB standard-JSON payloads)."""
+    return orjson.loads(s) if orjson is not None else json.loads(s)
+
+def json_dumps(obj) -> str:
+    """Compact JSON text, UTF-8 kept as-is (orjson never escapes non-ASCII)."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False)
+
+def ckpt_line(keys: List[str]) -> str:
+    return json_dumps({"keys": keys, "ends": {p.name: p.stat().st_size for p in (OUT_CSV, OUT_VERIFIED)}}) + "\n"
+
+def load_ckpt() -> Tuple[set, Dict[str, int]]:
+    """
+    (finished "chain:address" keys, output sizes recorded by the last flush).
+    Rows now live only in the output CSVs.
+    """
+    state = {}
     if CKPT.exists():
         try:
-            return json.loads(CKPT.read_text(encoding="utf-8"))
+            state = json_loads(CKPT.read_bytes())
         except Exception:
-            return {}
-    return {}
-
-def save_ckpt(state: dict) -> None:
-    CKPT.write_text(json.dumps(state, ensure_ascii=False, indent=2), encoding="utf-8")
-
-def req_getsource(chainid: int, address: str) -> Optional[dict]:
-    if not API_KEY:
-        raise SystemExit("Missing API key: set EXPLORER_API_KEY (or ETHERSCAN_API_KEY) in .env")
+            state = {}
+    done = set(state.get("done", []))
+    rows = state.get("rows", [])
+    ends: Dict[str, int] = {}
+    if CKPT_LOG.exists():
+        with CKPT_LOG.open("r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    ev = json_loads(line)
+                except ValueError:
+                    continue  # torn last line from a killed run
+                done.update(ev["keys"])
+                ends = ev["ends"]
 
+    if CKPT.exists():
+        # Checkpoint from before rows were streamed: write its rows to the outputs once
+        # (as the old end-of-run rewrite did) and keep only the keys from here on.
+        out = pd.DataFrame(rows, columns=ROW_FIELDS).drop_duplicates(subset=["chain", "address"], keep="last")
+        out.to_csv(OUT_CSV, index=False)
+        out[out["has_source"] == 1].to_csv(OUT_VERIFIED, index=False)
+        tmp = CKPT_LOG.with_name(CKPT_LOG.name + ".tmp")
+        tmp.write_text(ckpt_line(sorted(done)), encoding="utf-8")
+        tmp.replace(CKPT_LOG)
+        CKPT.unlink(missing_ok=True)
+        ends = {p.name: p.stat().st_size for p in (OUT_CSV, OUT_VERIFIED)}
+    return done, ends
+
+def recover_outputs(done: set, ends: Dict[str, int]) -> set:
+    """
+    Cut each output back to the size recorded with the last checkpoint flush, dropping
+    a row torn by a hard kill (often inside a quoted multi-line source_code) and rows
+    whose keys were never checkpointed. If an output is shorter than recorded, it is
+    not the file the checkpoint describes: outputs are moved aside to *.stale and the
+    run starts over.
+    """
+    outputs = (OUT_CSV, OUT_VERIFIED)
+    for p in outputs:
+        size = p.stat().st_size if p.exists() else 0
+        if p.name in ends and size < ends[p.name]:
+            print(f"⚠️ {p} is shorter than the checkpoint recorded; starting over (old outputs -> *.stale)")
+            for q in outputs:
+                if q.exists():
+                    q.replace(q.with_name(q.name + ".stale"))
+            CKPT_LOG.unlink(missing_ok=True)
+            return set()
+    for p in outputs:
+        if p.name in ends and p.stat().st_size > ends[p.name]:
+            with p.open("r+b") as f:
+                f.truncate(ends[p.name])
+    return done
+
+def check_headers() -> None:
+    """
+    Never append to (or read keys from) an output written by another script:
+    fetched_contract_sources.csv is also produced, with a different schema, by
+    fetch_contracts_full_v6/v7/v8.py and fetch_contracts_multichain.py. Such a file
+    means this run's outputs were replaced, so both are moved aside to *.stale and the
+    checkpoint is dropped: the run starts fresh, as the old full rewrite did.
+    """
+    outputs = (OUT_CSV, OUT_VERIFIED)
+    for p in outputs:
+        if not p.exists() or p.stat().st_size == 0:
+            continue
+        with p.open("r", newline="", encoding="utf-8-sig") as f:
+            header = next(csv.reader(f), [])
+        if header != ROW_FIELDS:
+            print(f"⚠️ {p} was written by another script (columns {header[:6]}...); starting over (old outputs -> *.stale)")
+            for q in outputs:
+                if q.exists():
+                    q.replace(q.with_name(q.name + ".stale"))
+            CKPT_LOG.unlink(missing_ok=True)
+            return
+
+def written_keys(path: Path) -> set:
+    """Keys ("chain:address") already written to an output CSV, so a rerun never refetches them
+    even when the checkpoint lost its tail."""
+    if not path.exists() or path.stat().st_size == 0:
+        return set()
+    try:
+        t = pa_csv.read_csv(path, convert_options=pa_csv.ConvertOptions(
+            include_columns=["chain", "address"],
+            column_types={"chain": pa.string(), "address": pa.string()},
+        ))
+    except (pa.ArrowInvalid, KeyError):
+        return set()
+    return set(pc.binary_join_element_wise(t["chain"], t["address"], ":").drop_null().to_pylist())
+
+def open_csv(path: Path):
+    """Append-mode DictWriter kept open for the run; header only for a new file."""
+    f = path.open("a", newline="", encoding="utf-8", buffering=1 << 16)
+    w = csv.DictWriter(f, fieldnames=ROW_FIELDS)
+    if f.tell() == 0:
+        w.writeheader()
+    return f, w
+
+async def req_getsource(session: aiohttp.ClientSession, limiter: ExplorerQuota, chainid: int, address: str) -> Optional[dict]:
     params = {
         "module": "contract",
         "action": "getsourcecode",
@@ -90,16 +241,15 @@ def req_getsource(chainid: int, address: str) -> Optional[dict]:
 
     for attempt in range(1, MAX_RETRIES + 1):
         try:
-            r = requests.get(V2_BASE, params=params, timeout=TIMEOUT)
-            if r.status_code in (403, 429):
-                time.sleep(RETRY_SLEEP * attempt)
-                continue
-            r.raise_for_status()
-            j = r.json()
-            time.sleep(SLEEP_SEC)
-            return j
+            async with limiter:
+                async with session.get(V2_BASE, params=params, timeout=aiohttp.ClientTimeout(total=TIMEOUT)) as r:
+                    limiter.observe(r.headers)
+                    if r.status not in (403, 429):
+                        r.raise_for_status()
+                        return json_loads(await r.read())  # raw bytes, no str decode first
         except Exception:
-            time.sleep(RETRY_SLEEP * attempt)
+            pass
+        await asyncio.sleep(RETRY_SLEEP * attempt)
 
     return None
 
@@ -117,9 +267,8 @@ def is_verified_payload(j: dict) -> Tuple[bool, str, str, str]:
     abi = str(it.get("ABI", "") or "").strip()
     src = str(it.get("SourceCode", "") or "").strip()
 
-    has_abi = bool(abi) and ("not verified" not in abi.lower())
-    has_src = bool(src)
-    verified = bool(cname) and (has_src or has_abi)
+    # no ContractName: unverified, whatever the ABI/source say (those are still returned for caching)
+    verified = bool(cname) and (bool(src) or (bool(abi) and not abi.startswith(UNVERIFIED_ABI)))
     return (verified, cname, abi, src)
 
 def flatten_source_to_sol(source_code: str) -> str:
@@ -140,7 +289,7 @@ def flatten_source_to_sol(source_code: str) -> str:
     # Detect JSON with "sources"
     if s2.startswith("{") and ("sources" in s2):
         try:
-            obj = json.loads(s2)
+            obj = json_loads(s2)
             sources = obj.get("sources", {})
             chunks = []
             for fname, meta in sources.items():
@@ -153,11 +302,55 @@ def flatten_source_to_sol(source_code: str) -> str:
 
     return s
 
-def main():
+async def fetch_all(pairs: List[Tuple[str, str]]):
+    """
+    Yield (chain, addr, json, sol_text) as lookups finish; at most MAX_INFLIGHT in flight.
+    Standard-JSON sources (often MBs) are flattened in worker processes, overlapping
+    with the network waits of other lookups. Results pass through a bounded queue to
+    main(), the single writer of every output file, so a slow disk holds back new
+    requests instead of piling up payloads in memory.
+    """
+    sem = asyncio.Semaphore(MAX_INFLIGHT)
+    q: asyncio.Queue = asyncio.Queue(maxsize=WRITE_QUEUE)
+    limiter = ExplorerQuota(ETHERSCAN_RPS, ETHERSCAN_RPM)
+    loop = asyncio.get_running_loop()
+    # one keep-alive pool for the whole run; idle sockets outlive quota waits, DNS is cached
+    connector = aiohttp.TCPConnector(limit_per_host=64, ttl_dns_cache=300, keepalive_timeout=60)
+    with ProcessPoolExecutor() as pool:
+        async with aiohttp.ClientSession(connector=connector) as session:
+            async def one(chain: str, addr: str):
+                async with sem:
+                    j = await req_getsource(session, limiter, CHAINID[chain], addr)
+                    src = is_verified_payload(j or {})[3]
+                    if src.startswith("{"):
+                        sol_text = await loop.run_in_executor(pool, flatten_source_to_sol, src)
+                    else:
+                        sol_text = flatten_source_to_sol(src)  # plain Solidity: nothing to parse
+                    await q.put((chain, addr, j, sol_text))
+
+            async def produce():
+                try:
+                    await asyncio.gather(*(one(c, a) for c, a in pairs))
+                    await q.put(None)  # sentinel: no more results
+                except Exception as e:
+                    await q.put(e)  # re-raised on the writer side
+
+            producer = asyncio.create_task(produce())
+            try:
+                while (item := await q.get()) is not None:
+                    if isinstance(item, Exception):
+                        raise item
+                    yield item
+            finally:
+                producer.cancel()
+
+async def main():
+    if not API_KEY:
+        raise SystemExit("Missing API key: set EXPLORER_API_KEY (or ETHERSCAN_API_KEY) in .env")
     if not INFILE.exists():
         raise SystemExit(f"Missing input: {INFILE}")
 
-    df = pd.read_csv(INFILE, low_memory=False)
+    df = pd.read_csv(INFILE, usecols=lambda c: c in INPUT_COLS, dtype=str, engine="c")
 
     # Normalize to required cols: chain, address
     if "address" not in df.columns and "contract_address" in df.columns:
@@ -169,7 +362,7 @@ def main():
     df["address"] = df["address"].map(norm_addr)
 
     df = df[df["chain"].isin(CHAINID.keys())].copy()
-    df = df[df["address"].str.startswith("0x") & (df["address"].str.len() == 42)].copy()
+    df = df[df["address"].map(ADDR_RE.fullmatch).notna()].copy()
     df = df.drop_duplicates(subset=["chain", "address"]).reset_index(drop=True)
 
     if MAX_ADDR and MAX_ADDR > 0:
@@ -178,68 +371,109 @@ def main():
     print("Seeds (unique chain,address):", len(df))
     print(df["chain"].value_counts().head(20).to_string())
 
-    ck = load_ckpt()
-    done = set(ck.get("done", []))  # keys like "chain:address"
-    rows: List[dict] = ck.get("rows", [])
+    check_headers()
+    done, ends = load_ckpt()  # keys like "chain:address"
+    done = recover_outputs(done, ends)
+    done |= written_keys(OUT_CSV)  # rows already on disk count as done too
 
     checked = 0
     kept_source = 0
 
-    for _, r in df.iterrows():
-        chain = r["chain"]
-        addr = r["address"]
-        key = f"{chain}:{addr}"
-        if key in done:
-            continue
+    todo = [(chain, addr) for chain, addr in zip(df["chain"], df["address"]) if f"{chain}:{addr}" not in done]
 
-        checked += 1
-        cid = CHAINID[chain]
-
-        j = req_getsource(cid, addr)
-        verified, cname, abi, src = is_verified_payload(j or {})
-
-        # Cache raw JSON always (for reproducibility)
-        cdir = CACHE_DIR / chain
-        cdir.mkdir(parents=True, exist_ok=True)
-        (cdir / f"{addr}.json").write_text(json.dumps(j or {}, ensure_ascii=False), encoding="utf-8")
-
-        # Cache .sol only if we have any source code
-        sol_text = flatten_source_to_sol(src) if src else ""
-        has_source = 1 if sol_text.strip() else 0
-        if has_source:
-            kept_source += 1
-            (cdir / f"{addr}.sol").write_text(sol_text, encoding="utf-8")
-
-        rows.append({
-            "chain": chain,
-            "address": addr,
-            "chainid": cid,
-            "contract_name": cname,
-            "verified": int(verified),
-            "has_source": int(has_source),
-            "has_abi": int(bool(abi) and ("not verified" not in abi.lower())),
-            "source_len": int(len(sol_text)),
-            "evidence_url": f"{V2_BASE}?module=contract&action=getsourcecode&chainid={cid}&address={addr}",
-        })
-
-        done.add(key)
-
-        if checked % 100 == 0:
-            print(f"checked {checked} | has_source={kept_source} | ckpt={CKPT}")
-            save_ckpt({"done": list(done), "rows": rows})
-
-    save_ckpt({"done": list(done), "rows": rows})
-
-    out = pd.DataFrame(rows).drop_duplicates(subset=["chain", "address"], keep="last")
+    # Rows go straight to the CSVs; nothing accumulates in memory across addresses
     OUT_CSV.parent.mkdir(parents=True, exist_ok=True)
-    out.to_csv(OUT_CSV, index=False)
-
-    tool_ready = out[out["has_source"] == 1].copy()
-    tool_ready.to_csv(OUT_VERIFIED, index=False)
+    out_f, out_w = open_csv(OUT_CSV)
+    ready_f, ready_w = open_csv(OUT_VERIFIED)
+    ckpt_log = CKPT_LOG.open("a", encoding="utf-8")
+    pending: List[str] = []
+    raw: Dict[str, List[str]] = {"chain": [], "address": [], "payload": []}
+    run_tag = time.strftime("%Y%m%d-%H%M%S")
+    parts = 0
+
+    def flush() -> None:
+        # outputs first, so every key in the checkpoint has its rows on disk
+        nonlocal parts
+        out_f.flush()
+        ready_f.flush()
+        if raw["chain"]:
+            pq.write_table(
+                pa.table(raw, schema=RAW_SCHEMA),
+                RAW_DIR / f"part-{run_tag}-{parts:05d}.parquet",
+                compression="zstd",
+            )
+            parts += 1
+            for col in raw.values():
+                col.clear()
+        if not pending:
+            return
+        # keys and output sizes in one line: a torn line loses both together
+        ckpt_log.write(ckpt_line(pending))
+        ckpt_log.flush()
+        os.fsync(ckpt_log.fileno())
+        pending.clear()
+
+    try:
+        async for chain, addr, j, sol_text in fetch_all(todo):
+            key = f"{chain}:{addr}"
+            checked += 1
+            cid = CHAINID[chain]
+
+            verified, cname, abi, src = is_verified_payload(j or {})
+
+            # Cache raw JSON for anything with a name or source (for reproducibility);
+            # negatives carry only empty fields and are already recorded in OUT_CSV
+            if verified or src:
+                raw["chain"].append(chain)
+                raw["address"].append(addr)
+                raw["payload"].append(json_dumps(j or {}))
+
+            # Cache .sol only if we have any source code
+            has_source = 1 if sol_text.strip() else 0
+            if has_source:
+                kept_source += 1
+                cdir = CACHE_DIR / chain
+                cdir.mkdir(parents=True, exist_ok=True)
+                fp = cdir / f"{addr}{SOL_SUFFIX}"
+                if SOL_ZSTD:
+                    fp.write_bytes(zstd.ZstdCompressor(level=3, threads=-1).compress(sol_text.encode("utf-8")))
+                else:
+                    fp.write_text(sol_text, encoding="utf-8")
+
+            row = {
+                "chain": chain,
+                "address": addr,
+                "chainid": cid,
+                "contract_name": cname,
+                "verified": int(verified),
+                "has_source": int(has_source),
+                "has_abi": int(bool(abi) and not abi.startswith(UNVERIFIED_ABI)),
+                "source_len": int(len(sol_text)),
+                "evidence_url": f"{V2_BASE}?module=contract&action=getsourcecode&chainid={cid}&address={addr}",
+            }
+            out_w.writerow(row)
+            if has_source:
+                ready_w.writerow(row)
+
+            done.add(key)
+            pending.append(key)
+
+            if checked % 100 == 0:
+                print(f"checked {checked} | has_source={kept_source} | ckpt={CKPT_LOG}")
+            if checked % RAW_BATCH == 0:
+                flush()
+    finally:
+        flush()
+        for f in (out_f, ready_f, ckpt_log):
+            f.close()
+
+    # summary from the (now complete) outputs; only the small columns are loaded
+    out = pd.read_csv(OUT_CSV, usecols=["chain"])
+    tool_ready = pd.read_csv(OUT_VERIFIED, usecols=["chain"])
 
     print(f"✅ wrote {OUT_CSV} rows={len(out)}")
     print(f"✅ tool-ready (has_source=1): {len(tool_ready)}")
     print(tool_ready["chain"].value_counts().head(20).to_string())
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    asyncio.run(main())
\ No newline at end of file
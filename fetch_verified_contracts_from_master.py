@@ -4,13 +4,22 @@
 from __future__ import annotations
 
 import os
-import time
+import re
+import json
 import random
+import asyncio
 from pathlib import Path
+import aiohttp
 import pandas as pd
-import requests
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from explorer_client import ExplorerQuota
+
 ROOT = Path(__file__).resolve().parent
 load_dotenv(ROOT / ".env")
 
@@ -22,11 +31,19 @@ IN_CANDIDATES = [
 ]
 
 OUT = ROOT / "data_raw" / "contracts" / "verified_contracts_from_master.csv"
+# Only these input columns are read, all as plain strings (no per-column type inference)
+INPUT_COLS = {"chain", "address", "contract_address", "slug"}
+# Full EVM address shape (hex digits included), so malformed input never costs an API call
+ADDR_RE = re.compile(r"0x[0-9a-fA-F]{40}")
 OUT.parent.mkdir(parents=True, exist_ok=True)
 
 # ----- RATE LIMIT -----
-SLEEP_SEC = float(os.getenv("ETHERSCAN_SLEEP_SEC", "0.35"))
+# Explorer quota per base URL (free tier: 5 calls/s); replaces a fixed sleep after every call
+ETHERSCAN_RPS = float(os.getenv("ETHERSCAN_RPS", "5"))
+ETHERSCAN_RPM = float(os.getenv("ETHERSCAN_RPM", "300"))
 TIMEOUT = int(os.getenv("TIMEOUT", "30"))
+MAX_INFLIGHT = int(os.getenv("MASTER_FETCH_INFLIGHT", "1024"))
+_LIMITERS: dict[str, "ExplorerQuota"] = {}
 
 def _norm_chain(x: str) -> str:
     x = (x or "").strip().lower()
@@ -68,7 +85,25 @@ def pick_input() -> Path:
             return p
     raise SystemExit(f"No input found. Tried: {IN_CANDIDATES}")
 
-def call_getsourcecode(chain: str, address: str) -> dict | None:
+def limiter_for(base: str) -> ExplorerQuota:
+    if base not in _LIMITERS:
+        _LIMITERS[base] = ExplorerQuota(ETHERSCAN_RPS, ETHERSCAN_RPM)
+    return _LIMITERS[base]
+
+async def _get_json(session: aiohttp.ClientSession, base: str, params: dict) -> tuple[int, dict | None]:
+    limiter = limiter_for(base)
+    async with limiter:
+        async with session.get(base, params=params, timeout=aiohttp.ClientTimeout(total=TIMEOUT)) as r:
+            limiter.observe(r.headers)
+            if r.status != 200:
+                return r.status, None
+            try:
+                body = await r.read()  # parsed straight from bytes, no str decode first
+                return r.status, (orjson.loads(body) if orjson is not None else json.loads(body))
+            except Exception:
+                return r.status, None
+
+async def call_getsourcecode(session: aiohttp.ClientSession, chain: str, address: str) -> dict | None:
     chain = _norm_chain(chain)
     if chain not in SCANNERS:
         return None
@@ -99,24 +134,18 @@ def call_getsourcecode(chain: str, address: str) -> dict | None:
         params["chainid"] = chainid
 
     try:
-        r = requests.get(base, params=params, timeout=TIMEOUT)
+        status, j = await _get_json(session, base, params)
     except Exception:
         return None
 
-    if r.status_code in (429, 403):
-        time.sleep(2.0 + random.random())
+    if status in (429, 403):
+        await asyncio.sleep(2.0 + random.random())
         try:
-            r = requests.get(base, params=params, timeout=TIMEOUT)
+            status, j = await _get_json(session, base, params)
         except Exception:
             return None
 
-    if r.status_code != 200:
-        return None
-
-    try:
-        return r.json()
-    except Exception:
-        return None
+    return j
 
 def is_verified_response(j: dict) -> tuple[bool, str]:
     if not isinstance(j, dict):
@@ -133,9 +162,22 @@ def is_verified_response(j: dict) -> tuple[bool, str]:
     # Some scanners return empty SourceCode for unverified; treat that as not verified.
     return (len(src) > 0, name)
 
-def main():
+async def fetch_all(items: list[tuple[str, str, str]]):
+    """Yield (chain, addr, slug, json) as lookups finish; at most MAX_INFLIGHT in flight."""
+    sem = asyncio.Semaphore(MAX_INFLIGHT)
+    # one keep-alive pool for the whole run; idle sockets outlive quota waits, DNS is cached
+    connector = aiohttp.TCPConnector(limit_per_host=64, ttl_dns_cache=300, keepalive_timeout=60)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        async def one(chain: str, addr: str, slug: str):
+            async with sem:
+                return chain, addr, slug, await call_getsourcecode(session, chain, addr)
+
+        for fut in asyncio.as_completed([one(*it) for it in items]):
+            yield await fut
+
+async def main():
     infile = pick_input()
-    df = pd.read_csv(infile)
+    df = pd.read_csv(infile, usecols=lambda c: c in INPUT_COLS, dtype=str, engine="c")
 
     # normalize columns
     if "address" not in df.columns and "contract_address" in df.columns:
@@ -147,7 +189,7 @@ def main():
 
     df["chain"] = df["chain"].fillna("").astype(str).map(_norm_chain)
     df["address"] = df["address"].fillna("").astype(str).str.strip()
-    df = df[df["address"].str.startswith("0x") & (df["address"].str.len() == 42)].copy()
+    df = df[df["address"].map(ADDR_RE.fullmatch).notna()].copy()
     df = df.drop_duplicates(subset=["chain","address"])
 
     print("Input unique (chain,address):", len(df))
@@ -157,11 +199,10 @@ def main():
     rows = []
     verified_ct = 0
 
-    for i, r in df.iterrows():
-        chain = r["chain"]
-        addr = r["address"]
+    slugs = df["slug"].fillna("") if "slug" in df.columns else [""] * len(df)
+    items = list(zip(df["chain"], df["address"], slugs))
 
-        j = call_getsourcecode(chain, addr)
+    async for chain, addr, slug, j in fetch_all(items):
         if j is None:
             continue
 
@@ -169,7 +210,7 @@ def main():
         if ok:
             verified_ct += 1
             rows.append({
-                "slug": r.get("slug",""),
+                "slug": slug,
                 "address": addr.lower(),
                 "chain": chain,
                 "source": "getsourcecode",
@@ -181,11 +222,9 @@ def main():
         if verified_ct % 200 == 0 and verified_ct > 0:
             print("verified so far:", verified_ct)
 
-        time.sleep(SLEEP_SEC)
-
     out = pd.DataFrame(rows)
     out.to_csv(OUT, index=False)
     print(f"✅ Wrote {len(out)} verified rows -> {OUT}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    asyncio.run(main())
\ No newline at end of file
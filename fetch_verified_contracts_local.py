@@ -4,20 +4,35 @@
 from __future__ import annotations
 
 import os
-import time
+import re
+import json
+import asyncio
 from pathlib import Path
 from typing import Dict, Any, Optional, Tuple
 
+import aiohttp
 import pandas as pd
-import requests
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from explorer_client import ExplorerQuota
+
 PROJECT_ROOT = Path(__file__).resolve().parent
 load_dotenv(PROJECT_ROOT / ".env")
 
 # ✅ Use the file you actually created (change to master_contracts.csv if you prefer)
 INFILE = PROJECT_ROOT / "data_raw" / "contracts" / "master_contracts_chain_address.csv"
 OUTFILE = PROJECT_ROOT / "data_raw" / "contracts" / "verified_contracts_local.csv"
+# Only these input columns are read, all as plain strings (no per-column type inference)
+INPUT_COLS = {"chain", "address", "contract_address", "slug"}
+# Full EVM address shape (hex digits included), so malformed input never costs an API call
+ADDR_RE = re.compile(r"0x[0-9a-fA-F]{40}")
+# Explorers answer an unverified contract's ABI with this fixed message
+UNVERIFIED_ABI = "Contract source code not verified"
 OUTFILE.parent.mkdir(parents=True, exist_ok=True)
 
 # v2 unified base (set in .env; fallback here)
@@ -25,9 +40,12 @@ V2_BASE = os.getenv("EXPLORER_BASE_URL", "https://api.etherscan.io/v2/api").stri
 API_KEY = (os.getenv("EXPLORER_API_KEY") or os.getenv("ETHERSCAN_API_KEY") or "").strip()
 
 TIMEOUT = 25
-SLEEP_SEC = float(os.getenv("ETHERSCAN_SLEEP_SEC", "0.25"))
+# Explorer quota (free tier: 5 calls/s); replaces a fixed sleep after every call
+ETHERSCAN_RPS = float(os.getenv("ETHERSCAN_RPS", "5"))
+ETHERSCAN_RPM = float(os.getenv("ETHERSCAN_RPM", "300"))
 RETRY_SLEEP = 3.0
 MAX_RETRIES = 5
+MAX_INFLIGHT = 1024
 
 CHAINID: Dict[str, int] = {
     "ethereum": 1,
@@ -59,7 +77,7 @@ def norm_chain(x: Any) -> str:
 def norm_addr(x: Any) -> str:
     return str(x or "").strip()
 
-def request_json_v2(chain: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+async def request_json_v2(session: aiohttp.ClientSession, limiter: ExplorerQuota, chain: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     if not API_KEY:
         return None
     if chain not in CHAINID:
@@ -71,20 +89,20 @@ def request_json_v2(chain: str, params: Dict[str, Any]) -> Optional[Dict[str, An
 
     for attempt in range(1, MAX_RETRIES + 1):
         try:
-            r = requests.get(V2_BASE, params=p, timeout=TIMEOUT)
-            if r.status_code in (403, 429):
-                time.sleep(RETRY_SLEEP * attempt)
-                continue
-            r.raise_for_status()
-            j = r.json()
-            time.sleep(SLEEP_SEC)
-            return j
+            async with limiter:
+                async with session.get(V2_BASE, params=p, timeout=aiohttp.ClientTimeout(total=TIMEOUT)) as r:
+                    limiter.observe(r.headers)
+                    if r.status not in (403, 429):
+                        r.raise_for_status()
+                        body = await r.read()  # parsed straight from bytes, no str decode first
+                        return orjson.loads(body) if orjson is not None else json.loads(body)
         except Exception:
-            time.sleep(RETRY_SLEEP * attempt)
+            pass
+        await asyncio.sleep(RETRY_SLEEP * attempt)
     return None
 
-def is_verified(chain: str, addr: str) -> Tuple[bool, str, bool, bool]:
-    j = request_json_v2(chain, {
+async def is_verified(session: aiohttp.ClientSession, limiter: ExplorerQuota, chain: str, addr: str) -> Tuple[bool, str, bool, bool]:
+    j = await request_json_v2(session, limiter, chain, {
         "module": "contract",
         "action": "getsourcecode",
         "address": addr,
@@ -99,19 +117,36 @@ def is_verified(chain: str, addr: str) -> Tuple[bool, str, bool, bool]:
 
     it = res[0]
     contract_name = str(it.get("ContractName", "") or "").strip()
+    if not contract_name:
+        # unverified: the (possibly multi-MB) ABI/source are never looked at
+        return (False, "", False, False)
     abi = str(it.get("ABI", "") or "").strip()
     source = str(it.get("SourceCode", "") or "").strip()
 
-    has_abi = bool(abi) and ("not verified" not in abi.lower())
+    has_abi = bool(abi) and not abi.startswith(UNVERIFIED_ABI)
     has_source = bool(source)
     verified = bool(contract_name) and (has_abi or has_source)
     return (verified, contract_name, has_source, has_abi)
 
-def main():
+async def check_all(items):
+    """Yield (chain, addr, slug, is_verified result) as lookups finish; at most MAX_INFLIGHT in flight."""
+    sem = asyncio.Semaphore(MAX_INFLIGHT)
+    limiter = ExplorerQuota(ETHERSCAN_RPS, ETHERSCAN_RPM)
+    # one keep-alive pool for the whole run; idle sockets outlive quota waits, DNS is cached
+    connector = aiohttp.TCPConnector(limit_per_host=64, ttl_dns_cache=300, keepalive_timeout=60)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        async def one(chain: str, addr: str, slug):
+            async with sem:
+                return chain, addr, slug, await is_verified(session, limiter, chain, addr)
+
+        for fut in asyncio.as_completed([one(*it) for it in items]):
+            yield await fut
+
+async def main():
     if not INFILE.exists():
         raise SystemExit(f"Missing input: {INFILE}")
 
-    df = pd.read_csv(INFILE)
+    df = pd.read_csv(INFILE, usecols=lambda c: c in INPUT_COLS, dtype=str, engine="c")
 
     # accept contract_address → address
     if "address" not in df.columns and "contract_address" in df.columns:
@@ -128,7 +163,7 @@ def main():
 
     # basic address sanity
     df["address"] = df["address"].astype(str).str.strip()
-    df = df[df["address"].str.startswith("0x") & (df["address"].str.len() == 42)].copy()
+    df = df[df["address"].map(ADDR_RE.fullmatch).notna()].copy()
 
     df = df.drop_duplicates(subset=["chain", "address"]).reset_index(drop=True)
 
@@ -136,12 +171,12 @@ def main():
     print("Chains:\n", df["chain"].value_counts().to_string())
 
     out_rows = []
-    for i, row in df.iterrows():
-        chain = row["chain"]
-        addr = row["address"]
-        slug = row["slug"] if "slug" in df.columns else ""
+    slugs = df["slug"] if "slug" in df.columns else [""] * len(df)
+    items = list(zip(df["chain"], df["address"], slugs))
 
-        ok, cname, has_source, has_abi = is_verified(chain, addr)
+    checked = 0
+    async for chain, addr, slug, (ok, cname, has_source, has_abi) in check_all(items):
+        checked += 1
         if ok:
             out_rows.append({
                 "slug": slug,
@@ -154,12 +189,12 @@ def main():
                 "has_abi": int(has_abi),
             })
 
-        if (i + 1) % 50 == 0:
-            print(f"checked {i+1}/{len(df)} | verified_kept={len(out_rows)}")
+        if checked % 50 == 0:
+            print(f"checked {checked}/{len(df)} | verified_kept={len(out_rows)}")
 
     out = pd.DataFrame(out_rows)
     out.to_csv(OUTFILE, index=False)
     print(f"✅ Wrote {len(out)} verified rows -> {OUTFILE}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    asyncio.run(main())
\ No newline at end of file
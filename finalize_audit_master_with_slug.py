@@ -1,28 +1,50 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import csv
 from pathlib import Path
-import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from pyarrow import csv as pa_csv
 
 ROOT = Path(__file__).resolve().parent
 
 AUDIT_WITH_SLUG = ROOT / "data_raw" / "audits" / "audit_master_with_slug.csv"
 LLAMA = ROOT / "data_raw" / "llama_protocols.csv"
 OUT = ROOT / "data_raw" / "audits" / "audit_master_with_slug_defi_only.csv"
+LLAMA_COLS = ["slug","name","symbol","category","tvl","chains"]
+
+def read_str_csv(path, columns=None):
+    # every column as a string: values pass through unchanged, empty cells become nulls
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        header = next(csv.reader(f))
+    return pa_csv.read_csv(
+        path,
+        parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+        convert_options=pa_csv.ConvertOptions(
+            column_types={c: pa.string() for c in header},
+            strings_can_be_null=True,
+            include_columns=columns,
+        ),
+    )
 
 def main():
-    a = pd.read_csv(AUDIT_WITH_SLUG)
-    l = pd.read_csv(LLAMA)[["slug","name","symbol","category","tvl","chains"]]
+    a = read_str_csv(AUDIT_WITH_SLUG)
+    l = read_str_csv(LLAMA, LLAMA_COLS)
 
     # keep only rows where slug exists AND is in DeFiLlama universe
-    a = a[a["slug"].notna()].copy()
-    a = a.merge(l, on="slug", how="inner", suffixes=("", "_llama"))
+    # (hash join in Arrow; _row restores the audit order, as pandas' inner merge kept it)
+    a = a.filter(pc.is_valid(a["slug"]))
+    a = a.append_column("_row", pa.array(range(a.num_rows), pa.int64()))
+    a = a.join(l, keys="slug", join_type="inner", right_suffix="_llama")
+    a = a.sort_by("_row").drop_columns(["_row"])
 
     # scope control (drop obvious CeFi categories if you want)
     # If you want strict DeFi only, you can blacklist categories like "CEX" if present.
     # For now we keep everything in DeFiLlama protocols list because that’s your protocol universe.
-    a.to_csv(OUT, index=False)
-    print(f"✅ Wrote {OUT} | rows={len(a)}")
+    # via pandas: pa_csv.write_csv would quote every field, unlike the previous output
+    a.to_pandas().to_csv(OUT, index=False)
+    print(f"✅ Wrote {OUT} | rows={a.num_rows}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,10 +1,17 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import pandas as pd
 import hashlib
 
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
 PROJECT_ROOT = Path(__file__).resolve().parent
 
 BENCH_ROOT = PROJECT_ROOT / "data_benchmark"
@@ -16,30 +23,69 @@ DATASET_DIRS = [
 OUT_INDEX = BENCH_ROOT / "messiq_contracts_index.csv"
 OUT_INDEX.parent.mkdir(parents=True, exist_ok=True)
 
-def file_id(p: Path) -> str:
+# contract_id hash: "sha1" (default, matches existing indexes / slither outputs) or "xxh3"
+# (needs xxhash; faster, but produces different ids, so only for fresh indexes)
+FILE_ID_HASH = os.getenv("FILE_ID_HASH", "sha1").strip().lower()
+if FILE_ID_HASH == "xxh3" and xxhash is None:
+    raise SystemExit("FILE_ID_HASH=xxh3 requires: pip install xxhash")
+
+def file_id(p) -> str:
     # stable id from relative path
     rel = str(p).encode("utf-8")
-    return hashlib.sha1(rel).hexdigest()[:16]
+    if FILE_ID_HASH == "xxh3":
+        return xxhash.xxh3_64(rel).hexdigest()  # 16 hex chars, same width as the sha1 prefix
+    # path fingerprint only, not a security use
+    return hashlib.sha1(rel, usedforsecurity=False).hexdigest()[:16]
+
+def walk_sol(root: Path):
+    """Yield DirEntry for every .sol under root; the entry's stat is reused for the size."""
+    stack = [str(root)]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for e in it:
+                if e.is_dir(follow_symlinks=False):
+                    stack.append(e.path)
+                elif e.name.endswith(".sol") and e.is_file():
+                    yield e
+
+def sol_row(ds: Path, e: os.DirEntry) -> dict:
+    return {
+        "dataset": ds.name,                 # contract_dataset_ethereum / contract_dataset_github
+        "contract_id": file_id(e.path),
+        "path": os.path.relpath(e.path, PROJECT_ROOT),
+        "filename": e.name,
+        "size_bytes": e.stat().st_size,
+    }
+
+def scan_shard(shard):
+    ds, path = shard
+    return [sol_row(ds, e) for e in walk_sol(path)]
 
 def main():
     rows = []
+    counts = {}
+    shards = []  # (dataset, top-level subfolder): walked in parallel, the walk is syscall-bound
     for ds in DATASET_DIRS:
         if not ds.exists():
             print(f"⚠️ missing dataset folder: {ds}")
             continue
 
-        # scan all .sol
-        sols = list(ds.rglob("*.sol"))
-        print(f"found {len(sols)} .sol in {ds.name}")
-
-        for p in sols:
-            rows.append({
-                "dataset": ds.name,                 # contract_dataset_ethereum / contract_dataset_github
-                "contract_id": file_id(p),
-                "path": str(p.relative_to(PROJECT_ROOT)),
-                "filename": p.name,
-                "size_bytes": p.stat().st_size,
-            })
+        counts[ds.name] = 0
+        with os.scandir(ds) as it:
+            for e in it:
+                if e.is_dir(follow_symlinks=False):
+                    shards.append((ds, e.path))
+                elif e.name.endswith(".sol") and e.is_file():
+                    rows.append(sol_row(ds, e))
+                    counts[ds.name] += 1
+
+    # scan all .sol
+    with ThreadPoolExecutor(max_workers=min(32, max(len(shards), 1))) as ex:
+        for (ds, _), shard_rows in zip(shards, ex.map(scan_shard, shards)):
+            rows.extend(shard_rows)
+            counts[ds.name] += len(shard_rows)
+    for name, n in counts.items():
+        print(f"found {n} .sol in {name}")
 
     df = pd.DataFrame(rows).sort_values(["dataset", "path"]).reset_index(drop=True)
     df.to_csv(OUT_INDEX, index=False)
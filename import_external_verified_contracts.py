@@ -10,6 +10,7 @@ Reads a folder of "external datasets" (CSVs) that contain contract addresses
 Output:
   data_raw/contracts/external_contract_seeds.csv
     columns: chain, address, source_file, notes
+    (EXTERNAL_OUT_FORMAT=parquet writes external_contract_seeds.parquet instead)
 
 Usage:
   python import_external_verified_contracts.py ~/Desktop/results
@@ -19,15 +20,24 @@ If no arg is provided, defaults to ~/Desktop/results
 
 from __future__ import annotations
 
+import csv
+import os
 import re
 import sys
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from pyarrow import csv as pa_csv
 
 OUT = Path("data_raw/contracts/external_contract_seeds.csv")
 OUT.parent.mkdir(parents=True, exist_ok=True)
+# output format: "csv" (default, what the downstream scripts read) or "parquet"
+OUT_FORMAT = os.getenv("EXTERNAL_OUT_FORMAT", "csv").strip().lower()
+if OUT_FORMAT not in ("csv", "parquet"):
+    raise SystemExit(f"EXTERNAL_OUT_FORMAT must be csv or parquet, got {OUT_FORMAT!r}")
 
 ADDR_RE = re.compile(r"^0x[a-fA-F0-9]{40}$")
 
@@ -53,16 +63,32 @@ CHAIN_COL_CANDIDATES = [
     "chain", "network", "blockchain", "platform", "chain_name", "chainid"
 ]
 
-def norm_chain(x) -> str:
-    s = str(x or "").strip().lower()
-    s = CHAIN_ALIASES.get(s, s)
-    return s
+ALIAS_KEYS = pa.array(list(CHAIN_ALIASES))
+ALIAS_VALUES = pa.array(list(CHAIN_ALIASES.values()))
 
-def norm_addr(x) -> str:
-    return str(x or "").strip().lower()
+def norm_chain(col: pa.ChunkedArray) -> pa.ChunkedArray:
+    s = norm_addr(col)
+    # alias lookup in Arrow: position in ALIAS_KEYS (null if absent) -> canonical name
+    return pc.coalesce(pc.take(ALIAS_VALUES, pc.index_in(s, value_set=ALIAS_KEYS)), s)
 
-def detect_cols(df: pd.DataFrame) -> Tuple[Optional[str], Optional[str]]:
-    cols = {c.lower(): c for c in df.columns}
+def norm_addr(col: pa.ChunkedArray) -> pa.ChunkedArray:
+    return pc.utf8_lower(pc.utf8_trim_whitespace(pc.fill_null(col, "")))
+
+def write_out(df: pd.DataFrame, path: Path) -> Path:
+    """CSV by default; EXTERNAL_OUT_FORMAT=parquet writes <name>.parquet (zstd) instead. Returns the path written."""
+    if OUT_FORMAT == "parquet":
+        path = path.with_suffix(".parquet")
+        df.to_parquet(path, index=False, compression="zstd")
+    else:
+        df.to_csv(path, index=False)
+    return path
+
+def read_header(path: Path) -> List[str]:
+    with path.open(newline="", encoding="utf-8-sig") as f:
+        return next(csv.reader(f), [])
+
+def detect_cols(columns: List[str]) -> Tuple[Optional[str], Optional[str]]:
+    cols = {c.lower(): c for c in columns}
     addr_col = None
     chain_col = None
 
@@ -87,37 +113,43 @@ def main():
     if not files:
         raise SystemExit(f"No CSVs found under: {in_dir}")
 
-    all_rows = []
+    # per-file Arrow tables, concatenated by chunk at the end (no pandas concat copy)
+    all_rows: List[pa.Table] = []
     bad_files = 0
 
     for f in files:
         try:
-            df = pd.read_csv(f, low_memory=False)
+            addr_col, chain_col = detect_cols(read_header(f))
+            if not addr_col:
+                # skip files without any plausible address column
+                continue
+            cols = [addr_col] + ([chain_col] if chain_col else [])
+            t = pa_csv.read_csv(
+                f,
+                parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+                convert_options=pa_csv.ConvertOptions(
+                    include_columns=cols,
+                    column_types={c: pa.string() for c in cols},
+                ),
+            )
         except Exception:
             bad_files += 1
             continue
 
-        addr_col, chain_col = detect_cols(df)
-        if not addr_col:
-            # skip files without any plausible address column
+        address = norm_addr(t[addr_col])
+        # keep only EVM addresses (RE2 match, before anything reaches pandas)
+        keep = pc.match_substring_regex(address, ADDR_RE.pattern)
+        n = pc.sum(keep).as_py() or 0
+        if not n:
             continue
 
-        tmp = pd.DataFrame()
-        tmp["address"] = df[addr_col].map(norm_addr)
-
-        if chain_col:
-            tmp["chain"] = df[chain_col].map(norm_chain)
-        else:
-            tmp["chain"] = ""
-
-        tmp["source_file"] = str(f)
-        tmp["notes"] = f"addr_col={addr_col}" + (f"|chain_col={chain_col}" if chain_col else "|chain_col=None")
-
-        # keep only EVM addresses
-        tmp = tmp[tmp["address"].str.match(ADDR_RE, na=False)].copy()
-
-        if not tmp.empty:
-            all_rows.append(tmp)
+        notes = f"addr_col={addr_col}" + (f"|chain_col={chain_col}" if chain_col else "|chain_col=None")
+        all_rows.append(pa.table({
+            "address": address.filter(keep),
+            "chain": norm_chain(t[chain_col]).filter(keep) if chain_col else pa.array([""] * n),
+            "source_file": pa.array([str(f)] * n),
+            "notes": pa.array([notes] * n),
+        }))
 
     if not all_rows:
         # still write headers (no garbage rows)
@@ -125,21 +157,20 @@ def main():
         print(f"⚠️ No addresses extracted. Wrote empty CSV: {OUT}")
         return
 
-    out = pd.concat(all_rows, ignore_index=True)
+    # few distinct chains / files / notes: dictionary-encode them as pandas categoricals
+    out = pa.concat_tables(all_rows).to_pandas(categories=["chain", "source_file", "notes"])
 
     # de-dupe: prefer rows with chain known
     out["has_chain"] = (out["chain"].fillna("").astype(str).str.strip() != "").astype(int)
     out = out.sort_values(["address", "has_chain"], ascending=[True, False])
+    # (address, chain) unique, so the file is also chain+address unique for the verifiers
     out = out.drop_duplicates(subset=["address", "chain"], keep="first")
-    out = out.drop(columns=["has_chain"])
-
-    # Also create a chain+address unique file (useful for verifiers)
-    out = out.drop_duplicates(subset=["chain", "address"], keep="first")
+    del out["has_chain"]
 
-    out.to_csv(OUT, index=False)
-    print(f"✅ Wrote {len(out)} rows -> {OUT}")
+    out_path = write_out(out, OUT)
+    print(f"✅ Wrote {len(out)} rows -> {out_path}")
     print("Top chains:")
-    print(out["chain"].replace("", "(blank)").value_counts().head(15).to_string())
+    print(out["chain"].value_counts().rename({"": "(blank)"}).head(15).to_string())
     print(f"Files scanned: {len(files)} | unreadable: {bad_files}")
 
 if __name__ == "__main__":
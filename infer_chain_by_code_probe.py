@@ -2,22 +2,36 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
-import os, time, json
+import os, re, json, asyncio
+from collections import Counter
 from pathlib import Path
-from typing import Dict, Any, Optional, List
+from typing import Dict, Optional, List, Tuple
 
+import aiohttp
 import pandas as pd
-import requests
 from dotenv import load_dotenv
 
+from explorer_client import ExplorerQuota
+from verified_cache import VerifiedCache
+
 ROOT = Path(__file__).resolve().parent
 load_dotenv(ROOT / ".env")
 
 INFILE = Path(os.getenv("PROBE_INPUT", ROOT / "data_raw/contracts/master_contracts_llama_adapters.csv"))
+# the only input columns the probes use (also all the Parquet sidecar keeps)
+MASTER_COLS = {"chain", "address", "contract_address"}
+# Output columns, spelled out so a run with no rows still writes headers (and casts cleanly)
+INFER_COLS = ["address", "inferred_chain", "method", "evidence_url"]
 OUT_INFER = ROOT / "data_raw/contracts/adapter_blank_chain_inferred_by_code.csv"
+# output format: "csv" (default, what the downstream scripts read) or "parquet"
+OUT_FORMAT = os.getenv("PROBE_OUT_FORMAT", "csv").strip().lower()
+if OUT_FORMAT not in ("csv", "parquet"):
+    raise SystemExit(f"PROBE_OUT_FORMAT must be csv or parquet, got {OUT_FORMAT!r}")
 
-CKPT = ROOT / "outputs/ckpt_probe_blank_chain_code.json"
+CKPT = ROOT / "outputs/ckpt_probe_blank_chain_code.json"  # legacy full snapshot, migrated on first run
+CKPT_LOG = CKPT.with_suffix(".jsonl")  # one result line per probed address
 CKPT.parent.mkdir(parents=True, exist_ok=True)
+FLUSH_EVERY = 50  # addresses between checkpoint flushes
 
 V2_BASE = os.getenv("EXPLORER_BASE_URL", "https://api.etherscan.io/v2/api").strip()
 API_KEY = (os.getenv("EXPLORER_API_KEY") or os.getenv("ETHERSCAN_API_KEY") or "").strip()
@@ -34,30 +48,73 @@ CHAINID: Dict[str, int] = {
     "linea": 59144, "scroll": 534352, "mantle": 5000, "blast": 81457,
     "metis": 1088, "gnosis": 100, "sei": 1329,
 }
+# chains without a chainid are dropped once here instead of skipped per address
+PROBE_CHAINS = [c for c in PROBE_CHAINS if c in CHAINID]
 
 TIMEOUT = float(os.getenv("PROBE_TIMEOUT", "25"))
-SLEEP_SEC = float(os.getenv("PROBE_SLEEP_SEC", "0.20"))
+# Explorer quota (free tier: 5 calls/s); replaces a fixed sleep after every call
+ETHERSCAN_RPS = float(os.getenv("ETHERSCAN_RPS", "5"))
+ETHERSCAN_RPM = float(os.getenv("ETHERSCAN_RPM", "300"))
+MAX_INFLIGHT = int(os.getenv("PROBE_INFLIGHT", "1024"))  # addresses probed concurrently
 RETRY_SLEEP = float(os.getenv("PROBE_RETRY_SLEEP", "1.5"))
 MAX_RETRIES = int(os.getenv("PROBE_MAX_RETRIES", "4"))
 MAX_ADDR = int(os.getenv("PROBE_MAX_ADDR", "0"))  # 0 = all
-
-def norm_addr(x: Any) -> str:
-    return str(x or "").strip()
-
-def load_ckpt() -> dict:
+# (chainid, address) -> has deployed code; same store as verified_cache, own file, so a
+# chain miss is not re-queried on a rerun or after a crash mid-scan
+CODE_CACHE = ROOT / "outputs/probe_code_cache.db"
+# Full EVM address shape (hex digits included), one pass instead of startswith + len
+ADDR_RE = re.compile(r"0x[0-9a-fA-F]{40}")
+
+def write_out(df: pd.DataFrame, path: Path) -> Path:
+    """CSV by default; PROBE_OUT_FORMAT=parquet writes <name>.parquet (zstd) instead. Returns the path written."""
+    if OUT_FORMAT == "parquet":
+        path = path.with_suffix(".parquet")
+        df.to_parquet(path, index=False, compression="zstd")
+    else:
+        df.to_csv(path, index=False)
+    return path
+
+def load_master(path: Path) -> pd.DataFrame:
+    """
+    chain/address columns of the input master. A Parquet sidecar (same name, .parquet)
+    is written on first read and reused while it is at least as new as the CSV.
+    """
+    side = path.with_suffix(".parquet")
+    if side.exists() and side.stat().st_mtime >= path.stat().st_mtime:
+        return pd.read_parquet(side)
+    # C parser, plain strings: Arrow's type inference would read short "0x.." values as hex ints
+    df = pd.read_csv(path, usecols=lambda c: c in MASTER_COLS, dtype=str, engine="c")
+    try:
+        df.to_parquet(side, index=False)
+    except OSError:
+        pass  # read-only input folder: just parse the CSV again next time
+    return df
+
+def load_ckpt() -> List[dict]:
+    """Results of every address probed so far, streamed from the JSONL log in one pass."""
+    results: List[dict] = []
     if CKPT.exists():
         try:
-            return json.loads(CKPT.read_text(encoding="utf-8"))
+            results = json.loads(CKPT.read_text(encoding="utf-8")).get("results", [])
         except Exception:
-            return {}
-    return {}
+            results = []
+    if CKPT_LOG.exists():
+        with CKPT_LOG.open("r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    results.append(json.loads(line))
+                except ValueError:
+                    continue  # torn last line from a killed run
 
-def save_ckpt(state: dict) -> None:
-    CKPT.write_text(json.dumps(state, ensure_ascii=False, indent=2), encoding="utf-8")
-
-def req_code(chainid: int, address: str) -> Optional[str]:
-    if not API_KEY:
-        raise SystemExit("Missing API key: set EXPLORER_API_KEY (or ETHERSCAN_API_KEY) in .env")
+    if CKPT.exists():
+        # Snapshot from before the log: rewrite it as log lines once
+        tmp = CKPT_LOG.with_name(CKPT_LOG.name + ".tmp")
+        tmp.write_text("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in results), encoding="utf-8")
+        tmp.replace(CKPT_LOG)
+        CKPT.unlink()
+    return results
+
+async def req_code(session: aiohttp.ClientSession, limiter: ExplorerQuota, chainid: int, address: str) -> Optional[str]:
     params = {
         "module": "proxy",
         "action": "eth_getCode",
@@ -68,99 +125,131 @@ def req_code(chainid: int, address: str) -> Optional[str]:
     }
     for attempt in range(1, MAX_RETRIES + 1):
         try:
-            r = requests.get(V2_BASE, params=params, timeout=TIMEOUT)
-            if r.status_code in (403, 429):
-                time.sleep(RETRY_SLEEP * attempt)
-                continue
-            r.raise_for_status()
-            j = r.json()
-            time.sleep(SLEEP_SEC)
-            # Etherscan proxy returns {"result":"0x..."} typically
-            code = j.get("result")
-            if isinstance(code, str):
-                return code
-            return None
+            async with limiter:
+                async with session.get(V2_BASE, params=params, timeout=aiohttp.ClientTimeout(total=TIMEOUT)) as r:
+                    limiter.observe(r.headers)
+                    if r.status not in (403, 429):
+                        r.raise_for_status()
+                        j = json.loads(await r.read())
+                        # Etherscan proxy returns {"result":"0x..."} typically
+                        code = j.get("result")
+                        if isinstance(code, str):
+                            return code
+                        return None
         except Exception:
-            time.sleep(RETRY_SLEEP * attempt)
+            pass
+        await asyncio.sleep(RETRY_SLEEP * attempt)
     return None
 
-def main():
+def probe_order(hits: Counter) -> List[str]:
+    """PROBE_CHAINS by descending hit count so far; ties keep the configured priority."""
+    return sorted(PROBE_CHAINS, key=lambda c: -hits[c])
+
+async def probe_address(session: aiohttp.ClientSession, limiter: ExplorerQuota, cache: VerifiedCache, addr: str, order: List[str]) -> Tuple[str, str]:
+    """(found_chain, evidence_url) for the first chain in `order` with deployed code."""
+    for ch in order:
+        cid = CHAINID[ch]
+        has_code = cache.get(addr, cid)
+        if has_code is None:
+            code = await req_code(session, limiter, cid, addr)
+            has_code = bool(code) and code != "0x"
+            # only hex answers are definitive (errors come back as a message string)
+            if code and code.startswith("0x"):
+                cache.put(addr, cid, has_code)
+        if has_code:
+            return ch, f"{V2_BASE}?module=proxy&action=eth_getCode&chainid={cid}&address={addr}&tag=latest"
+    return "", ""
+
+async def probe_all(addrs: List[str], hits: Counter):
+    """
+    Yield (addr, found_chain, evidence_url) as probes finish; at most MAX_INFLIGHT addresses
+    in flight. Chains stay sequential per address (stop at the first hit), tried in
+    probe_order(hits) as of the moment the address starts; the caller updates hits.
+    """
+    sem = asyncio.Semaphore(MAX_INFLIGHT)
+    limiter = ExplorerQuota(ETHERSCAN_RPS, ETHERSCAN_RPM)
+    # one keep-alive pool for the whole run; idle sockets outlive quota waits, DNS is cached
+    connector = aiohttp.TCPConnector(limit_per_host=64, ttl_dns_cache=300, keepalive_timeout=60)
+    with VerifiedCache(CODE_CACHE) as cache:
+        async with aiohttp.ClientSession(connector=connector) as session:
+            async def one(addr: str):
+                async with sem:
+                    return (addr, *await probe_address(session, limiter, cache, addr, probe_order(hits)))
+
+            for fut in asyncio.as_completed([one(a) for a in addrs]):
+                yield await fut
+        print(f"code-cache hits: {cache.hits}")
+
+async def main():
+    if not API_KEY:
+        raise SystemExit("Missing API key: set EXPLORER_API_KEY (or ETHERSCAN_API_KEY) in .env")
     if not INFILE.exists():
         raise SystemExit(f"Missing input: {INFILE}")
 
-    df = pd.read_csv(INFILE)
+    df = load_master(INFILE)
     if "address" not in df.columns and "contract_address" in df.columns:
         df = df.rename(columns={"contract_address": "address"})
     if "chain" not in df.columns:
         df["chain"] = ""
 
     df["chain"] = df["chain"].fillna("").astype(str).str.strip().str.lower()
-    df["address"] = df["address"].map(norm_addr)
+    addr = df["address"].fillna("").str.strip()
 
-    blank = df[df["chain"] == ""].copy()
-    blank = blank[blank["address"].astype(str).str.startswith("0x") & (blank["address"].astype(str).str.len() == 42)].copy()
-    blank = blank.drop_duplicates(subset=["address"]).reset_index(drop=True)
+    # one mask (blank chain + full EVM address) over the master, no intermediate frame copies
+    blank = addr[df["chain"].eq("") & addr.str.fullmatch(ADDR_RE.pattern)].drop_duplicates().tolist()
 
     if MAX_ADDR and MAX_ADDR > 0:
-        blank = blank.head(MAX_ADDR).copy()
+        blank = blank[:MAX_ADDR]
 
     print(f"Blank-chain unique addresses to probe: {len(blank)}")
     print("Probe chains order:", PROBE_CHAINS)
 
-    ck = load_ckpt()
-    done = set(ck.get("done", []))
-    results: List[dict] = ck.get("results", [])
+    results = load_ckpt()
+    done = {r["address"] for r in results}
+    # hit counts per chain, rebuilt from the checkpointed results; most likely chains go first
+    hits = Counter(r["inferred_chain"] for r in results if r.get("inferred_chain"))
 
     checked = 0
     inferred = 0
 
-    for addr in blank["address"].tolist():
-        if addr in done:
-            continue
-
-        checked += 1
-        found_chain = ""
-        evidence = ""
-
-        for ch in PROBE_CHAINS:
-            cid = CHAINID.get(ch)
-            if not cid:
-                continue
-            code = req_code(cid, addr)
-            if code and code != "0x":
-                found_chain = ch
-                evidence = f"{V2_BASE}?module=proxy&action=eth_getCode&chainid={cid}&address={addr}&tag=latest"
-                break
-
-        if found_chain:
-            inferred += 1
-            results.append({
-                "address": addr,
-                "inferred_chain": found_chain,
-                "method": "probe_eth_getCode_v2",
-                "evidence_url": evidence,
-            })
-        else:
-            results.append({
-                "address": addr,
-                "inferred_chain": "",
-                "method": "probe_eth_getCode_v2",
-                "evidence_url": "",
-            })
-
-        done.add(addr)
-
-        if checked % 50 == 0:
-            print(f"checked {checked} | inferred={inferred} | ckpt={CKPT}")
-            save_ckpt({"done": list(done), "results": results})
-
-    save_ckpt({"done": list(done), "results": results})
-
-    out = pd.DataFrame(results).drop_duplicates(subset=["address"], keep="last")
+    todo = [a for a in blank if a not in done]
+
+    # append-only: each address adds one line, the log is never rewritten
+    with CKPT_LOG.open("a", encoding="utf-8") as ckpt_log:
+        async for addr, found_chain, evidence in probe_all(todo, hits):
+            checked += 1
+
+            if found_chain:
+                inferred += 1
+                hits[found_chain] += 1
+                rec = {
+                    "address": addr,
+                    "inferred_chain": found_chain,
+                    "method": "probe_eth_getCode_v2",
+                    "evidence_url": evidence,
+                }
+            else:
+                rec = {
+                    "address": addr,
+                    "inferred_chain": "",
+                    "method": "probe_eth_getCode_v2",
+                    "evidence_url": "",
+                }
+            results.append(rec)
+            ckpt_log.write(json.dumps(rec, ensure_ascii=False) + "\n")
+
+            done.add(addr)
+
+            if checked % FLUSH_EVERY == 0:
+                print(f"checked {checked} | inferred={inferred} | order={probe_order(hits)[:4]} | ckpt={CKPT_LOG}")
+                ckpt_log.flush()
+
+    out = pd.DataFrame(results, columns=INFER_COLS).drop_duplicates(subset=["address"], keep="last")
+    out = out.astype({"inferred_chain": "category", "method": "category"})  # a handful of values each
     OUT_INFER.parent.mkdir(parents=True, exist_ok=True)
-    out.to_csv(OUT_INFER, index=False)
-    print(f"✅ wrote {OUT_INFER} rows={len(out)}")
+    out_path = write_out(out, OUT_INFER)
+    print(f"✅ wrote {out_path} rows={len(out)}")
     print(out["inferred_chain"].value_counts(dropna=False).head(20).to_string())
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    asyncio.run(main())
\ No newline at end of file
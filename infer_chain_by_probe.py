@@ -19,6 +19,7 @@ Expected columns:
 Outputs:
   data_raw/contracts/adapter_blank_chain_inferred.csv
   data_raw/contracts/verified_contracts_from_probed_blanks.csv
+  (PROBE_OUT_FORMAT=parquet writes the same names as .parquet instead)
 
 Notes:
   - This is intentionally "best-effort" and can be expensive.
@@ -29,25 +30,41 @@ Notes:
 from __future__ import annotations
 
 import os
-import time
+import re
 import json
+import asyncio
+from collections import Counter
 from pathlib import Path
 from typing import Dict, Any, Optional, List, Tuple
 
+import aiohttp
 import pandas as pd
-import requests
 from dotenv import load_dotenv
 
+from explorer_client import ExplorerQuota
+from verified_cache import VerifiedCache
+
 ROOT = Path(__file__).resolve().parent
 load_dotenv(ROOT / ".env")
 
 # ---------- CONFIG ----------
 INFILE = Path(os.getenv("PROBE_INPUT", ROOT / "data_raw/contracts/master_contracts_llama_adapters.csv"))
+# the only input columns the probes use (also all the Parquet sidecar keeps)
+MASTER_COLS = {"chain", "address", "contract_address"}
+# Output columns, spelled out so a run with no rows still writes headers (and casts cleanly)
+INFER_COLS = ["address", "inferred_chain", "method", "contract_name", "has_source", "has_abi", "evidence_url"]
+VER_COLS = ["slug", "address", "chain", "source", "verified", "contract_name", "has_source", "has_abi"]
 OUT_INFER = ROOT / "data_raw/contracts/adapter_blank_chain_inferred.csv"
 OUT_VER = ROOT / "data_raw/contracts/verified_contracts_from_probed_blanks.csv"
+# output format: "csv" (default, what the downstream scripts read) or "parquet"
+OUT_FORMAT = os.getenv("PROBE_OUT_FORMAT", "csv").strip().lower()
+if OUT_FORMAT not in ("csv", "parquet"):
+    raise SystemExit(f"PROBE_OUT_FORMAT must be csv or parquet, got {OUT_FORMAT!r}")
 
-CKPT = ROOT / "outputs/ckpt_probe_blank_chain.json"
+CKPT = ROOT / "outputs/ckpt_probe_blank_chain.json"  # legacy full snapshot, migrated on first run
+CKPT_LOG = CKPT.with_suffix(".jsonl")  # one inference line per probed address
 CKPT.parent.mkdir(parents=True, exist_ok=True)
+FLUSH_EVERY = 50  # addresses between checkpoint flushes
 
 # Etherscan v2 base
 V2_BASE = os.getenv("EXPLORER_BASE_URL", "https://api.etherscan.io/v2/api").strip()
@@ -79,23 +96,24 @@ CHAINID: Dict[str, int] = {
     "gnosis": 100,
     "sei": 1329,
 }
+# chains without a chainid are dropped once here instead of skipped per address
+PROBE_CHAINS = [c for c in PROBE_CHAINS if c in CHAINID]
 
 TIMEOUT = float(os.getenv("PROBE_TIMEOUT", "25"))
-SLEEP_SEC = float(os.getenv("PROBE_SLEEP_SEC", "0.35"))   # be gentle
+# Explorer quota (free tier: 5 calls/s); replaces a fixed sleep after every call
+ETHERSCAN_RPS = float(os.getenv("ETHERSCAN_RPS", "5"))
+ETHERSCAN_RPM = float(os.getenv("ETHERSCAN_RPM", "300"))
+MAX_INFLIGHT = int(os.getenv("PROBE_INFLIGHT", "1024"))  # addresses probed concurrently
 RETRY_SLEEP = float(os.getenv("PROBE_RETRY_SLEEP", "2.0"))
 MAX_RETRIES = int(os.getenv("PROBE_MAX_RETRIES", "4"))
 
 # How many blank addresses to probe (0 = all)
 MAX_ADDR = int(os.getenv("PROBE_MAX_ADDR", "0"))
+# Full EVM address shape (hex digits included), one pass instead of startswith + len
+ADDR_RE = re.compile(r"0x[0-9a-fA-F]{40}")
 
 # ---------- HELPERS ----------
-def norm_addr(x: Any) -> str:
-    return str(x or "").strip()
-
-def _req(chainid: int, address: str) -> Optional[Dict[str, Any]]:
-    if not API_KEY:
-        raise SystemExit("Missing API key: set EXPLORER_API_KEY (or ETHERSCAN_API_KEY) in .env")
-
+async def _req(session: aiohttp.ClientSession, limiter: ExplorerQuota, chainid: int, address: str) -> Optional[Dict[str, Any]]:
     params = {
         "module": "contract",
         "action": "getsourcecode",
@@ -106,16 +124,15 @@ def _req(chainid: int, address: str) -> Optional[Dict[str, Any]]:
 
     for attempt in range(1, MAX_RETRIES + 1):
         try:
-            r = requests.get(V2_BASE, params=params, timeout=TIMEOUT)
-            if r.status_code in (403, 429):
-                time.sleep(RETRY_SLEEP * attempt)
-                continue
-            r.raise_for_status()
-            j = r.json()
-            time.sleep(SLEEP_SEC)
-            return j
+            async with limiter:
+                async with session.get(V2_BASE, params=params, timeout=aiohttp.ClientTimeout(total=TIMEOUT)) as r:
+                    limiter.observe(r.headers)
+                    if r.status not in (403, 429):
+                        r.raise_for_status()
+                        return json.loads(await r.read())
         except Exception:
-            time.sleep(RETRY_SLEEP * attempt)
+            pass
+        await asyncio.sleep(RETRY_SLEEP * attempt)
     return None
 
 def _is_verified_payload(j: Dict[str, Any]) -> Tuple[bool, str, bool, bool]:
@@ -139,23 +156,120 @@ def _is_verified_payload(j: Dict[str, Any]) -> Tuple[bool, str, bool, bool]:
     verified = bool(contract_name) and (has_abi or has_source)
     return (verified, contract_name, has_source, has_abi)
 
-def load_ckpt() -> Dict[str, Any]:
+def probe_order(hits: Counter) -> List[str]:
+    """PROBE_CHAINS by descending hit count so far; ties keep the configured priority."""
+    return sorted(PROBE_CHAINS, key=lambda c: -hits[c])
+
+async def probe_address(session: aiohttp.ClientSession, limiter: ExplorerQuota, cache: VerifiedCache, addr: str, order: List[str]) -> Tuple[str, str, bool, bool]:
+    """(chain, contract_name, has_source, has_abi) of the first chain in `order`
+    where addr is verified; chain is "" when none is. Chains the shared verified
+    cache already has as unverified are skipped without a request."""
+    for ch in order:
+        cid = CHAINID[ch]
+        if cache.get(addr, cid) is False:
+            continue
+        j = await _req(session, limiter, cid, addr)
+        ok, cname, hs, ha = _is_verified_payload(j or {})
+        # Only a definitive answer is cached (rate-limit errors come back as a string result)
+        if j and isinstance(j.get("result"), list):
+            cache.put(addr, cid, ok)
+        if ok:
+            return ch, cname, hs, ha
+    return "", "", False, False
+
+async def probe_all(addrs: List[str], hits: Counter):
+    """
+    Yield (addr, probe_address result) as probes finish; at most MAX_INFLIGHT addresses
+    in flight. Chains stay sequential per address (stop at the first hit), tried in
+    probe_order(hits) as of the moment the address starts; the caller updates hits.
+    """
+    sem = asyncio.Semaphore(MAX_INFLIGHT)
+    limiter = ExplorerQuota(ETHERSCAN_RPS, ETHERSCAN_RPM)
+    # one keep-alive pool for the whole run; idle sockets outlive quota waits, DNS is cached
+    connector = aiohttp.TCPConnector(limit_per_host=64, ttl_dns_cache=300, keepalive_timeout=60)
+    with VerifiedCache() as cache:
+        async with aiohttp.ClientSession(connector=connector) as session:
+            async def one(addr: str):
+                async with sem:
+                    return addr, await probe_address(session, limiter, cache, addr, probe_order(hits))
+
+            for fut in asyncio.as_completed([one(a) for a in addrs]):
+                yield await fut
+        print(f"verified-cache hits: {cache.hits}")
+
+def write_out(df: pd.DataFrame, path: Path) -> Path:
+    """CSV by default; PROBE_OUT_FORMAT=parquet writes <name>.parquet (zstd) instead. Returns the path written."""
+    if OUT_FORMAT == "parquet":
+        path = path.with_suffix(".parquet")
+        df.to_parquet(path, index=False, compression="zstd")
+    else:
+        df.to_csv(path, index=False)
+    return path
+
+def load_master(path: Path) -> pd.DataFrame:
+    """
+    chain/address columns of the input master. A Parquet sidecar (same name, .parquet)
+    is written on first read and reused while it is at least as new as the CSV.
+    """
+    side = path.with_suffix(".parquet")
+    if side.exists() and side.stat().st_mtime >= path.stat().st_mtime:
+        return pd.read_parquet(side)
+    # C parser, plain strings: Arrow's type inference would read short "0x.." values as hex ints
+    df = pd.read_csv(path, usecols=lambda c: c in MASTER_COLS, dtype=str, engine="c")
+    try:
+        df.to_parquet(side, index=False)
+    except OSError:
+        pass  # read-only input folder: just parse the CSV again next time
+    return df
+
+def load_ckpt() -> List[Dict[str, Any]]:
+    """
+    Inference rows of every address probed so far, streamed from the JSONL log in one pass.
+    Verified rows are not logged: ver_row() rebuilds them from the hits.
+    """
+    results: List[Dict[str, Any]] = []
     if CKPT.exists():
         try:
-            return json.loads(CKPT.read_text(encoding="utf-8"))
+            results = json.loads(CKPT.read_text(encoding="utf-8")).get("results_infer", [])
         except Exception:
-            return {}
-    return {}
+            results = []
+    if CKPT_LOG.exists():
+        with CKPT_LOG.open("r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    results.append(json.loads(line))
+                except ValueError:
+                    continue  # torn last line from a killed run
 
-def save_ckpt(state: Dict[str, Any]) -> None:
-    CKPT.write_text(json.dumps(state, ensure_ascii=False, indent=2), encoding="utf-8")
+    if CKPT.exists():
+        # Snapshot from before the log: rewrite it as log lines once
+        tmp = CKPT_LOG.with_name(CKPT_LOG.name + ".tmp")
+        tmp.write_text("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in results), encoding="utf-8")
+        tmp.replace(CKPT_LOG)
+        CKPT.unlink()
+    return results
+
+def ver_row(rec: Dict[str, Any]) -> Dict[str, Any]:
+    """verified_contracts row for an inference hit."""
+    return {
+        "slug": "",
+        "address": rec["address"],
+        "chain": rec["inferred_chain"],
+        "source": "probe_getsourcecode_v2",
+        "verified": 1,
+        "contract_name": rec["contract_name"],
+        "has_source": rec["has_source"],
+        "has_abi": rec["has_abi"],
+    }
 
 # ---------- MAIN ----------
-def main():
+async def main():
+    if not API_KEY:
+        raise SystemExit("Missing API key: set EXPLORER_API_KEY (or ETHERSCAN_API_KEY) in .env")
     if not INFILE.exists():
         raise SystemExit(f"Missing input: {INFILE}")
 
-    df = pd.read_csv(INFILE)
+    df = load_master(INFILE)
 
     # normalize columns
     if "address" not in df.columns and "contract_address" in df.columns:
@@ -166,24 +280,24 @@ def main():
         df["protocol"] = df.get("slug", "")
 
     df["chain"] = df["chain"].fillna("").astype(str).str.strip().str.lower()
-    df["address"] = df["address"].map(norm_addr)
+    addr = df["address"].fillna("").str.strip()
 
     # focus on blank chain only
-    blank = df[df["chain"] == ""].copy()
-    blank = blank[blank["address"].astype(str).str.startswith("0x") & (blank["address"].astype(str).str.len() == 42)].copy()
-    blank = blank.drop_duplicates(subset=["address"]).reset_index(drop=True)
+    # one mask (blank chain + full EVM address) over the master, no intermediate frame copies
+    blank = addr[df["chain"].eq("") & addr.str.fullmatch(ADDR_RE.pattern)].drop_duplicates().tolist()
 
     if MAX_ADDR and MAX_ADDR > 0:
-        blank = blank.head(MAX_ADDR).copy()
+        blank = blank[:MAX_ADDR]
 
     print(f"Blank-chain unique addresses to probe: {len(blank)}")
     print("Probe chains order:", PROBE_CHAINS)
 
     # resume state
-    ck = load_ckpt()
-    done = set(ck.get("done", []))
-    results_infer: List[Dict[str, Any]] = ck.get("results_infer", [])
-    results_ver: List[Dict[str, Any]] = ck.get("results_ver", [])
+    results_infer = load_ckpt()
+    results_ver = [ver_row(r) for r in results_infer if r.get("inferred_chain")]
+    done = {r["address"] for r in results_infer}
+    # hit counts per chain, rebuilt from the checkpointed results; most likely chains go first
+    hits = Counter(r["inferred_chain"] for r in results_infer if r.get("inferred_chain"))
 
     # map for quick skip if already inferred
     already = {r["address"]: r for r in results_infer if "address" in r}
@@ -192,90 +306,62 @@ def main():
     inferred_hits = 0
     verified_hits = 0
 
-    for addr in blank["address"].tolist():
-        if addr in done:
-            continue
-
-        checked += 1
-        found_chain = ""
-        found_name = ""
-        found_has_source = 0
-        found_has_abi = 0
-        evidence = ""
-
-        for ch in PROBE_CHAINS:
-            if ch not in CHAINID:
-                continue
-            j = _req(CHAINID[ch], addr)
-            ok, cname, hs, ha = _is_verified_payload(j or {})
-            if ok:
-                found_chain = ch
-                found_name = cname
-                found_has_source = int(hs)
-                found_has_abi = int(ha)
-                evidence = f"{V2_BASE}?module=contract&action=getsourcecode&chainid={CHAINID[ch]}&address={addr}"
-                break
-
-        if found_chain:
-            inferred_hits += 1
-            results_infer.append({
-                "address": addr,
-                "inferred_chain": found_chain,
-                "method": "probe_getsourcecode_v2",
-                "contract_name": found_name,
-                "has_source": found_has_source,
-                "has_abi": found_has_abi,
-                "evidence_url": evidence,
-            })
-            results_ver.append({
-                "slug": "",
-                "address": addr,
-                "chain": found_chain,
-                "source": "probe_getsourcecode_v2",
-                "verified": 1,
-                "contract_name": found_name,
-                "has_source": found_has_source,
-                "has_abi": found_has_abi,
-            })
-            verified_hits += 1
-        else:
-            results_infer.append({
-                "address": addr,
-                "inferred_chain": "",
-                "method": "probe_getsourcecode_v2",
-                "contract_name": "",
-                "has_source": 0,
-                "has_abi": 0,
-                "evidence_url": "",
-            })
-
-        done.add(addr)
-
-        # periodic save
-        if checked % 50 == 0:
-            print(f"checked {checked} | inferred={inferred_hits} | verified={verified_hits} | ckpt={CKPT}")
-            save_ckpt({
-                "done": list(done),
-                "results_infer": results_infer,
-                "results_ver": results_ver,
-            })
-
-    # final save
-    save_ckpt({
-        "done": list(done),
-        "results_infer": results_infer,
-        "results_ver": results_ver,
-    })
-
-    infer_df = pd.DataFrame(results_infer).drop_duplicates(subset=["address"], keep="last")
-    ver_df = pd.DataFrame(results_ver).drop_duplicates(subset=["chain","address"], keep="last")
+    todo = [a for a in blank if a not in done]
+
+    # append-only: each address adds one line, the log is never rewritten
+    with CKPT_LOG.open("a", encoding="utf-8") as ckpt_log:
+        async for addr, (found_chain, found_name, hs, ha) in probe_all(todo, hits):
+            checked += 1
+            found_has_source = int(hs)
+            found_has_abi = int(ha)
+
+            if found_chain:
+                hits[found_chain] += 1
+                evidence = f"{V2_BASE}?module=contract&action=getsourcecode&chainid={CHAINID[found_chain]}&address={addr}"
+                inferred_hits += 1
+                rec = {
+                    "address": addr,
+                    "inferred_chain": found_chain,
+                    "method": "probe_getsourcecode_v2",
+                    "contract_name": found_name,
+                    "has_source": found_has_source,
+                    "has_abi": found_has_abi,
+                    "evidence_url": evidence,
+                }
+                results_ver.append(ver_row(rec))
+                verified_hits += 1
+            else:
+                rec = {
+                    "address": addr,
+                    "inferred_chain": "",
+                    "method": "probe_getsourcecode_v2",
+                    "contract_name": "",
+                    "has_source": 0,
+                    "has_abi": 0,
+                    "evidence_url": "",
+                }
+            results_infer.append(rec)
+            ckpt_log.write(json.dumps(rec, ensure_ascii=False) + "\n")
+
+            done.add(addr)
+
+            # periodic flush
+            if checked % FLUSH_EVERY == 0:
+                print(f"checked {checked} | inferred={inferred_hits} | verified={verified_hits} | order={probe_order(hits)[:4]} | ckpt={CKPT_LOG}")
+                ckpt_log.flush()
+
+    infer_df = pd.DataFrame(results_infer, columns=INFER_COLS).drop_duplicates(subset=["address"], keep="last")
+    ver_df = pd.DataFrame(results_ver, columns=VER_COLS).drop_duplicates(subset=["chain","address"], keep="last")
+    # a handful of values each
+    infer_df = infer_df.astype({"inferred_chain": "category", "method": "category"})
+    ver_df = ver_df.astype({"chain": "category", "source": "category"})
 
     OUT_INFER.parent.mkdir(parents=True, exist_ok=True)
-    infer_df.to_csv(OUT_INFER, index=False)
-    ver_df.to_csv(OUT_VER, index=False)
+    infer_path = write_out(infer_df, OUT_INFER)
+    ver_path = write_out(ver_df, OUT_VER)
 
-    print(f"✅ wrote {OUT_INFER} rows={len(infer_df)}")
-    print(f"✅ wrote {OUT_VER} rows={len(ver_df)}")
+    print(f"✅ wrote {infer_path} rows={len(infer_df)}")
+    print(f"✅ wrote {ver_path} rows={len(ver_df)}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    asyncio.run(main())
\ No newline at end of file
@@ -6,6 +6,12 @@ import pandas as pd
 import difflib
 import re
 
+try:
+    from rapidfuzz import process, fuzz
+except ImportError:
+    process = None
+    fuzz = None
+
 ROOT = Path(__file__).resolve().parent
 
 AUDIT_IN = ROOT / "data_raw" / "audits" / "audit_master.csv"
@@ -15,17 +21,32 @@ OUT_WITH_SLUG = ROOT / "data_raw" / "audits" / "audit_master_with_slug.csv"
 OUT_UNMATCHED = ROOT / "data_raw" / "audits" / "unmatched_audit_protocols.csv"
 OUT_MANUAL    = ROOT / "data_raw" / "audits" / "manual_name_to_slug.csv"
 
+WS_RE = re.compile(r"\s+")
+
 def norm(s: str) -> str:
     if pd.isna(s):
         return ""
     s = str(s).strip().lower()
-    s = re.sub(r"\s+", " ", s)
+    s = WS_RE.sub(" ", s)
     return s
 
 def best_match(q: str, candidates: list[str], cutoff: float):
     m = difflib.get_close_matches(q, candidates, n=1, cutoff=cutoff)
     return m[0] if m else None
 
+def best_matches(queries: list[str], candidates: list[str], cutoff: float) -> dict:
+    """
+    Best candidate (ratio >= cutoff) for each query, scored in one batched cdist call.
+    Falls back to difflib per query when rapidfuzz is not installed.
+    """
+    if not queries or not candidates:
+        return {}
+    if process is None:
+        return {q: m for q in queries if (m := best_match(q, candidates, cutoff))}
+    scores = process.cdist(queries, candidates, scorer=fuzz.ratio, score_cutoff=cutoff * 100, workers=-1)
+    best = scores.argmax(axis=1)
+    return {q: candidates[j] for q, j, s in zip(queries, best, scores.max(axis=1)) if s > 0}
+
 def main():
     if not AUDIT_IN.exists():
         raise SystemExit(f"Missing {AUDIT_IN}. Build audit_master first.")
@@ -64,20 +85,18 @@ def main():
     # (3) fuzzy match on name
     name_candidates = llama["name_norm"].tolist()
     still = audits["slug"].isna()
-    for idx in audits[still].index:
-        q = audits.at[idx, "proto_norm"]
-        if not q:
-            continue
-        # strict first, then slightly looser
-        m = best_match(q, name_candidates, cutoff=0.93) or best_match(q, name_candidates, cutoff=0.88)
-        if m:
-            audits.at[idx, "slug"] = name_to_slug.get(m)
+    queries = [q for q in audits.loc[still, "proto_norm"].unique() if q]
+    # the best candidate clears the strict 0.93 cutoff whenever any does, so a single
+    # pass at the looser 0.88 picks the same match as strict-then-loose
+    fuzzy = {q: name_to_slug.get(m) for q, m in best_matches(queries, name_candidates, cutoff=0.88).items()}
+    audits.loc[still, "slug"] = audits.loc[still, "proto_norm"].map(fuzzy)
 
     # (4) manual overrides (optional)
     if OUT_MANUAL.exists():
         man = pd.read_csv(OUT_MANUAL)
         if {"protocol_name_raw", "slug"}.issubset(set(man.columns)):
-            man_map = {norm(r["protocol_name_raw"]): r["slug"] for _, r in man.iterrows() if str(r["slug"]).strip()}
+            man = man[man["slug"].astype(str).str.strip().astype(bool)]
+            man_map = dict(zip(man["protocol_name_raw"].map(norm), man["slug"]))
             mask = audits["slug"].isna()
             audits.loc[mask, "slug"] = audits.loc[mask, "proto_norm"].map(man_map)
 
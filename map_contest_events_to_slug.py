@@ -23,15 +23,19 @@ INPUTS = [
 
 OUT = ROOT / "data_raw" / "audits" / "audit_events_long_mapped.csv"
 
+SUFFIX_RE = re.compile(r"[-_ ]?(findings|report|reports|judging|contest|audit)$")
+NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+WS_RE = re.compile(r"\s+")
+
 def norm_name(x: str) -> str:
     if x is None:
         return ""
     x = str(x).strip().lower()
 
     # remove common suffixes and noise
-    x = re.sub(r"[-_ ]?(findings|report|reports|judging|contest|audit)$", "", x)
-    x = re.sub(r"[^a-z0-9]+", " ", x).strip()
-    x = re.sub(r"\s+", " ", x)
+    x = SUFFIX_RE.sub("", x)
+    x = NON_ALNUM_RE.sub(" ", x).strip()
+    x = WS_RE.sub(" ", x)
     return x
 
 def build_index(llama: pd.DataFrame):
@@ -59,14 +63,20 @@ def build_index(llama: pd.DataFrame):
 
     return slug_map, name_map, sym_map, candidates, cand_to_slug
 
-def fuzzy_match(q: str, candidates, cand_to_slug, score_cutoff=90):
-    if not process:
-        return None
-    match = process.extractOne(q, candidates, scorer=fuzz.WRatio, score_cutoff=score_cutoff)
-    if not match:
-        return None
-    best_text = match[0]
-    return cand_to_slug.get(best_text)
+def fuzzy_match_all(queries, candidates, cand_to_slug, score_cutoff=90) -> dict:
+    """
+    query -> slug for every query whose best WRatio candidate reaches score_cutoff.
+    One cdist call scores all queries against the candidates (multithreaded).
+    """
+    if not process or not queries or not candidates:
+        return {}
+    scores = process.cdist(queries, candidates, scorer=fuzz.WRatio, score_cutoff=score_cutoff, workers=-1)
+    best = scores.argmax(axis=1)
+    return {
+        q: cand_to_slug.get(candidates[j])
+        for q, j, s in zip(queries, best, scores.max(axis=1))
+        if s >= score_cutoff
+    }
 
 def main():
     llama = pd.read_csv(LLAMA)
@@ -99,8 +109,9 @@ def main():
     if "slug" not in events.columns:
         events["slug"] = pd.NA
 
-    # map
+    # map (exact passes per row; names left over are fuzzy-matched in one batch below)
     mapped = []
+    residual = {}  # row position -> proto_norm still unmapped after the exact passes
     for raw, proto_norm, sym in zip(
         events["protocol_name_raw"].astype(str),
         events["protocol_norm"].astype(str),
@@ -130,9 +141,13 @@ def main():
             mapped.append(sym_map[sym])
             continue
 
-        # fuzzy
-        slug = fuzzy_match(proto_norm, candidates, cand_to_slug, score_cutoff=90)
-        mapped.append(slug)
+        residual[len(mapped)] = proto_norm
+        mapped.append(None)
+
+    # fuzzy
+    fuzzy = fuzzy_match_all(list(dict.fromkeys(residual.values())), candidates, cand_to_slug, score_cutoff=90)
+    for i, proto_norm in residual.items():
+        mapped[i] = fuzzy.get(proto_norm)
 
     events["slug_mapped"] = mapped
     events["in_llama"] = events["slug_mapped"].notna().astype(int)
@@ -27,10 +27,13 @@ EXTRA_JSON = Path("hacks_extra.json")
 OUT_CSV = Path("merged_hack_events.csv")
 
 
+NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+
+
 def norm_name(s: str) -> str:
     s = (s or "").strip().lower()
     # remove punctuation/spaces
-    s = re.sub(r"[^a-z0-9]+", "", s)
+    s = NON_ALNUM_RE.sub("", s)
     return s
 
 
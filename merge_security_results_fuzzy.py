@@ -1,5 +1,5 @@
 import pandas as pd
-from fuzzywuzzy import process, fuzz
+from rapidfuzz import process, fuzz, utils
 
 # Load audit + vulnerability datasets
 audit = pd.read_csv("data_raw/contracts/audit_metadata_full.csv")
@@ -9,16 +9,23 @@ vuln = pd.read_csv("data_raw/contracts/slither_vulnerabilities.csv")
 audit["protocol_name"] = audit["protocol_name"].astype(str).str.lower().str.strip()
 vuln["protocol_name"] = vuln["protocol_name"].astype(str).str.lower().str.strip()
 
-# Fuzzy-match audit names to vulnerability names
+# Fuzzy-match audit names to vulnerability names: distinct audit names x distinct
+# vulnerability names in one multithreaded cdist call (default_process = fuzzywuzzy's
+# lowercase/strip-punctuation preprocessing)
+vuln_first = vuln.drop_duplicates(subset=["protocol_name"]).set_index("protocol_name", drop=False)
+choices = vuln_first.index.tolist()
+names = audit["protocol_name"].unique().tolist()
 matches = []
-for name in audit["protocol_name"]:
-    match_result = process.extractOne(name, vuln["protocol_name"], scorer=fuzz.token_sort_ratio)
-    if match_result:
-        best_match, score = match_result[0], match_result[1]
-        if score >= 80:  # Match confidence threshold
-            row = vuln[vuln["protocol_name"] == best_match].iloc[0].to_dict()
+if names and choices:
+    scores = process.cdist(
+        names, choices, scorer=fuzz.token_sort_ratio, processor=utils.default_process,
+        score_cutoff=80, workers=-1,  # Match confidence threshold
+    )
+    for name, j, score in zip(names, scores.argmax(axis=1), scores.max(axis=1)):
+        if score >= 80:
+            row = vuln_first.loc[choices[j]].to_dict()
             row["matched_audit_name"] = name
-            row["match_score"] = score
+            row["match_score"] = round(float(score))  # integer scores, as fuzzywuzzy reported them
             matches.append(row)
 
 vuln_matched = pd.DataFrame(matches)
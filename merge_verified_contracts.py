@@ -3,6 +3,7 @@
 
 from __future__ import annotations
 
+import re
 from pathlib import Path
 import pandas as pd
 
@@ -12,6 +13,9 @@ EXPANDED = ROOT / "data_raw" / "contracts" / "verified_contracts_expanded.csv"
 LOCAL    = ROOT / "data_raw" / "contracts" / "verified_contracts_local.csv"
 OUT      = ROOT / "data_raw" / "contracts" / "verified_contracts_merged.csv"
 
+# addresses are lowercased by norm_addr before this runs
+ADDR_RE = re.compile(r"0x[0-9a-f]{40}")
+
 def norm_chain(df: pd.DataFrame) -> pd.Series:
     if "chain" in df.columns:
         s = df["chain"]
@@ -22,7 +26,7 @@ def norm_chain(df: pd.DataFrame) -> pd.Series:
     return s.astype(str).str.lower().str.strip()
 
 def norm_addr(df: pd.DataFrame) -> pd.Series:
-    return df["address"].astype(str).str.lower().str.strip()
+    return df["address"].fillna("").astype(str).str.lower().str.strip()
 
 def parse_ts(df: pd.DataFrame) -> pd.Series:
     if "scrape_ts" not in df.columns:
@@ -73,7 +77,7 @@ def main():
     all_df = pd.concat([a, b], ignore_index=True)
 
     # drop impossible rows
-    all_df = all_df[(all_df["address"].str.len() == 42) & (all_df["address"].str.startswith("0x"))]
+    all_df = all_df[all_df["address"].str.fullmatch(ADDR_RE.pattern, na=False)]
 
     # dedupe by (chain, address)
     merged = (
@@ -101,6 +101,13 @@ KNOWN_CHAINS = [
     "mantle", "metis", "blast", "sei", "near", "solana", "tron", "bitcoin",
 ]
 
+# context patterns for infer_chain_from_context, compiled once
+CHAIN_KV_RE = re.compile(r'chain\s*:\s*["\']([a-z0-9\-]+)["\']')
+CHAIN_KEY_RE = re.compile(r'^\s*["\']?([a-z0-9\-]+)["\']?\s*:\s*\{')
+CHAIN_MENTION_RE = {c: re.compile(rf"(^|[^a-z0-9]){re.escape(c)}\s*[:\"']") for c in KNOWN_CHAINS}
+SLUG_JUNK_RE = re.compile(r"[^a-z0-9-]")
+DASHES_RE = re.compile(r"-+")
+
 # normalize common chain synonyms / tokens to your vocabulary
 CHAIN_ALIASES: Dict[str, str] = {
     "eth": "ethereum",
@@ -130,8 +137,8 @@ def norm(s: str) -> str:
     s = (s or "").strip().lower()
     s = s.replace(" ", "-").replace("_", "-")
     # keep only [a-z0-9-]
-    s = re.sub(r"[^a-z0-9-]", "", s)
-    s = re.sub(r"-+", "-", s).strip("-")
+    s = SLUG_JUNK_RE.sub("", s)
+    s = DASHES_RE.sub("-", s).strip("-")
     return s
 
 def req_json(url: str) -> dict:
@@ -258,16 +265,15 @@ def infer_chain_from_context(text: str, addr: str) -> str:
 
         # A) explicit: chain: "ethereum"
         for j in range(start, end):
-            m = re.search(r'chain\s*:\s*["\']([a-z0-9\-]+)["\']', lines[j])
+            m = CHAIN_KV_RE.search(lines[j])
             if m:
                 c = _norm_chain_token(m.group(1))
                 if c:
                     return c
 
         # B) find the nearest preceding chain key like: ethereum: {  or  "ethereum": {
-        key_pat = re.compile(r'^\s*["\']?([a-z0-9\-]+)["\']?\s*:\s*\{')
         for j in range(hit_idx, start - 1, -1):
-            m = key_pat.search(lines[j])
+            m = CHAIN_KEY_RE.search(lines[j])
             if m:
                 c = _norm_chain_token(m.group(1))
                 if c:
@@ -275,7 +281,7 @@ def infer_chain_from_context(text: str, addr: str) -> str:
 
         # C) forward scan (sometimes comes after)
         for j in range(hit_idx, end):
-            m = key_pat.search(lines[j])
+            m = CHAIN_KEY_RE.search(lines[j])
             if m:
                 c = _norm_chain_token(m.group(1))
                 if c:
@@ -284,7 +290,7 @@ def infer_chain_from_context(text: str, addr: str) -> str:
         # D) same-line quick hit
         ln = lines[hit_idx]
         for c in KNOWN_CHAINS:
-            if re.search(rf"(^|[^a-z0-9]){re.escape(c)}\s*[:\"']", ln):
+            if CHAIN_MENTION_RE[c].search(ln):
                 return c
 
     # Fallback: broader character window
@@ -292,10 +298,10 @@ def infer_chain_from_context(text: str, addr: str) -> str:
     if idx != -1:
         window = lower[max(0, idx - 1500): min(len(lower), idx + 1500)]
         for c in KNOWN_CHAINS:
-            if re.search(rf"(^|[^a-z0-9]){re.escape(c)}\s*[:\"']", window):
+            if CHAIN_MENTION_RE[c].search(window):
                 return c
 
-        m = re.search(r'chain\s*:\s*["\']([a-z0-9\-]+)["\']', window)
+        m = CHAIN_KV_RE.search(window)
         if m:
             c = _norm_chain_token(m.group(1))
             if c:
@@ -442,7 +448,7 @@ def main():
         out = pd.DataFrame(rows)
         out["chain"] = out["chain"].fillna("").astype(str).str.strip().str.lower()
         out["address"] = out["address"].fillna("").astype(str).str.strip().str.lower()
-        out = out[out["address"].str.startswith("0x") & (out["address"].str.len() == 42)].copy()
+        out = out[out["address"].map(ADDRESS_RE.fullmatch).notna()].copy()
 
         # keep unique chain+address when chain known; also keep unknown chain (but won't verify)
         out = out.drop_duplicates(subset=["chain", "address", "protocol"], keep="first")
@@ -531,7 +537,7 @@ def main():
     # basic cleaning
     out["chain"] = out["chain"].fillna("").astype(str).str.strip().str.lower()
     out["address"] = out["address"].fillna("").astype(str).str.strip().str.lower()
-    out = out[out["address"].str.startswith("0x") & (out["address"].str.len() == 42)].copy()
+    out = out[out["address"].map(ADDRESS_RE.fullmatch).notna()].copy()
 
     # keep only unique chain+address when chain known; also keep unknown chain (but won't verify)
     out = out.drop_duplicates(subset=["chain", "address", "slug"], keep="first")
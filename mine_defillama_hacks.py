@@ -56,13 +56,15 @@ def _get_json(url: str, timeout: int = 25) -> Any:
     r.raise_for_status()
     return r.json()
 
+_LOSS_RE = re.compile(r"^\$?\s*([0-9]*\.?[0-9]+)\s*([kKmMbB])?$")
+
 def _parse_loss(x) -> Optional[float]:
     if x is None:
         return None
     if isinstance(x, (int, float)):
         return float(x)
     s = str(x).replace(",", "").strip()
-    m = re.match(r"^\$?\s*([0-9]*\.?[0-9]+)\s*([kKmMbB])?$", s)
+    m = _LOSS_RE.match(s)
     if not m:
         return None
     v = float(m.group(1))
@@ -27,6 +27,9 @@ from typing import Optional
 
 import pandas as pd
 
+# lowercase EVM address (the frame is lowercased first), checked in one pass
+ADDR_RE = re.compile(r"0x[0-9a-f]{40}")
+
 
 def pick_latest_sources_csv() -> Path:
     cands = sorted(Path("data_raw/contracts").glob("fetched_contract_sources*.csv"))
@@ -80,7 +83,7 @@ def main() -> None:
     df["address"] = df["address"].fillna("").astype(str).str.strip().str.lower()
     df[src_col] = df[src_col].fillna("").astype(str)
 
-    df = df[(df["chain"] != "") & df["address"].str.startswith("0x") & (df["address"].str.len() == 42)]
+    df = df[(df["chain"] != "") & df["address"].map(ADDR_RE.fullmatch).notna()]
     df = df[df[src_col].str.strip() != ""].copy()
     df = df.drop_duplicates(subset=["chain", "address"]).reset_index(drop=True)
 
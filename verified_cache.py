@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+verified_cache.py
+---------------------------------------------------
+Persistent (chain_id, address) → verified-status store shared by
+fetch_contracts_local.py, fetch_contracts_multichain.py,
+fetch_contracts_universal_v1.py and infer_chain_by_probe.py
+(infer_chain_by_code_probe.py keeps has-code flags in its own file).
+
+The same addresses come up on every run and across protocols; only a
+definitive explorer answer is recorded, and entries older than
+CACHE_TTL_DAYS are treated as missing so verification changes are picked up.
+"""
+
+import hashlib
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+CACHE_PATH = Path(__file__).resolve().parent / "outputs" / "etherscan_cache.db"
+CACHE_TTL_DAYS = float(os.getenv("CACHE_TTL_DAYS", "30"))
+COMMIT_EVERY = 50
+
+# EVM chain IDs (Etherscan v2 `chainid`)
+CHAIN_IDS: Dict[str, int] = {
+    "ethereum": 1,
+    "arbitrum": 42161,
+    "base": 8453,
+    "optimism": 10,
+    "polygon": 137,
+    "bsc": 56,
+    "avalanche": 43114,
+    "fantom": 250,
+    "gnosis": 100,
+    "linea": 59144,
+    "scroll": 534352,
+    "blast": 81457,
+}
+
+
+class VerifiedCache:
+    def __init__(self, path: Path = CACHE_PATH, ttl_days: float = CACHE_TTL_DAYS):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(path))
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS verified("
+            "address TEXT, chain_id INT, verified INT, source_hash TEXT, ts INT, "
+            "PRIMARY KEY(address, chain_id))"
+        )
+        self.ttl = ttl_days * 86400
+        self.uncommitted = 0
+        self.hits = 0
+
+    def get(self, address: str, chain_id: Optional[int]) -> Optional[bool]:
+        """Cached verified flag, or None when unknown / older than the TTL."""
+        if chain_id is None:
+            return None
+        row = self.conn.execute(
+            "SELECT verified, ts FROM verified WHERE address=? AND chain_id=?",
+            (str(address).lower(), int(chain_id)),
+        ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        self.hits += 1
+        return bool(row[0])
+
+    def put(self, address: str, chain_id: Optional[int], verified: bool, source: str = "") -> None:
+        if chain_id is None:
+            return
+        source_hash = hashlib.sha1(source.encode("utf-8")).hexdigest() if source else ""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO verified VALUES (?, ?, ?, ?, ?)",
+            (str(address).lower(), int(chain_id), int(bool(verified)), source_hash, int(time.time())),
+        )
+        self.uncommitted += 1
+        if self.uncommitted >= COMMIT_EVERY:
+            self.commit()
+
+    def commit(self) -> None:
+        if self.uncommitted:
+            self.conn.commit()
+            self.uncommitted = 0
+
+    def close(self) -> None:
+        self.commit()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()